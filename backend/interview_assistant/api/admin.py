@@ -0,0 +1,34 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+
+from ..service.cache import SolutionCache
+from .dependencies import get_solution_cache, require_admin
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+@router.get("/cache")
+async def cache_stats(cache: SolutionCache = Depends(get_solution_cache)):
+    """Счетчики попаданий, промахов и вытеснений кэша решений"""
+    return cache.snapshot()
+
+@router.delete("/cache")
+async def invalidate_cache(
+    key: Optional[str] = None,
+    programming_language: Optional[str] = None,
+    model_name: Optional[str] = None,
+    cache: SolutionCache = Depends(get_solution_cache),
+):
+    """
+    Инвалидирует записи кэша решений
+
+    Args:
+        key: Ключ конкретной записи
+        programming_language: Удалить записи для языка
+        model_name: Удалить записи для модели
+
+    Returns:
+        dict: Количество удаленных записей; без параметров кэш очищается полностью
+    """
+    removed = await cache.invalidate(key=key, programming_language=programming_language, model_name=model_name)
+    return {"removed": removed}
@@ -0,0 +1,56 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request
+from starlette.requests import HTTPConnection
+
+from ..core.config import ADMIN_TOKEN
+from ..service.cache import SolutionCache
+from ..service.jobs import JobScheduler, QueueFullError
+from ..service.llm_service import LLMService
+from ..service.warmup import ModelWarmup
+from voice_assistant.voice_model import VoiceModel
+
+
+def get_llm_service(connection: HTTPConnection) -> LLMService:
+    """Возвращает общий экземпляр LLMService, созданный при старте приложения"""
+    return connection.app.state.llm_service
+
+
+def get_voice_model(connection: HTTPConnection) -> VoiceModel:
+    """Возвращает модель распознавания речи, загружаемую при старте приложения"""
+    return connection.app.state.voice_model
+
+
+def get_scheduler(request: Request) -> JobScheduler:
+    """Возвращает планировщик обращений к модели"""
+    return request.app.state.scheduler
+
+
+def get_warmup(request: Request) -> ModelWarmup:
+    """Возвращает прогрев моделей, по которому определяется готовность"""
+    return request.app.state.warmup
+
+
+def check_capacity(request: Request) -> None:
+    """Отклоняет запрос сразу, если очередь к модели переполнена"""
+    scheduler: JobScheduler = request.app.state.scheduler
+    if scheduler.is_saturated():
+        scheduler.stats["rejected"] += 1
+        raise QueueFullError(scheduler.retry_after())
+
+
+def get_solution_cache(request: Request) -> SolutionCache:
+    """Возвращает кэш решений приложения"""
+    cache = request.app.state.solution_cache
+    if cache is None:
+        raise HTTPException(status_code=404, detail="Solution cache is disabled")
+    return cache
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Проверяет токен администратора; без ADMIN_TOKEN в настройках административные эндпоинты закрыты"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled: ADMIN_TOKEN is not configured")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
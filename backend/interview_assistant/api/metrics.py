@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from ..core.metrics import REGISTRY
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=Response)
+async def metrics():
+    """Метрики приложения в текстовом формате Prometheus"""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
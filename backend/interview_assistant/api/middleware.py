@@ -0,0 +1,208 @@
+import io
+import time
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.config import MAX_DECOMPRESSED_BODY
+from ..core.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, HTTP_TTFB, request_timings
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен: без пакета zstandard принимаются только gzip и deflate
+    zstandard = None
+
+# Ошибки распаковки поврежденного тела
+_DECODE_ERRORS = (zlib.error,) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+
+def _route_path(scope: Scope) -> str:
+    """Шаблон маршрута вместо фактического пути, чтобы ID сессий не плодили метки"""
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+def format_server_timing(timings: dict, total: float) -> str:
+    """Формирует заголовок Server-Timing, длительности в миллисекундах"""
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware для метрик HTTP-запросов и заголовков с таймингами
+
+    Считает запросы, время до первого байта и полное время ответа, а также
+    добавляет заголовки Server-Timing и X-Process-Time с длительностями этапов,
+    завершившихся до отправки заголовков.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings: dict = {}
+        token = request_timings.set(timings)
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                HTTP_TTFB.labels(method=scope["method"], path=_route_path(scope)).observe(elapsed)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", format_server_timing(timings, elapsed))
+                headers.append("X-Process-Time", f"{elapsed:.4f}")
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            path = _route_path(scope)
+            HTTP_LATENCY.labels(method=scope["method"], path=path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method=scope["method"], path=path, status=str(status)).inc()
+            request_timings.reset(token)
+
+
+# Сколько байт zstd распаковывает за один шаг
+_ZSTD_READ_SIZE = 1024 * 1024
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class _Inflater:
+    """Потоковая распаковка тела запроса с ограничением размера результата"""
+
+    def __init__(self, encoding: str, limit: int):
+        self.limit = limit
+        self.size = 0
+        if encoding in ("gzip", "x-gzip"):
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            self._zlib = zlib.decompressobj()
+        else:
+            self._zlib = None
+            self._zstd_input = []
+            self._zstd_input_size = 0
+
+    def _count(self, data: bytes) -> bytes:
+        self.size += len(data)
+        if self.size > self.limit:
+            raise _BodyTooLarge()
+        return data
+
+    def feed(self, data: bytes) -> bytes:
+        if self._zlib is None:
+            # У decompressobj из zstandard нет ограничения на выход одного вызова, поэтому сжатое
+            # тело копится и распаковывается в flush по шагам. Сжатое тело больше лимита
+            # не может распаковаться в меньшее
+            self._zstd_input_size += len(data)
+            if self._zstd_input_size > self.limit:
+                raise _BodyTooLarge()
+            self._zstd_input.append(data)
+            return b""
+        parts = []
+        while data:
+            # max_length не дает небольшому архиву развернуться в гигабайты за один вызов
+            parts.append(self._count(self._zlib.decompress(data, self.limit - self.size + 1)))
+            data = self._zlib.unconsumed_tail
+        return b"".join(parts)
+
+    def flush(self) -> bytes:
+        if self._zlib is not None:
+            return self._count(self._zlib.flush())
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(b"".join(self._zstd_input)), read_across_frames=True
+        )
+        parts = []
+        while True:
+            # Шаг не больше остатка лимита: превышение обнаруживается, не распаковывая архив целиком
+            chunk = reader.read(min(_ZSTD_READ_SIZE, self.limit - self.size + 1))
+            if not chunk:
+                return b"".join(parts)
+            parts.append(self._count(chunk))
+
+
+def supported_encodings() -> tuple:
+    """Значения Content-Encoding, которые принимает DecompressionMiddleware"""
+    encodings = ("gzip", "x-gzip", "deflate")
+    return encodings + ("zstd",) if zstandard is not None else encodings
+
+
+class DecompressionMiddleware:
+    """
+    ASGI-middleware, распаковывающее тела запросов с Content-Encoding
+
+    Расширение отправляет HTML страницы целиком, и сжатие gzip/zstd
+    уменьшает его в разы. Тело распаковывается полностью до вызова
+    приложения, поэтому формы разбираются как обычно; размер результата
+    ограничен, чтобы сжатая "бомба" не заняла всю память.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_DECOMPRESSED_BODY):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = Headers(scope=scope).get("content-encoding", "").strip().lower() if scope["type"] == "http" else ""
+        if encoding in ("", "identity"):
+            await self.app(scope, receive, send)
+            return
+        if encoding not in supported_encodings():
+            await self._reject(scope, receive, send, 415, f"Unsupported Content-Encoding: {encoding}")
+            return
+
+        inflater = _Inflater(encoding, self.max_size)
+        parts = []
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] != "http.request":
+                    return
+                parts.append(inflater.feed(message.get("body", b"")))
+                more_body = message.get("more_body", False)
+            parts.append(inflater.flush())
+        except _BodyTooLarge:
+            await self._reject(scope, receive, send, 413, f"Decompressed body exceeds {self.max_size} bytes")
+            return
+        except _DECODE_ERRORS as e:
+            await self._reject(scope, receive, send, 400, f"Malformed {encoding} body: {e}")
+            return
+
+        body = b"".join(parts)
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+        body_sent = False
+
+        async def receive_body() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app({**scope, "headers": headers}, receive_body, send)
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, status: int, detail: str) -> None:
+        response = JSONResponse({"detail": detail}, status_code=status)
+        if status == 415:
+            response.headers["Accept-Encoding"] = ", ".join(supported_encodings())
+        await response(scope, receive, send)
@@ -1,16 +1,27 @@
+import json
 import uuid
-from fastapi import APIRouter, Form, HTTPException
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Form, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from ..core.model import UploadResponse
+from ..core.model import SessionResponse, UploadResponse
+from ..service.jobs import JobScheduler, QueueFullError
 from ..service.llm_service import LLMService
+from ..service.warmup import ModelWarmup
+from .dependencies import check_capacity, get_llm_service, get_scheduler, get_warmup
 
 router = APIRouter()
 
-@router.post("/upload", response_model=UploadResponse)
+@router.post("/upload", response_model=UploadResponse, dependencies=[Depends(check_capacity)])
 async def upload_data(
+    response: Response,
     task: str = Form(...),
     programming_language: str = Form(...),
+    async_mode: bool = Form(False),
+    priority: int = Form(0),
+    latency_budget: Optional[float] = Form(None),
+    llm_service: LLMService = Depends(get_llm_service),
+    scheduler: JobScheduler = Depends(get_scheduler),
 ):
     """
     Обрабатывает запрос на генерацию кода
@@ -18,27 +29,178 @@ async def upload_data(
     Args:
         task: Текст задачи
         programming_language: Выбранный язык программирования
+        async_mode: Поставить задачу в очередь и сразу вернуть ID сессии
+        priority: Приоритет задачи в очереди к модели
+        latency_budget: Желаемое время ответа в секундах; при нехватке используются более быстрые модели
     
     Returns:
-        UploadResponse: Ответ с уникальным ID сессии и результатом обработки LLM
+        UploadResponse: Ответ с уникальным ID сессии, результатом обработки LLM и моделью, которая его дала
     """
     try:
+        if async_mode:
+            # Результат забирается через GET /session/{session_id}
+            job = scheduler.submit(
+                lambda: llm_service.process_task(task, programming_language, priority, latency_budget),
+                priority,
+            )
+            response.status_code = 202
+            return UploadResponse(
+                session_id=job.id,
+                message="Task queued",
+                status=job.status,
+            )
+
         # Генерация уникального ID сессии
         session_id = str(uuid.uuid4())
         
         # Обработка задания с помощью LLM
-        message, llm_response = LLMService.process_task(task, programming_language)
+        message, llm_response, model = await llm_service.process_task(
+            task, programming_language, priority, latency_budget
+        )
         
         # Формирование ответа
         return UploadResponse(
             session_id=session_id,
             message=message,
             llm_response=llm_response,
+            status="done",
+            model=model,
         )
+    except QueueFullError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing upload: {str(e)}")
 
+def _format_sse(event: str, data) -> str:
+    """Форматирует событие в формате Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/upload/stream", dependencies=[Depends(check_capacity)])
+async def upload_data_stream(
+    task: str = Form(...),
+    programming_language: str = Form(...),
+    priority: int = Form(0),
+    latency_budget: Optional[float] = Form(None),
+    llm_service: LLMService = Depends(get_llm_service),
+):
+    """
+    Потоковая генерация кода через Server-Sent Events
+
+    Первым событием отдается ID сессии, затем статус этапов обработки,
+    выбранная модель и токены решения по мере генерации.
+
+    Args:
+        task: Текст задачи
+        programming_language: Выбранный язык программирования
+        priority: Приоритет задачи в очереди к модели
+        latency_budget: Желаемое время ответа в секундах
+
+    Returns:
+        StreamingResponse: Поток событий session, status, model, token, done или error
+    """
+    session_id = str(uuid.uuid4())
+
+    async def event_stream():
+        yield _format_sse("session", {"session_id": session_id})
+        async for event, data in llm_service.stream_task(task, programming_language, priority, latency_budget):
+            yield _format_sse(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/upload/batch", dependencies=[Depends(check_capacity)])
+async def upload_data_batch(
+    task: str = Form(...),
+    programming_languages: List[str] = Form(...),
+    priority: int = Form(0),
+    latency_budget: Optional[float] = Form(None),
+    llm_service: LLMService = Depends(get_llm_service),
+):
+    """
+    Генерация решений одной задачи на нескольких языках через Server-Sent Events
+
+    Условие извлекается один раз, решения генерируются параллельно,
+    и каждое отдается отдельным событием result, как только готово.
+
+    Args:
+        task: Текст задачи
+        programming_languages: Языки программирования (поле повторяется для каждого языка)
+        priority: Приоритет задачи в очереди к модели
+        latency_budget: Желаемое время ответа в секундах для всех языков
+
+    Returns:
+        StreamingResponse: Поток событий session, status, result, done или error
+    """
+    session_id = str(uuid.uuid4())
+
+    async def event_stream():
+        yield _format_sse("session", {"session_id": session_id})
+        yield _format_sse("status", "extracting")
+        try:
+            results = llm_service.process_batch(task, programming_languages, priority, latency_budget)
+            async for language, message, llm_response, model in results:
+                yield _format_sse("result", {
+                    "programming_language": language,
+                    "message": message,
+                    "llm_response": llm_response,
+                    "model": model,
+                })
+            yield _format_sse("done", "Data uploaded and LLM processed successfully")
+        except Exception as e:
+            yield _format_sse("error", f"Error processing upload: {str(e)}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/session/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str, scheduler: JobScheduler = Depends(get_scheduler)):
+    """
+    Возвращает статус или результат фоновой задачи
+
+    Args:
+        session_id: ID сессии, полученный от /upload с async_mode
+
+    Returns:
+        SessionResponse: Статус queued, running, done или failed и результат, если он готов
+    """
+    job = scheduler.get(session_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return SessionResponse(
+        session_id=job.id,
+        status=job.status,
+        message=job.message,
+        llm_response=job.result,
+        model=job.model,
+    )
+
 @router.get("/")
 async def root():
     """Корневой эндпоинт для проверки работоспособности"""
-    return {"message": "Interview Assistant Backend is running"}
\ No newline at end of file
+    return {"message": "Interview Assistant Backend is running"}
+
+@router.get("/ready")
+async def ready(response: Response, warmup: ModelWarmup = Depends(get_warmup)):
+    """
+    Проверка готовности: модели всех этапов загружены в память Ollama
+
+    В отличие от /, отвечает 503, пока модели не прогреты
+    или если Ollama их выгрузила.
+    """
+    resident = await warmup.resident()
+    is_ready = all(resident.values())
+    if not is_ready:
+        response.status_code = 503
+    return {
+        "status": "ready" if is_ready else "loading",
+        "models": {
+            model: "resident" if loaded else warmup.status[model]
+            for model, loaded in resident.items()
+        },
+    }
\ No newline at end of file
@@ -0,0 +1,171 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, WebSocket, WebSocketDisconnect
+
+from ..core.config import VOICE_MAX_SAMPLE_RATE, VOICE_MAX_SECONDS, VOICE_MIN_SAMPLE_RATE
+from ..service.jobs import QueueFullError
+from ..service.llm_service import LLMService
+from .dependencies import get_llm_service, get_voice_model
+from voice_assistant.audio import SAMPLE_WIDTHS, frame_size
+from voice_assistant.voice_model import VoiceModel
+
+router = APIRouter()
+
+# Коды закрытия WebSocket (RFC 6455)
+CLOSE_UNSUPPORTED_DATA = 1003
+CLOSE_TOO_BIG = 1009
+CLOSE_TRY_AGAIN_LATER = 1013
+
+async def _fail(websocket: WebSocket, detail: str, code: int, **extra) -> None:
+    """Сообщает об ошибке и закрывает соединение"""
+    await websocket.send_json({"type": "error", "detail": detail, **extra})
+    await websocket.close(code=code)
+
+@router.websocket("/ws/recognize")
+async def recognize(
+    websocket: WebSocket,
+    sample_rate: int = Query(16000),
+    channels: int = Query(1),
+    sample_format: str = Query("s16le"),
+    programming_language: str = Query("python"),
+    priority: int = Query(0),
+    latency_budget: Optional[float] = Query(None),
+    solve: bool = Query(True),
+    voice_model: VoiceModel = Depends(get_voice_model),
+    llm_service: LLMService = Depends(get_llm_service),
+):
+    """
+    Потоковое распознавание речи с передачей расшифровки в LLM
+
+    Клиент присылает бинарные сообщения с PCM (по умолчанию моно, 16 бит,
+    little-endian; каналы и формат отсчетов задаются параметрами) по мере записи и текстовое сообщение "end", когда запись закончена.
+    Сервер отвечает JSON-сообщениями:
+    - {"type": "partial", "text"}: текущая гипотеза, уточняется по ходу речи;
+    - {"type": "segment", "text"}: законченная фраза;
+    - {"type": "transcript", "text"}: весь текст записи;
+    - {"type": "solution", "message", "llm_response", "model"}: решение задачи из расшифровки (если solve);
+    - {"type": "error", "detail"}: ошибка, после нее соединение закрывается.
+
+    Args:
+        sample_rate: Частота дискретизации PCM
+        channels: Число каналов, сводятся в моно
+        sample_format: Формат отсчетов: u8, s16le, s24le, s32le, f32le или f64le
+        programming_language: Язык программирования для решения
+        priority: Приоритет задачи в очереди к модели
+        latency_budget: Желаемое время ответа модели в секундах
+        solve: Передать расшифровку в LLM как текст задачи
+    """
+    await websocket.accept()
+    if not await voice_model.get_status():
+        await _fail(websocket, "Voice model is not loaded", CLOSE_TRY_AGAIN_LATER)
+        return
+    if not VOICE_MIN_SAMPLE_RATE <= sample_rate <= VOICE_MAX_SAMPLE_RATE:
+        await _fail(
+            websocket,
+            f"sample_rate must be between {VOICE_MIN_SAMPLE_RATE} and {VOICE_MAX_SAMPLE_RATE}",
+            CLOSE_UNSUPPORTED_DATA,
+        )
+        return
+    if sample_format not in SAMPLE_WIDTHS or not 1 <= channels <= 8:
+        await _fail(
+            websocket,
+            f"sample_format must be one of {', '.join(SAMPLE_WIDTHS)} and channels between 1 and 8",
+            CLOSE_UNSUPPORTED_DATA,
+        )
+        return
+
+    stream = await voice_model.pool.run(voice_model.create_stream, sample_rate, channels, sample_format)
+    frame = frame_size(sample_format, channels)
+    max_bytes = int(VOICE_MAX_SECONDS * sample_rate) * frame
+    received = 0
+    # Байты неполного кадра, остаток которого придет в следующем сообщении
+    pending = b""
+    last_partial = ""
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                data = pending + message["bytes"]
+                received += len(message["bytes"])
+                if received > max_bytes:
+                    await _fail(websocket, f"Recording is longer than {VOICE_MAX_SECONDS:g} s", CLOSE_TOO_BIG)
+                    return
+                cut = len(data) - len(data) % frame
+                data, pending = data[:cut], data[cut:]
+                if not data:
+                    continue
+                # Распознавание нагружает CPU и идет в пуле потоков с ограничением параллельности
+                final, text = await voice_model.accept(stream, data)
+                if final:
+                    last_partial = ""
+                    if text:
+                        await websocket.send_json({"type": "segment", "text": text})
+                elif text != last_partial:
+                    last_partial = text
+                    await websocket.send_json({"type": "partial", "text": text})
+            elif (message.get("text") or "").strip() == "end":
+                break
+
+        transcript = await voice_model.finish(stream)
+        await websocket.send_json({"type": "transcript", "text": transcript})
+        if not solve:
+            await websocket.close()
+            return
+        if not transcript:
+            await _fail(websocket, "Nothing was recognized", CLOSE_UNSUPPORTED_DATA)
+            return
+
+        try:
+            status_message, llm_response, model = await llm_service.process_transcript(
+                transcript, programming_language, priority, latency_budget
+            )
+        except QueueFullError as e:
+            await _fail(websocket, str(e), CLOSE_TRY_AGAIN_LATER, retry_after=e.retry_after)
+            return
+        await websocket.send_json({
+            "type": "solution",
+            "message": status_message,
+            "llm_response": llm_response,
+            "model": model,
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        return
+
+@router.post("/recognize")
+async def recognize_upload(
+    audio: UploadFile = File(...),
+    sample_rate: Optional[int] = Form(None),
+    channels: int = Form(1),
+    sample_format: str = Form("s16le"),
+    voice_model: VoiceModel = Depends(get_voice_model),
+):
+    """
+    Распознает загруженную запись целиком
+
+    Запись читается в память и приводится к формату модели без временных
+    файлов: WAV с любым числом каналов, PCM 8/16/24/32 бит или float,
+    либо сырой PCM с параметрами из формы.
+
+    Args:
+        audio: WAV файл или сырой PCM
+        sample_rate: Частота сырого PCM; для WAV берется из заголовка
+        channels: Число каналов сырого PCM
+        sample_format: Формат отсчетов сырого PCM
+    """
+    if not await voice_model.get_status():
+        raise HTTPException(status_code=503, detail="Voice model is not loaded")
+    if sample_rate is not None and not VOICE_MIN_SAMPLE_RATE <= sample_rate <= VOICE_MAX_SAMPLE_RATE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sample_rate must be between {VOICE_MIN_SAMPLE_RATE} and {VOICE_MAX_SAMPLE_RATE}",
+        )
+    data = await audio.read()
+    try:
+        text = await voice_model.get_text_from_bytes(data, sample_rate, channels, sample_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"text": text}
@@ -3,27 +3,91 @@ from pathlib import Path
 
 # Базовые пути
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
-PROMPT_FILE = os.path.join(BASE_DIR, "prompt.txt")
-
-# Создаем папку для загрузок, если не существует
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-# Загружаем текст промпта из файла
-PROMPT_TEXT = ""
-if os.path.exists(PROMPT_FILE):
-    with open(PROMPT_FILE, "r", encoding="utf-8") as f:
-        PROMPT_TEXT = f.read()
 
 # Настройки LLM
 MODEL_NAME = 'qwen2.5-coder:32b'
 MODEL_TEMPERATURE = 0
 
+# Уровни моделей от самой быстрой к самой сильной
+MODEL_TIERS = {
+    "small": os.getenv("MODEL_TIER_SMALL", "qwen2.5-coder:1.5b"),
+    "medium": os.getenv("MODEL_TIER_MEDIUM", "qwen2.5-coder:7b"),
+    "large": os.getenv("MODEL_TIER_LARGE", MODEL_NAME),
+}
+# Уровень модели для каждого этапа; при нехватке бюджета задержки роутер спускается к более быстрым
+STAGE_MODEL_TIERS = {
+    "extract": os.getenv("EXTRACT_MODEL_TIER", "small"),
+    "solve": os.getenv("SOLVE_MODEL_TIER", "large"),
+}
+
+# Настройки подключения к Ollama
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+OLLAMA_REQUEST_TIMEOUT = float(os.getenv("OLLAMA_REQUEST_TIMEOUT", "600"))
+# Сколько Ollama держит модель в памяти после последнего запроса
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Размер контекста выбирается по длине промпта из этих корзин. Смена num_ctx заставляет Ollama
+# перезагрузить модель, поэтому корзин немного, и первая покрывает большинство запросов
+OLLAMA_NUM_CTX_BUCKETS = tuple(
+    sorted(int(size) for size in os.getenv("OLLAMA_NUM_CTX_BUCKETS", "8192,16384,32768").split(","))
+)
+# Сколько токенов контекста оставить под ответ модели
+OLLAMA_OUTPUT_TOKENS = int(os.getenv("OLLAMA_OUTPUT_TOKENS", "2048"))
+
+# Прогрев моделей этапов в фоне при старте приложения
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+
+# Планировщик обращений к модели: параллельные вызовы, длина очереди, время хранения и число хранимых результатов
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "64"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+JOB_RESULT_LIMIT = int(os.getenv("JOB_RESULT_LIMIT", "1000"))
+
+# Версия промптов входит в ключ кэша вместе с отпечатком текста шаблонов (service/prompts.py):
+# при изменении промптов старые решения не используются
+PROMPT_VERSION = "v2"
+
+# Настройки кэша решений
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_DB_URL = os.getenv("CACHE_DB_URL", f"sqlite:///{os.path.join(BASE_DIR, 'solution_cache.db')}")
+CACHE_MAX_MEMORY_ENTRIES = int(os.getenv("CACHE_MAX_MEMORY_ENTRIES", "512"))
+# Как часто воркер сверяет поколение кэша в базе: дольше этого инвалидация в другом воркере не видна
+CACHE_GENERATION_CHECK_INTERVAL = float(os.getenv("CACHE_GENERATION_CHECK_INTERVAL", "1.0"))
+
+# Страница, не распознанная правилами сайтов, сжимается до текста и обрезается до бюджета токенов
+# перед извлечением условия моделью
+HTML_TOKEN_BUDGET = int(os.getenv("HTML_TOKEN_BUDGET", "6000"))
+
+# Сжатие трафика: тела запросов с Content-Encoding gzip/deflate/zstd распаковываются
+# (не больше MAX_DECOMPRESSED_BODY байт), ответы от GZIP_MIN_SIZE байт сжимаются gzip
+MAX_DECOMPRESSED_BODY = int(os.getenv("MAX_DECOMPRESSED_BODY", str(32 * 1024 * 1024)))
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "1024"))
+
+# Токен для административных эндпоинтов; если не задан, они отвечают 403
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
 # Настройки CORS
 CORS_ORIGINS = ["*"]  # В продакшене лучше указать конкретные домены
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_METHODS = ["*"]
 CORS_ALLOW_HEADERS = ["*"]
+# Заголовки, которые расширение может прочитать для замера задержки на стороне клиента
+CORS_EXPOSE_HEADERS = ["Server-Timing", "X-Process-Time", "Retry-After"]
+
+# Распознавание речи: модель Vosk загружается в фоне при старте, если включено.
+# VOSK_MODEL_PATH — путь к каталогу модели или имя из voice_assistant/download_model.MODELS
+VOICE_ENABLED = os.getenv("VOICE_ENABLED", "1") == "1"
+VOSK_MODEL_PATH = os.getenv(
+    "VOSK_MODEL_PATH", os.path.join(BASE_DIR, "voice_assistant", "models", "vosk-model-small-ru-0.22")
+)
+# Частоты дискретизации, которые принимает потоковое распознавание
+VOICE_MIN_SAMPLE_RATE = 8000
+VOICE_MAX_SAMPLE_RATE = 48000
+# Максимальная длина одной записи в секундах
+VOICE_MAX_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", "300"))
+# Потоки распознавания (по умолчанию по числу ядер) и число одновременных распознаваний
+VOICE_WORKERS = int(os.getenv("VOICE_WORKERS", "0")) or os.cpu_count() or 1
+VOICE_MAX_CONCURRENCY = int(os.getenv("VOICE_MAX_CONCURRENCY", "0")) or VOICE_WORKERS
 
 # Настройки приложения
 APP_TITLE = "Interview Assistant Backend"
\ No newline at end of file
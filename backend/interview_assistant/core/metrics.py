@@ -0,0 +1,143 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# Границы корзин гистограмм задержек, в секундах: от миллисекунд до минут генерации
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Ряды *_created не нужны: время старта процесса видно и так
+disable_created_metrics()
+
+
+class CallbackMetric:
+    """Метрика, значения которой берутся из функций в момент сбора, например из счетчиков другого компонента"""
+
+    def __init__(self, family: type, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.family = family
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._callbacks: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set_function(self, fn: Callable[[], float], **labels: str) -> None:
+        self._callbacks[tuple(str(labels.get(name, "")) for name in self.labelnames)] = fn
+
+    def collect(self):
+        family = self.family(self.name, self.documentation, labels=self.labelnames)
+        for values, fn in list(self._callbacks.items()):
+            family.add_metric(list(values), fn())
+        return family
+
+
+class ComponentMetrics(Collector):
+    """Метрики компонентов приложения; повторное объявление метрики с тем же именем заменяет прежнюю"""
+
+    def __init__(self):
+        self._metrics: Dict[str, CallbackMetric] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._add(CallbackMetric(CounterMetricFamily, name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._add(CallbackMetric(GaugeMetricFamily, name, documentation, labelnames))
+
+    def _add(self, metric: CallbackMetric) -> CallbackMetric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def collect(self):
+        for metric in list(self._metrics.values()):
+            yield metric.collect()
+
+
+# Набор метрик приложения, отдаваемый эндпоинтом /metrics
+REGISTRY = CollectorRegistry()
+COMPONENTS = ComponentMetrics()
+REGISTRY.register(COMPONENTS)
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "path", "status"), registry=REGISTRY)
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "Time until the response body is fully sent", ("method", "path"), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+HTTP_TTFB = Histogram("http_time_to_first_byte_seconds", "Time until the response headers are sent", ("method", "path"), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being processed", registry=REGISTRY)
+
+STAGE_LATENCY = Histogram("llm_stage_duration_seconds", "Duration of pipeline stages", ("stage",), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+STAGE_IN_FLIGHT = Gauge("llm_stage_in_flight", "Pipeline stages currently running", ("stage",), registry=REGISTRY)
+STAGE_ERRORS = Counter("llm_stage_errors_total", "Failed pipeline stages", ("stage",), registry=REGISTRY)
+PROMPT_TOKENS = Counter("llm_prompt_tokens_total", "Prompt tokens sent to the model", ("stage", "model"), registry=REGISTRY)
+COMPLETION_TOKENS = Counter("llm_completion_tokens_total", "Completion tokens generated by the model", ("stage", "model"), registry=REGISTRY)
+MODEL_LOAD = Histogram("llm_model_load_seconds", "Model load time reported by Ollama", ("model",), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+TIME_TO_FIRST_TOKEN = Histogram("llm_time_to_first_token_seconds", "Time from sending the request to the first generated token", ("stage", "model"), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+PROMPT_EVAL = Histogram("llm_prompt_eval_seconds", "Prompt processing time reported by Ollama; drops when the prompt prefix is served from the KV cache", ("stage", "model"), buckets=LATENCY_BUCKETS, registry=REGISTRY)
+CONTEXT_SIZE = Counter("llm_context_requests_total", "Model calls by the num_ctx bucket they were sent with", ("stage", "num_ctx"), registry=REGISTRY)
+QUEUE_WAIT = Histogram("llm_queue_wait_seconds", "Time spent waiting for a model slot", buckets=LATENCY_BUCKETS, registry=REGISTRY)
+MODEL_ROUTES = Counter("llm_model_routes_total", "Model chosen for each stage and why", ("stage", "model", "reason"), registry=REGISTRY)
+HTML_COMPACTED_BYTES = Counter("html_compaction_removed_bytes_total", "Page bytes removed before sending the page to the model", registry=REGISTRY)
+HTML_COMPACTED_TOKENS = Counter("html_compaction_removed_tokens_total", "Estimated prompt tokens removed by page compaction", registry=REGISTRY)
+HTML_TRUNCATED = Counter("html_compaction_truncated_total", "Pages cut to the token budget", registry=REGISTRY)
+
+# Тайминги этапов текущего HTTP-запроса для заголовка Server-Timing
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """Записывает длительность этапа в гистограмму и тайминги текущего запроса"""
+    STAGE_LATENCY.labels(stage=stage).observe(seconds)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Измеряет этап конвейера: длительность, число выполняющихся и ошибки"""
+    started = time.perf_counter()
+    STAGE_IN_FLIGHT.labels(stage=stage).inc()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage=stage).inc()
+        raise
+    finally:
+        STAGE_IN_FLIGHT.labels(stage=stage).dec()
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_llm_usage(stage: str, model: str, message) -> None:
+    """
+    Учитывает токены, время загрузки модели и обработки промпта из ответа Ollama
+
+    Args:
+        stage: Этап конвейера
+        model: Имя модели
+        message: Сообщение или последний чанк ответа langchain с usage_metadata
+    """
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        PROMPT_TOKENS.labels(stage=stage, model=model).inc(usage.get("input_tokens", 0))
+        COMPLETION_TOKENS.labels(stage=stage, model=model).inc(usage.get("output_tokens", 0))
+    metadata = getattr(message, "response_metadata", None) or {}
+    load_duration = metadata.get("load_duration")
+    if load_duration:
+        seconds = load_duration / 1e9
+        MODEL_LOAD.labels(model=model).observe(seconds)
+        record_stage("model_load", seconds)
+    prompt_eval_duration = metadata.get("prompt_eval_duration")
+    if prompt_eval_duration is not None:
+        seconds = prompt_eval_duration / 1e9
+        PROMPT_EVAL.labels(stage=stage, model=model).observe(seconds)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[f"{stage}_prompt_eval"] = timings.get(f"{stage}_prompt_eval", 0.0) + seconds
+
+
+def record_first_token(stage: str, model: str, seconds: float) -> None:
+    """Записывает время до первого токена ответа в гистограмму и тайминги текущего запроса"""
+    TIME_TO_FIRST_TOKEN.labels(stage=stage, model=model).observe(seconds)
+    timings = request_timings.get()
+    if timings is not None:
+        timings[f"{stage}_ttft"] = seconds
@@ -5,4 +5,14 @@ class UploadResponse(BaseModel):
     """Модель ответа для эндпоинта загрузки"""
     session_id: str
     message: str
-    llm_response: Optional[str] = None
\ No newline at end of file
+    llm_response: Optional[str] = None
+    status: Optional[str] = None
+    model: Optional[str] = None
+
+class SessionResponse(BaseModel):
+    """Модель ответа для опроса состояния фоновой задачи"""
+    session_id: str
+    status: str
+    message: Optional[str] = None
+    llm_response: Optional[str] = None
+    model: Optional[str] = None
\ No newline at end of file
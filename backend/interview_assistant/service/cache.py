@@ -0,0 +1,261 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import Float, Integer, String, Text, create_engine, delete, event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class CachedSolution(_Base):
+    """Запись постоянного уровня кэша решений"""
+    __tablename__ = "solution_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    programming_language: Mapped[str] = mapped_column(String(64), index=True)
+    model_name: Mapped[str] = mapped_column(String(128), index=True)
+    prompt_version: Mapped[str] = mapped_column(String(32))
+    solution: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[float] = mapped_column(Float)
+    hit_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class CacheGeneration(_Base):
+    """Поколение кэша: увеличивается при каждой инвалидации, чтобы ее увидели все воркеры"""
+    __tablename__ = "solution_cache_generation"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    value: Mapped[int] = mapped_column(Integer, default=0)
+
+
+def normalize_statement(statement: str) -> str:
+    """Нормализует условие, чтобы различия в пробелах не давали разных ключей"""
+    return " ".join(statement.split())
+
+
+def make_cache_key(statement: str, programming_language: str, model_name: str, prompt_version: str) -> str:
+    """
+    Строит контентный ключ кэша
+
+    Args:
+        statement: Текст условия задачи
+        programming_language: Язык решения
+        model_name: Модель, генерирующая решение
+        prompt_version: Версия промптов
+
+    Returns:
+        str: SHA-256 от нормализованных параметров
+    """
+    payload = "\x1f".join((
+        normalize_statement(statement),
+        programming_language.strip().lower(),
+        model_name,
+        prompt_version,
+    ))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    """
+    Двухуровневый кэш решений
+
+    Первый уровень — ограниченный LRU в памяти процесса, второй — таблица
+    в SQLite через SQLAlchemy, общая для всех воркеров uvicorn и переживающая
+    перезапуски. Обращения к базе выполняются в пуле потоков, чтобы не
+    блокировать цикл событий.
+
+    Инвалидация в одном воркере увеличивает поколение кэша в базе. Перед
+    попаданием в память воркер сверяет поколение (не чаще раза в
+    generation_check_interval секунд) и при расхождении очищает свой LRU,
+    поэтому удаленные решения перестают отдаваться во всех воркерах.
+    """
+
+    def __init__(self, db_url: str, max_memory_entries: int, generation_check_interval: float = 1.0):
+        self.max_memory_entries = max_memory_entries
+        self.generation_check_interval = generation_check_interval
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "writes": 0,
+            "invalidations": 0,
+        }
+
+        self._engine = create_engine(db_url)
+        if self._engine.dialect.name == "sqlite":
+            event.listen(self._engine, "connect", _configure_sqlite)
+        _Base.metadata.create_all(self._engine)
+        self._ensure_generation()
+        self._generation = self._db_generation()
+        self._generation_checked = time.monotonic()
+
+    # --- Уровень в памяти ---
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            return value
+
+    def _memory_put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    async def _sync_generation(self) -> None:
+        """Очищает уровень в памяти, если с последней проверки кэш инвалидировали в другом воркере"""
+        if time.monotonic() - self._generation_checked < self.generation_check_interval:
+            return
+        generation = await asyncio.to_thread(self._db_generation)
+        self._generation_checked = time.monotonic()
+        if generation != self._generation:
+            with self._lock:
+                self._memory.clear()
+            self._generation = generation
+
+    # --- Постоянный уровень ---
+
+    def _ensure_generation(self) -> None:
+        with Session(self._engine) as session:
+            if session.get(CacheGeneration, 1) is not None:
+                return
+            session.add(CacheGeneration(id=1, value=0))
+            try:
+                session.commit()
+            except IntegrityError:
+                # Строку одновременно создал другой воркер
+                session.rollback()
+
+    def _db_generation(self) -> int:
+        with Session(self._engine) as session:
+            return session.scalar(select(CacheGeneration.value).where(CacheGeneration.id == 1)) or 0
+
+    def _db_get(self, key: str) -> Optional[str]:
+        with Session(self._engine) as session:
+            solution = session.scalar(select(CachedSolution.solution).where(CachedSolution.key == key))
+            if solution is not None:
+                session.execute(
+                    update(CachedSolution)
+                    .where(CachedSolution.key == key)
+                    .values(hit_count=CachedSolution.hit_count + 1)
+                )
+                session.commit()
+            return solution
+
+    def _db_put(self, key: str, solution: str, programming_language: str, model_name: str, prompt_version: str) -> None:
+        with Session(self._engine) as session:
+            session.merge(CachedSolution(
+                key=key,
+                programming_language=programming_language,
+                model_name=model_name,
+                prompt_version=prompt_version,
+                solution=solution,
+                created_at=time.time(),
+                hit_count=0,
+            ))
+            session.commit()
+
+    def _db_invalidate(self, key: Optional[str], programming_language: Optional[str], model_name: Optional[str]) -> list:
+        with Session(self._engine) as session:
+            statement = delete(CachedSolution)
+            if key is not None:
+                statement = statement.where(CachedSolution.key == key)
+            if programming_language is not None:
+                statement = statement.where(CachedSolution.programming_language == programming_language.strip().lower())
+            if model_name is not None:
+                statement = statement.where(CachedSolution.model_name == model_name)
+            removed = session.scalars(statement.returning(CachedSolution.key)).all()
+            session.execute(
+                update(CacheGeneration).where(CacheGeneration.id == 1).values(value=CacheGeneration.value + 1)
+            )
+            session.commit()
+            return list(removed)
+
+    # --- Публичный интерфейс ---
+
+    async def get(self, key: str) -> Optional[str]:
+        """Возвращает решение из кэша или None"""
+        if key in self._memory:
+            await self._sync_generation()
+        value = self._memory_get(key)
+        if value is not None:
+            self.stats["memory_hits"] += 1
+            return value
+
+        value = await asyncio.to_thread(self._db_get, key)
+        if value is not None:
+            self.stats["persistent_hits"] += 1
+            self._memory_put(key, value)
+            return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, solution: str, programming_language: str, model_name: str, prompt_version: str) -> None:
+        """Сохраняет решение в оба уровня кэша"""
+        self._memory_put(key, solution)
+        await asyncio.to_thread(
+            self._db_put, key, solution, programming_language.strip().lower(), model_name, prompt_version
+        )
+        self.stats["writes"] += 1
+
+    async def invalidate(
+        self,
+        key: Optional[str] = None,
+        programming_language: Optional[str] = None,
+        model_name: Optional[str] = None,
+    ) -> int:
+        """
+        Удаляет записи из кэша; без фильтров очищает кэш полностью
+
+        Args:
+            key: Ключ конкретной записи
+            programming_language: Удалить все записи для языка
+            model_name: Удалить все записи для модели
+
+        Returns:
+            int: Количество удаленных записей постоянного уровня
+        """
+        removed = await asyncio.to_thread(self._db_invalidate, key, programming_language, model_name)
+        with self._lock:
+            if key is None and programming_language is None and model_name is None:
+                self._memory.clear()
+            else:
+                for removed_key in removed:
+                    self._memory.pop(removed_key, None)
+                if key is not None:
+                    self._memory.pop(key, None)
+        self.stats["invalidations"] += len(removed)
+        return len(removed)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Счетчики кэша и текущий размер уровня в памяти"""
+        with self._lock:
+            memory_entries = len(self._memory)
+        return {**self.stats, "memory_entries": memory_entries, "max_memory_entries": self.max_memory_entries}
+
+    def close(self) -> None:
+        """Закрывает соединения с базой"""
+        self._engine.dispose()
+
+
+def _configure_sqlite(dbapi_connection, connection_record) -> None:
+    """WAL позволяет нескольким воркерам читать кэш во время записи"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
@@ -0,0 +1,72 @@
+import re
+from dataclasses import dataclass
+
+from ..core.config import HTML_TOKEN_BUDGET
+from .extractors import page_text
+from .tokens import estimate_tokens
+
+# Подряд идущие одинаковые строки: пункты меню, повторяющиеся ссылки навигации
+_REPEATED_LINES = re.compile(r"^(.+)(?:\n\1)+$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class CompactedPage:
+    """Текст страницы, подготовленный для модели, и сколько удалось сэкономить"""
+    text: str
+    original_bytes: int
+    original_tokens: int
+    tokens: int
+    truncated: bool
+
+    @property
+    def compacted_bytes(self) -> int:
+        return len(self.text.encode("utf-8"))
+
+    @property
+    def removed_bytes(self) -> int:
+        return self.original_bytes - self.compacted_bytes
+
+    @property
+    def removed_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def _truncate_to_budget(text: str, tokens: int, token_budget: int) -> str:
+    """Обрезает текст по границе строки так, чтобы оценка токенов уложилась в бюджет"""
+    while tokens > token_budget:
+        # Длина уменьшается пропорционально превышению с запасом, чтобы хватало пары итераций
+        cut = int(len(text) * token_budget / tokens * 0.95)
+        newline = text.rfind("\n", 0, cut)
+        text = text[:newline if newline > cut // 2 else cut]
+        tokens = estimate_tokens(text)
+    return text
+
+
+def compact_page(html: str, token_budget: int = HTML_TOKEN_BUDGET) -> CompactedPage:
+    """
+    Сжимает страницу перед отправкой в модель
+
+    Убирает скрипты, стили, атрибуты и лишние пробелы, схлопывает
+    повторяющиеся строки навигации и обрезает результат до бюджета токенов.
+    Условие обычно находится в начале страницы, поэтому отбрасывается хвост.
+
+    Args:
+        html: HTML страницы или текст задачи
+        token_budget: Максимальная оценка токенов результата
+
+    Returns:
+        CompactedPage: Текст и размеры до и после сжатия
+    """
+    text = _REPEATED_LINES.sub(r"\1", page_text(html))
+    tokens = estimate_tokens(text)
+    truncated = tokens > token_budget
+    if truncated:
+        text = _truncate_to_budget(text, tokens, token_budget)
+        tokens = estimate_tokens(text)
+    return CompactedPage(
+        text=text,
+        original_bytes=len(html.encode("utf-8")),
+        original_tokens=estimate_tokens(html),
+        tokens=tokens,
+        truncated=truncated,
+    )
@@ -0,0 +1,387 @@
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+# Размер порции HTML, которую получает потоковый парсер за один вызов feed
+FEED_CHUNK_SIZE = 64 * 1024
+
+_VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+_BLOCK_TAGS = frozenset({
+    "address", "article", "blockquote", "dd", "div", "dl", "dt", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "li", "ol", "p", "pre",
+    "section", "table", "tr", "ul",
+})
+_LABEL_TAGS = frozenset({"h1", "h2", "h3", "h4", "h5", "h6"})
+_LABEL_CLASSES = frozenset({"title", "section-title"})
+_SKIP_TAGS = frozenset({"script", "style", "noscript", "svg", "template", "button"})
+# Отрисованная формула MathJax/KaTeX дублирует исходный TeX из <script type="math/tex">
+_SKIP_CLASSES = frozenset({
+    "MathJax", "MathJax_Preview", "MathJax_Display", "MJX_Assistive_MathML", "katex-html",
+})
+
+_SAMPLE_INPUT_LABEL = re.compile(r"sample input|^input$|入力例|пример входных|входные данные", re.IGNORECASE)
+_SAMPLE_OUTPUT_LABEL = re.compile(r"sample output|^output$|出力例|пример выходных|выходные данные", re.IGNORECASE)
+_INLINE_SAMPLE = re.compile(
+    r"Input:\s*(?P<input>.*?)\s*Output:\s*(?P<output>.*?)\s*(?:Explanation:.*)?$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+@dataclass(frozen=True)
+class Selector:
+    """Простой селектор элемента: тег и значение атрибута (для class — один из классов)"""
+    tag: Optional[str] = None
+    attr: str = "class"
+    value: str = ""
+
+    def matches(self, tag: str, attrs: Dict[str, str]) -> bool:
+        if self.tag is not None and tag != self.tag:
+            return False
+        if not self.value:
+            return True
+        actual = attrs.get(self.attr)
+        if actual is None:
+            return False
+        if self.attr == "class":
+            return self.value in actual.split()
+        return actual == self.value
+
+
+@dataclass(frozen=True)
+class SiteRule:
+    """Описание разметки страницы задачи на конкретном сайте"""
+    site: str
+    container: Selector
+    title: Optional[Selector] = None
+    limits: Tuple[Selector, ...] = ()
+    # Часть контейнера, которую следует предпочесть, например английская версия условия
+    preferred: Optional[Selector] = None
+    title_suffix: str = ""
+
+
+SITE_RULES: Tuple[SiteRule, ...] = (
+    SiteRule(
+        site="codeforces",
+        container=Selector("div", "class", "problem-statement"),
+        title=Selector("div", "class", "title"),
+        limits=(Selector("div", "class", "time-limit"), Selector("div", "class", "memory-limit")),
+    ),
+    SiteRule(
+        site="leetcode",
+        container=Selector("div", "data-track-load", "description_content"),
+        title=Selector("title"),
+        title_suffix=" - LeetCode",
+    ),
+    SiteRule(
+        site="atcoder",
+        container=Selector("div", "id", "task-statement"),
+        title=Selector("span", "class", "h2"),
+        preferred=Selector("span", "class", "lang-en"),
+    ),
+)
+
+
+@dataclass
+class SampleTest:
+    """Пример теста из условия"""
+    input: str
+    output: str
+
+
+@dataclass
+class ProblemStatement:
+    """Условие задачи, извлеченное из HTML без участия LLM"""
+    site: str
+    title: str
+    statement: str
+    limits: List[str] = field(default_factory=list)
+    samples: List[SampleTest] = field(default_factory=list)
+
+    def to_prompt(self) -> str:
+        """Текст условия для этапа решения"""
+        parts = []
+        if self.title and self.title not in self.statement:
+            parts.append(self.title)
+        # Ограничения внутри контейнера уже есть в тексте, но разбиты на строки
+        parts.extend(
+            limit for limit in self.limits
+            if limit.replace(": ", "\n", 1) not in self.statement
+        )
+        parts.append(self.statement)
+        return "\n\n".join(parts)
+
+
+class _Capture:
+    """Накопитель текста элемента, открытого на заданной глубине стека"""
+    __slots__ = ("key", "depth", "parts")
+
+    def __init__(self, key: Tuple[str, str], depth: int):
+        self.key = key
+        self.depth = depth
+        self.parts: List[str] = []
+
+    def ends_with_newline(self) -> bool:
+        return not self.parts or self.parts[-1].endswith("\n")
+
+
+class _StatementParser(HTMLParser):
+    """
+    Однопроходный потоковый парсер, собирающий текст по правилам всех сайтов сразу
+
+    Дерево документа не строится: парсер хранит только стек открытых тегов
+    и активные накопители текста, поэтому память не зависит от размера страницы.
+    Разбор останавливается, как только закрывается контейнер условия.
+    """
+
+    def __init__(self, rules: Tuple[SiteRule, ...]):
+        super().__init__(convert_charrefs=True)
+        self._rules = rules
+        self._stack: List[str] = []
+        self._captures: List[_Capture] = []
+        self._skip_depth: Optional[int] = None
+        self._pre_depth = 0
+        self._math_depth: Optional[int] = None
+        self._last_label: Dict[str, str] = {}
+        self.fields: Dict[Tuple[str, str], List[str]] = {}
+        self.pre_blocks: Dict[str, List[Tuple[str, str]]] = {}
+        self.done_site: Optional[str] = None
+
+    # --- Вспомогательные методы ---
+
+    def _emit(self, text: str) -> None:
+        for capture in self._captures:
+            capture.parts.append(text)
+
+    def _emit_inline(self, text: str) -> None:
+        blank = not text.strip()
+        for capture in self._captures:
+            if blank and capture.ends_with_newline():
+                continue
+            capture.parts.append(text)
+
+    def _emit_newline(self) -> None:
+        for capture in self._captures:
+            if not capture.ends_with_newline():
+                capture.parts.append("\n")
+
+    def _in_container(self, site: str) -> bool:
+        return any(c.key == (site, "container") for c in self._captures)
+
+    def _open_captures(self, tag: str, attrs: Dict[str, str]) -> None:
+        depth = len(self._stack)
+        for rule in self._rules:
+            if rule.container.matches(tag, attrs):
+                self._captures.append(_Capture((rule.site, "container"), depth))
+                continue
+            in_container = self._in_container(rule.site)
+            if rule.preferred and in_container and rule.preferred.matches(tag, attrs):
+                self._captures.append(_Capture((rule.site, "preferred"), depth))
+            if rule.title and rule.title.matches(tag, attrs) and (rule.site, "title") not in self.fields:
+                self._captures.append(_Capture((rule.site, "title"), depth))
+            for selector in rule.limits:
+                if selector.matches(tag, attrs):
+                    self._captures.append(_Capture((rule.site, "limit"), depth))
+            if not in_container:
+                continue
+            if tag == "pre":
+                self._captures.append(_Capture((rule.site, "pre"), depth))
+            elif tag in _LABEL_TAGS or _LABEL_CLASSES.intersection(attrs.get("class", "").split()):
+                self._captures.append(_Capture((rule.site, "label"), depth))
+
+    def _close_captures(self) -> None:
+        depth = len(self._stack)
+        while self._captures and self._captures[-1].depth > depth:
+            capture = self._captures.pop()
+            site, kind = capture.key
+            text = "".join(capture.parts)
+            if kind == "label":
+                self._last_label[site] = _normalize_text(text)
+            elif kind == "pre":
+                self.pre_blocks.setdefault(site, []).append((self._last_label.get(site, ""), _normalize_pre(text)))
+            else:
+                self.fields.setdefault(capture.key, []).append(text)
+                if kind == "container" and self.done_site is None:
+                    self.done_site = site
+        if self._skip_depth is not None and depth < self._skip_depth:
+            self._skip_depth = None
+        if self._math_depth is not None and depth < self._math_depth:
+            self._math_depth = None
+            self._emit("$")
+
+    # --- Обработчики HTMLParser ---
+
+    def handle_starttag(self, tag: str, attrs_list) -> None:
+        if tag in _VOID_TAGS:
+            if tag == "br" and self._skip_depth is None:
+                self._emit("\n")
+            return
+        self._stack.append(tag)
+        if self._skip_depth is not None:
+            return
+
+        attrs = {name: value or "" for name, value in attrs_list}
+        if tag == "script" and attrs.get("type", "").startswith("math/tex"):
+            self._math_depth = len(self._stack)
+            self._emit(" $")
+            return
+        if tag in _SKIP_TAGS or _SKIP_CLASSES.intersection(attrs.get("class", "").split()):
+            self._skip_depth = len(self._stack)
+            return
+
+        if tag in _BLOCK_TAGS:
+            self._emit_newline()
+        if tag == "li":
+            self._emit("- ")
+        elif tag == "sup" and self._pre_depth == 0:
+            self._emit("^")
+        if tag == "pre":
+            self._pre_depth += 1
+        self._open_captures(tag, attrs)
+
+    def handle_startendtag(self, tag: str, attrs_list) -> None:
+        self.handle_starttag(tag, attrs_list)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag not in self._stack:
+            return
+        while self._stack:
+            open_tag = self._stack.pop()
+            if self._skip_depth is None:
+                if open_tag in _BLOCK_TAGS:
+                    self._emit_newline()
+                if open_tag == "pre":
+                    self._pre_depth -= 1
+            self._close_captures()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth is not None or not self._captures:
+            return
+        if self._math_depth is not None:
+            self._emit(data.strip())
+        elif self._pre_depth > 0:
+            self._emit(data)
+        else:
+            self._emit_inline(re.sub(r"\s+", " ", data))
+
+
+def _normalize_text(text: str) -> str:
+    """Схлопывает пробелы в строках и лишние пустые строки"""
+    lines = [" ".join(line.split()) for line in text.split("\n")]
+    result = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", result).strip()
+
+
+def _normalize_pre(text: str) -> str:
+    """Нормализует содержимое <pre>, сохраняя построчную структуру"""
+    lines = [line.rstrip() for line in text.split("\n")]
+    return "\n".join(line for line in lines if line).strip("\n")
+
+
+def _collect_samples(pre_blocks: List[Tuple[str, str]]) -> List[SampleTest]:
+    """Собирает пары вход/выход из блоков <pre> по их заголовкам"""
+    samples: List[SampleTest] = []
+    pending_input: Optional[str] = None
+    for label, text in pre_blocks:
+        sample = None
+        inline = _INLINE_SAMPLE.match(text)
+        if inline:
+            sample = SampleTest(inline.group("input"), inline.group("output"))
+        elif _SAMPLE_INPUT_LABEL.search(label):
+            pending_input = text
+        elif _SAMPLE_OUTPUT_LABEL.search(label) and pending_input is not None:
+            sample = SampleTest(pending_input, text)
+            pending_input = None
+        # На многоязычных страницах (AtCoder) примеры повторяются для каждого языка
+        if sample is not None and sample not in samples:
+            samples.append(sample)
+    return samples
+
+
+def extract_statement(html: str, rules: Tuple[SiteRule, ...] = SITE_RULES) -> Optional[ProblemStatement]:
+    """
+    Детерминированно извлекает условие задачи из HTML страницы
+
+    Args:
+        html: HTML страницы
+        rules: Правила разметки поддерживаемых сайтов
+
+    Returns:
+        Optional[ProblemStatement]: Условие задачи или None, если страница не распознана
+    """
+    if "<" not in html:
+        return None
+
+    parser = _StatementParser(rules)
+    for offset in range(0, len(html), FEED_CHUNK_SIZE):
+        parser.feed(html[offset:offset + FEED_CHUNK_SIZE])
+        if parser.done_site is not None:
+            break
+    else:
+        parser.close()
+
+    site = parser.done_site
+    if site is None:
+        return None
+    rule = next(r for r in rules if r.site == site)
+
+    body = parser.fields.get((site, "preferred")) or parser.fields[(site, "container")]
+    statement = _normalize_text(body[0])
+    if not statement:
+        return None
+
+    title_parts = parser.fields.get((site, "title"))
+    title = _normalize_text(title_parts[0]) if title_parts else ""
+    if rule.title_suffix and title.endswith(rule.title_suffix):
+        title = title[:-len(rule.title_suffix)]
+
+    limits = [
+        ": ".join(_normalize_text(text).split("\n"))
+        for text in parser.fields.get((site, "limit"), [])
+    ]
+
+    return ProblemStatement(
+        site=site,
+        title=title,
+        statement=statement,
+        limits=limits,
+        samples=_collect_samples(parser.pre_blocks.get(site, [])),
+    )
+
+
+# Корневой элемент, в который оборачивается страница, чтобы собрать весь ее текст
+_PAGE_ROOT = "page-root"
+_PAGE_RULES = (SiteRule(site="page", container=Selector(_PAGE_ROOT, value="")),)
+
+
+def page_text(html: str) -> str:
+    """
+    Видимый текст всей страницы для страниц, не распознанных правилами сайтов
+
+    Работает тем же потоковым парсером: скрипты, стили, отрисованные формулы
+    и атрибуты отбрасываются, блоки разделяются переносами строк, содержимое
+    <pre> сохраняет построчную структуру, пробелы схлопываются.
+
+    Args:
+        html: HTML страницы или фрагмента
+
+    Returns:
+        str: Текст страницы
+    """
+    if "<" not in html:
+        return _normalize_text(html)
+
+    parser = _StatementParser(_PAGE_RULES)
+    wrapped = f"<{_PAGE_ROOT}>{html}</{_PAGE_ROOT}>"
+    for offset in range(0, len(wrapped), FEED_CHUNK_SIZE):
+        parser.feed(wrapped[offset:offset + FEED_CHUNK_SIZE])
+    parser.close()
+    body = parser.fields.get(("page", "container"))
+    return _normalize_text(body[0]) if body else ""
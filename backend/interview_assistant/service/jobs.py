@@ -0,0 +1,256 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from ..core.metrics import QUEUE_WAIT, record_stage
+
+
+class QueueFullError(Exception):
+    """Очередь к модели переполнена; клиенту следует повторить запрос позже"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Model queue is full, retry after {retry_after} s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """Фоновая задача генерации, доступная для опроса по session_id"""
+
+    def __init__(self, job_id: str, priority: int):
+        self.id = job_id
+        self.priority = priority
+        self.status = "queued"
+        self.message: Optional[str] = None
+        self.result: Optional[str] = None
+        self.model: Optional[str] = None
+        self.created_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # Место в очереди, занятое задачей, пока она не держит слот модели
+        self.reserved = False
+        self.slots = 0
+
+
+_current_job: ContextVar[Optional[Job]] = ContextVar("current_job", default=None)
+
+
+class JobScheduler:
+    """
+    Планировщик обращений к модели с ограничением параллелизма
+
+    Одновременно к Ollama выполняется не больше max_concurrency вызовов,
+    остальные ждут в очереди с приоритетами (больший приоритет обслуживается
+    раньше, при равных — в порядке поступления). Фоновая задача занимает
+    место в очереди с момента submit и до завершения, даже между вызовами
+    модели. Если занятые слоты, ожидающие и зарезервированные задачи уже
+    заполняют max_concurrency + max_queue, новый вызов или задача
+    отклоняются с QueueFullError, что превращается в ответ 429 с Retry-After.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, result_ttl: float, max_results: int = 1000):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._active = 0
+        self._waiters: List[list] = []
+        # Фоновые задачи, которые сейчас не держат слот и не ждут его
+        self._reserved = 0
+        self._sequence = itertools.count()
+        self._jobs: Dict[str, Job] = {}
+        # Скользящее среднее времени удержания слота для оценки Retry-After
+        self._avg_slot_seconds = 10.0
+        self.stats: Dict[str, int] = {"admitted": 0, "rejected": 0, "completed_jobs": 0, "failed_jobs": 0}
+
+    # --- Ограничение параллелизма ---
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters) + self._reserved
+
+    def is_saturated(self) -> bool:
+        """True, если новый вызов модели или новая задача будут отклонены"""
+        return self._active + self.queued >= self.max_concurrency + self.max_queue
+
+    def retry_after(self) -> int:
+        """Оценка времени до освобождения места в очереди, в секундах"""
+        rounds = self.queued / self.max_concurrency + 1
+        return max(1, math.ceil(self._avg_slot_seconds * rounds))
+
+    def estimated_wait(self) -> float:
+        """Оценка ожидания слота для нового вызова модели, в секундах"""
+        if self._active < self.max_concurrency and not self._waiters:
+            return 0.0
+        return self._avg_slot_seconds * (len(self._waiters) / self.max_concurrency + 1)
+
+    async def _acquire(self, priority: int, reserved: bool = False) -> None:
+        # Зарезервированное место уже учтено при submit, его вызов не отклоняется
+        if not reserved and self.is_saturated():
+            self.stats["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+        if self._active < self.max_concurrency and not self._waiters:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = [-priority, next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже передан этому ожидающему — отдаем его следующему
+                self._release()
+            else:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0) -> AsyncIterator[None]:
+        """
+        Занимает слот для одного вызова модели
+
+        Args:
+            priority: Приоритет запроса, больший обслуживается раньше
+
+        Raises:
+            QueueFullError: Очередь ожидания переполнена
+        """
+        job = _current_job.get()
+        waiting_since = time.monotonic()
+        reserved = self._take_reservation(job)
+        try:
+            await self._acquire(priority, reserved)
+        except BaseException:
+            if reserved:
+                self._return_reservation(job)
+            raise
+        waited = time.monotonic() - waiting_since
+        QUEUE_WAIT.observe(waited)
+        record_stage("queue", waited)
+        self.stats["admitted"] += 1
+        if job is not None:
+            job.status = "running"
+            job.slots += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._avg_slot_seconds = 0.8 * self._avg_slot_seconds + 0.2 * elapsed
+            self._release()
+            if job is not None:
+                job.slots -= 1
+                self._return_reservation(job)
+
+    def _take_reservation(self, job: Optional[Job]) -> bool:
+        """Переводит место задачи из резерва в очередь за слотом"""
+        if job is None or not job.reserved:
+            return False
+        job.reserved = False
+        self._reserved -= 1
+        return True
+
+    def _return_reservation(self, job: Optional[Job]) -> None:
+        """Задача без слота снова держит место до следующего вызова модели или завершения"""
+        if job is None or job.reserved or job.slots or job.finished_at is not None:
+            return
+        job.reserved = True
+        self._reserved += 1
+
+    # --- Фоновые задачи ---
+
+    def submit(self, fn: Callable[[], Awaitable[Any]], priority: int = 0) -> Job:
+        """
+        Ставит задачу в фон и сразу возвращает ее описание
+
+        Args:
+            fn: Фабрика корутины, возвращающей (сообщение, результат, модель)
+            priority: Приоритет вызовов модели внутри задачи
+
+        Returns:
+            Job: Задача со статусом queued
+
+        Raises:
+            QueueFullError: Очередь к модели переполнена
+        """
+        if self.is_saturated():
+            self.stats["rejected"] += 1
+            raise QueueFullError(self.retry_after())
+        self._prune()
+
+        job = Job(str(uuid.uuid4()), priority)
+        # Место в очереди занимается сразу, а не когда задача дойдет до первого вызова модели
+        job.reserved = True
+        self._reserved += 1
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, fn))
+        return job
+
+    async def _run(self, job: Job, fn: Callable[[], Awaitable[Any]]) -> None:
+        _current_job.set(job)
+        try:
+            job.message, job.result, job.model = await fn()
+            job.status = "done"
+            self.stats["completed_jobs"] += 1
+        except Exception as e:
+            job.status = "failed"
+            job.message = f"Error processing task: {str(e)}"
+            self.stats["failed_jobs"] += 1
+        finally:
+            job.finished_at = time.monotonic()
+            if job.reserved:
+                job.reserved = False
+                self._reserved -= 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Возвращает задачу по session_id, если она еще хранится"""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        # Сверх лимита хранятся только самые свежие результаты
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at,
+        )
+        for job in finished[:max(0, len(finished) - self.max_results)]:
+            del self._jobs[job.id]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущее состояние очереди и счетчики"""
+        return {
+            **self.stats,
+            "active": self._active,
+            "queued": len(self._waiters),
+            "reserved": self._reserved,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "jobs": len(self._jobs),
+        }
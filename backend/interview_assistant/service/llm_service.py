@@ -1,46 +1,411 @@
-from langchain_ollama import ChatOllama
-from ..core.config import MODEL_NAME, MODEL_TEMPERATURE, PROMPT_TEXT
-from typing import Tuple, Optional
-from langchain_core.messages import SystemMessage, HumanMessage
+import asyncio
+import hashlib
+import time
+import httpx
+from ..core.config import (
+    MODEL_NAME,
+    MODEL_TEMPERATURE,
+    HTML_TOKEN_BUDGET,
+    OLLAMA_BASE_URL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_NUM_CTX_BUCKETS,
+    OLLAMA_REQUEST_TIMEOUT,
+)
+from typing import TYPE_CHECKING, AsyncIterator, List, Tuple, Optional
+from ..core.metrics import (
+    CONTEXT_SIZE,
+    HTML_COMPACTED_BYTES,
+    HTML_COMPACTED_TOKENS,
+    HTML_TRUNCATED,
+    record_first_token,
+    record_llm_usage,
+    track_stage,
+)
+from .cache import SolutionCache, make_cache_key
+from .compaction import compact_page
+from .extractors import extract_statement
+from .jobs import JobScheduler, QueueFullError
+from .model_router import ModelRouter
+from .prompts import EXTRACT_PROMPT, SOLVE_PROMPT, context_size
+from .singleflight import SingleFlight
+
+# Стек langchain импортируется лениво: он заметно замедляет старт процесса
+if TYPE_CHECKING:
+    from langchain_ollama import ChatOllama
+
+
+def create_llm(model_name: str = MODEL_NAME) -> "ChatOllama":
+    """
+    Создает долгоживущий клиент Ollama с пулом соединений
+
+    Клиент создается один раз при первом обращении к модели и переиспользуется
+    всеми запросами, поэтому один воркер может держать много одновременных генераций.
+    Контекст по умолчанию — первая корзина OLLAMA_NUM_CTX_BUCKETS, та же, с которой
+    модель прогревается, а keep_alive не дает Ollama выгрузить модель между запросами.
+
+    Args:
+        model_name: Имя модели в Ollama
+
+    Returns:
+        ChatOllama: Настроенный клиент модели
+    """
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(
+        model=model_name,
+        temperature=MODEL_TEMPERATURE,
+        base_url=OLLAMA_BASE_URL,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        num_ctx=OLLAMA_NUM_CTX_BUCKETS[0],
+        client_kwargs={
+            "timeout": OLLAMA_REQUEST_TIMEOUT,
+            "limits": httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+            ),
+        },
+    )
+
+
+def _with_context(llm: "ChatOllama", messages: list, stage: str) -> "ChatOllama":
+    """Клиент с num_ctx по размеру запроса; для первой корзины — общий клиент без изменений"""
+    num_ctx = context_size(messages)
+    CONTEXT_SIZE.labels(stage=stage, num_ctx=str(num_ctx)).inc()
+    if getattr(llm, "num_ctx", num_ctx) == num_ctx:
+        return llm
+    # Копия разделяет с исходным клиентом пул соединений
+    return llm.model_copy(update={"num_ctx": num_ctx})
+
+
+def _deadline(latency_budget: Optional[float]) -> Optional[float]:
+    """Переводит бюджет задержки запроса в секундах в момент time.monotonic()"""
+    if latency_budget is None:
+        return None
+    return time.monotonic() + latency_budget
+
+
 class LLMService:
     """Сервис для работы с языковой моделью"""
-    
+
+    def __init__(self, router: ModelRouter, scheduler: JobScheduler, cache: Optional[SolutionCache] = None):
+        self.router = router
+        self.scheduler = scheduler
+        self.cache = cache
+        # Одинаковые одновременные запросы разделяют одну генерацию
+        self.singleflight = SingleFlight()
+
+    async def _cache_get(self, key: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return await self.cache.get(key)
+
+    async def _cache_store(self, key: str, solution: Optional[str], programming_language: str, model: str) -> None:
+        if self.cache is None or not solution:
+            return
+        await self.cache.set(key, solution, programming_language, model, SOLVE_PROMPT.version)
+
+    async def _resolve_solver(
+        self,
+        problem: str,
+        programming_language: str,
+        deadline: Optional[float],
+    ) -> Tuple[str, str, Optional[str], Optional["ChatOllama"]]:
+        """
+        Выбирает модель для решения и проверяет кэш
+
+        Решение предпочтительной модели из кэша используется всегда,
+        иначе модель выбирается роутером с учетом дедлайна.
+
+        Returns:
+            Tuple[str, str, Optional[str], Optional[ChatOllama]]: Модель, ключ кэша,
+            решение из кэша и клиент модели (None, если решение найдено в кэше)
+        """
+        model = self.router.model_for("solve")
+        key = make_cache_key(problem, programming_language, model, SOLVE_PROMPT.version)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return model, key, cached, None
+
+        routed, llm = self.router.route("solve", deadline)
+        if routed != model:
+            model = routed
+            key = make_cache_key(problem, programming_language, model, SOLVE_PROMPT.version)
+            cached = await self._cache_get(key)
+            if cached is not None:
+                return model, key, cached, None
+        return model, key, None, llm
+
+    async def extract_problem(self, task: str, priority: int = 0, deadline: Optional[float] = None) -> str:
+        """
+        Извлекает условие задачи из HTML страницы
+
+        Сначала пробует детерминированный экстрактор для известных сайтов,
+        LLM вызывается только если страница не распознана. Экстрактору нужны
+        атрибуты разметки, поэтому страница сжимается до текста в пределах
+        HTML_TOKEN_BUDGET только перед отправкой в модель.
+
+        Args:
+            task: HTML страницы с задачей
+            priority: Приоритет вызова модели в очереди
+            deadline: Момент time.monotonic(), к которому запрос должен завершиться
+
+        Returns:
+            str: Текст условия задачи
+        """
+        with track_stage("extract_rules"):
+            statement = await asyncio.to_thread(extract_statement, task)
+        if statement is not None:
+            return statement.to_prompt()
+
+        with track_stage("compact"):
+            page = await asyncio.to_thread(compact_page, task, HTML_TOKEN_BUDGET)
+        HTML_COMPACTED_BYTES.inc(max(page.removed_bytes, 0))
+        HTML_COMPACTED_TOKENS.inc(max(page.removed_tokens, 0))
+        if page.truncated:
+            HTML_TRUNCATED.inc()
+
+        flight_key = "extract:" + hashlib.sha256(page.text.encode("utf-8")).hexdigest()
+        return await self.singleflight.do(flight_key, lambda: self._extract_with_llm(page.text, priority, deadline))
+
+    async def _extract_with_llm(self, task: str, priority: int, deadline: Optional[float]) -> str:
+        messages = EXTRACT_PROMPT.messages(page=task)
+        model, llm = self.router.route("extract", deadline)
+        llm = _with_context(llm, messages, "extract")
+        async with self.scheduler.slot(priority):
+            started = time.monotonic()
+            with track_stage("extract_llm"):
+                llm_response_parsed = await llm.ainvoke(messages)
+            self.router.observe("extract", model, time.monotonic() - started)
+        record_llm_usage("extract", model, llm_response_parsed)
+        return llm_response_parsed.content
+
     @staticmethod
-    def process_task(task: str, programming_language: str) -> Tuple[str, Optional[str]]:
+    def _build_solve_messages(problem: str, programming_language: str) -> list:
+        """Формирует сообщения для этапа решения задачи: общий статический префикс и данные запроса"""
+        return SOLVE_PROMPT.messages(problem=problem, programming_language=programming_language)
+
+    async def _generate_solution(
+        self,
+        problem: str,
+        programming_language: str,
+        key: str,
+        priority: int,
+        model: str,
+        llm: "ChatOllama",
+    ) -> AsyncIterator[str]:
+        """Генерирует решение по токенам и сохраняет результат в кэш"""
+        parts = []
+        messages = self._build_solve_messages(problem, programming_language)
+        llm = _with_context(llm, messages, "solve")
+        async with self.scheduler.slot(priority):
+            started = time.monotonic()
+            with track_stage("solve"):
+                async for chunk in llm.astream(messages):
+                    if chunk.usage_metadata:
+                        record_llm_usage("solve", model, chunk)
+                    if chunk.content:
+                        if not parts:
+                            # Время до первого токена почти целиком — обработка промпта
+                            record_first_token("solve", model, time.monotonic() - started)
+                        parts.append(chunk.content)
+                        yield chunk.content
+            self.router.observe("solve", model, time.monotonic() - started)
+        await self._cache_store(key, "".join(parts), programming_language, model)
+
+    def _solution_tokens(
+        self,
+        problem: str,
+        programming_language: str,
+        key: str,
+        priority: int,
+        model: str,
+        llm: "ChatOllama",
+    ) -> AsyncIterator[str]:
+        """Токены решения, общие для всех одновременных запросов той же задачи"""
+        return self.singleflight.stream(
+            "solve:" + key,
+            lambda: self._generate_solution(problem, programming_language, key, priority, model, llm),
+        )
+
+    async def process_task(
+        self,
+        task: str,
+        programming_language: str,
+        priority: int = 0,
+        latency_budget: Optional[float] = None,
+    ) -> Tuple[str, Optional[str], Optional[str]]:
         """
-        Обрабатывает задачу с помощью LLM
-        
+        Обрабатывает задачу с помощью LLM, не блокируя цикл событий
+
         Args:
             task: Текст задачи
             programming_language: Язык программирования для решения
-            
+            priority: Приоритет вызовов модели в очереди
+            latency_budget: Желаемое время ответа в секундах; при нехватке выбираются более быстрые модели
+
         Returns:
-            Tuple[str, Optional[str]]: Сообщение о статусе и ответ от LLM
+            Tuple[str, Optional[str], Optional[str]]: Сообщение о статусе, ответ от LLM и модель, которая его дала
+
+        Raises:
+            QueueFullError: Очередь к модели переполнена
         """
         try:
-            llm = ChatOllama(
-                model=MODEL_NAME,
-                temperature=MODEL_TEMPERATURE,
-            )
+            deadline = _deadline(latency_budget)
+            problem = await self.extract_problem(task, priority, deadline)
+            return await self.solve_problem(problem, programming_language, priority, deadline)
+        except QueueFullError:
+            raise
+        except Exception as e:
+            error_message = f"Error running LLM: {str(e)}"
+            return "Data uploaded but LLM processing failed", error_message, None
 
-            prompt_parse = "FROM THIS HTML EXTRACT THE part with the PROGRAMMING PROBLEM FROM CODEFORCES"
+    async def process_transcript(
+        self,
+        transcript: str,
+        programming_language: str,
+        priority: int = 0,
+        latency_budget: Optional[float] = None,
+    ) -> Tuple[str, Optional[str], Optional[str]]:
+        """
+        Решает задачу, продиктованную голосом
+
+        Расшифровка уже является текстом условия, поэтому этап извлечения
+        из HTML пропускается.
+
+        Args:
+            transcript: Распознанный текст задачи
+            programming_language: Язык программирования для решения
+            priority: Приоритет вызовов модели в очереди
+            latency_budget: Желаемое время ответа в секундах
+
+        Returns:
+            Tuple[str, Optional[str], Optional[str]]: Сообщение о статусе, ответ от LLM и модель, которая его дала
+
+        Raises:
+            QueueFullError: Очередь к модели переполнена
+        """
+        try:
+            return await self.solve_problem(transcript, programming_language, priority, _deadline(latency_budget))
+        except QueueFullError:
+            raise
+        except Exception as e:
+            error_message = f"Error running LLM: {str(e)}"
+            return "Transcript received but LLM processing failed", error_message, None
+
+    async def solve_problem(
+        self,
+        problem: str,
+        programming_language: str,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+    ) -> Tuple[str, Optional[str], Optional[str]]:
+        """
+        Решает уже извлеченную задачу на одном языке
+
+        Args:
+            problem: Текст условия задачи
+            programming_language: Язык программирования для решения
+            priority: Приоритет вызовов модели в очереди
+            deadline: Момент time.monotonic(), к которому запрос должен завершиться
+
+        Returns:
+            Tuple[str, Optional[str], Optional[str]]: Сообщение о статусе, ответ от LLM и модель, которая его дала
+        """
+        model, key, cached, llm = await self._resolve_solver(problem, programming_language, deadline)
+        if cached is not None:
+            return "Data uploaded, solution served from cache", cached, model
+
+        solution = "".join([
+            token async for token in self._solution_tokens(problem, programming_language, key, priority, model, llm)
+        ])
 
-            llm_response_parsed = llm.invoke([SystemMessage(content=prompt_parse), HumanMessage(content=task)])
+        if solution:
+            return "Data uploaded and LLM processed successfully", solution, model
+        else:
+            return "Data uploaded, but no LLM response generated", None, model
 
-            prompt_solve = f"""SOLVE the following problem USING {programming_language} FAST AND CORRECTLY OTHERWISE YOU WILL BE FIRED:
+    async def process_batch(
+        self,
+        task: str,
+        programming_languages: List[str],
+        priority: int = 0,
+        latency_budget: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[str, str, Optional[str], Optional[str]]]:
+        """
+        Решает одну задачу сразу на нескольких языках
+
+        Условие извлекается один раз, решения для всех языков генерируются
+        параллельно и отдаются по мере готовности.
 
-            {llm_response_parsed.content}
+        Args:
+            task: Текст задачи
+            programming_languages: Языки программирования для решения
+            priority: Приоритет вызовов модели в очереди
+            latency_budget: Желаемое время ответа в секундах для всех языков
 
-            return only the code in the {programming_language} language
-            """
+        Yields:
+            Tuple[str, str, Optional[str], Optional[str]]: Язык, сообщение о статусе, ответ от LLM и модель
+        """
+        deadline = _deadline(latency_budget)
+        problem = await self.extract_problem(task, priority, deadline)
 
-            llm_response = llm.invoke([SystemMessage(content=prompt_solve), HumanMessage(content=llm_response_parsed)])
+        async def solve(language: str) -> Tuple[str, str, Optional[str], Optional[str]]:
+            try:
+                message, solution, model = await self.solve_problem(problem, language, priority, deadline)
+            except Exception as e:
+                message, solution, model = "Data uploaded but LLM processing failed", f"Error running LLM: {str(e)}", None
+            return language, message, solution, model
 
-            if llm_response:
-                return "Data uploaded and LLM processed successfully", llm_response.content
-            else:
-                return "Data uploaded, but no LLM response generated", None
-                
+        tasks = [asyncio.ensure_future(solve(language)) for language in dict.fromkeys(programming_languages)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for pending in tasks:
+                pending.cancel()
+
+    async def stream_task(
+        self,
+        task: str,
+        programming_language: str,
+        priority: int = 0,
+        latency_budget: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Обрабатывает задачу с потоковой выдачей результата
+
+        Сначала отдает событие статуса после извлечения условия,
+        затем токены решения по мере их генерации.
+
+        Args:
+            task: Текст задачи
+            programming_language: Язык программирования для решения
+            priority: Приоритет вызовов модели в очереди
+            latency_budget: Желаемое время ответа в секундах
+
+        Yields:
+            Tuple[str, str]: Пара (тип события, данные): "status", "model", "token", "error" или "done"
+        """
+        try:
+            deadline = _deadline(latency_budget)
+            yield "status", "extracting"
+            problem = await self.extract_problem(task, priority, deadline)
+
+            model, key, cached, llm = await self._resolve_solver(problem, programming_language, deadline)
+            if cached is not None:
+                yield "status", "cached"
+                yield "model", model
+                yield "token", cached
+                yield "done", "Data uploaded, solution served from cache"
+                return
+
+            yield "status", "solving"
+            yield "model", model
+
+            async for token in self._solution_tokens(problem, programming_language, key, priority, model, llm):
+                yield "token", token
+
+            yield "done", "Data uploaded and LLM processed successfully"
         except Exception as e:
-            error_message = f"Error running LLM: {str(e)}"
-            return "Data uploaded but LLM processing failed", error_message
\ No newline at end of file
+            yield "error", f"Error running LLM: {str(e)}"
@@ -0,0 +1,101 @@
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from ..core.metrics import MODEL_ROUTES
+from .jobs import JobScheduler
+
+if TYPE_CHECKING:
+    from langchain_ollama import ChatOllama
+
+
+class ModelRouter:
+    """
+    Выбирает модель для этапа конвейера с учетом бюджета задержки
+
+    Каждому этапу назначен предпочтительный уровень модели. Если у запроса
+    есть дедлайн и ожидаемое время (ожидание слота в очереди плюс измеренная
+    задержка модели на этом этапе) в него не укладывается, роутер спускается
+    к более быстрым уровням. Пока для модели нет измерений, считается,
+    что она в бюджет укладывается. Клиенты моделей создаются при первом
+    обращении, один на каждую различную модель.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        stage_tiers: Dict[str, str],
+        scheduler: JobScheduler,
+        llm_factory: Callable[[str], "ChatOllama"],
+    ):
+        """
+        Args:
+            models: Имена моделей по уровням, от самого быстрого к самому сильному
+            stage_tiers: Предпочтительный уровень для каждого этапа
+            scheduler: Планировщик, по очереди которого оценивается ожидание
+            llm_factory: Создает клиента по имени модели
+        """
+        self.models = models
+        self.tiers: List[str] = list(models)
+        self.stage_tiers = stage_tiers
+        self.scheduler = scheduler
+        self._llm_factory = llm_factory
+        self._clients: Dict[str, "ChatOllama"] = {}
+        # Скользящее среднее длительности вызова по (этап, модель)
+        self._latency: Dict[Tuple[str, str], float] = {}
+
+    def client(self, model: str) -> "ChatOllama":
+        """Возвращает общий клиент модели, создавая его при первом обращении"""
+        llm = self._clients.get(model)
+        if llm is None:
+            llm = self._clients[model] = self._llm_factory(model)
+        return llm
+
+    def stage_models(self) -> List[str]:
+        """Различные предпочтительные модели всех этапов"""
+        return list(dict.fromkeys(self.models[tier] for tier in self.stage_tiers.values()))
+
+    def model_for(self, stage: str) -> str:
+        """Предпочтительная модель этапа без учета бюджета"""
+        return self.models[self.stage_tiers[stage]]
+
+    def route(self, stage: str, deadline: Optional[float] = None) -> Tuple[str, "ChatOllama"]:
+        """
+        Выбирает модель для вызова
+
+        Args:
+            stage: Этап конвейера ("extract" или "solve")
+            deadline: Момент time.monotonic(), к которому запрос должен завершиться
+
+        Returns:
+            Tuple[str, ChatOllama]: Имя модели и ее клиент
+        """
+        preferred = self.stage_tiers[stage]
+        candidates = self.tiers[: self.tiers.index(preferred) + 1][::-1]
+        chosen = candidates[0]
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            wait = self.scheduler.estimated_wait()
+            # Если не укладывается даже самая быстрая модель, берем ее
+            chosen = candidates[-1]
+            for tier in candidates:
+                estimate = self._latency.get((stage, self.models[tier]))
+                if estimate is None or wait + estimate <= remaining:
+                    chosen = tier
+                    break
+
+        model = self.models[chosen]
+        MODEL_ROUTES.labels(stage=stage, model=model, reason="preferred" if chosen == preferred else "budget").inc()
+        return model, self.client(model)
+
+    def observe(self, stage: str, model: str, seconds: float) -> None:
+        """Учитывает фактическую длительность вызова модели"""
+        key = (stage, model)
+        previous = self._latency.get(key)
+        self._latency[key] = seconds if previous is None else 0.8 * previous + 0.2 * seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Измеренные задержки по этапам и моделям"""
+        result: Dict[str, Dict[str, float]] = {}
+        for (stage, model), seconds in self._latency.items():
+            result.setdefault(stage, {})[model] = round(seconds, 3)
+        return result
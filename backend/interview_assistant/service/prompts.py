@@ -0,0 +1,101 @@
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+from typing import List
+
+from ..core.config import OLLAMA_NUM_CTX_BUCKETS, OLLAMA_OUTPUT_TOKENS, PROMPT_VERSION
+from .tokens import estimate_tokens
+
+# Оценка токенов расходится с токенизатором модели на десятки процентов, поэтому берется запас
+_CONTEXT_MARGIN = 1.25
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    Версионированный шаблон промпта этапа
+
+    Системное сообщение статично и одинаково у всех запросов этапа, а все
+    данные запроса (страница, условие, язык) идут в конце, в сообщении
+    пользователя. Так у запросов общий префикс, и Ollama переиспользует
+    KV-кэш, вычисленный для него, вместо повторной обработки всего промпта.
+    """
+    name: str
+    system: str
+    user: str
+
+    @cached_property
+    def version(self) -> str:
+        """Версия для ключа кэша: PROMPT_VERSION и отпечаток текста шаблона"""
+        digest = hashlib.sha256(f"{self.system}\0{self.user}".encode("utf-8")).hexdigest()
+        return f"{PROMPT_VERSION}-{digest[:8]}"
+
+    def messages(self, **fields: str) -> list:
+        """Сообщения для модели: статический префикс и данные запроса"""
+        from langchain_core.messages import HumanMessage, SystemMessage
+
+        return [SystemMessage(content=self.system), HumanMessage(content=self.user.format(**fields))]
+
+
+EXTRACT_SYSTEM = """You extract programming problems from web pages.
+
+The user message contains the visible text of a page from an online judge or an interview platform \
+(Codeforces, LeetCode, AtCoder, HackerRank and similar). Scripts, styles and markup have already been removed, \
+but navigation menus, comments, editorials and footers may remain.
+
+Return the problem exactly as stated on the page:
+- the title;
+- time and memory limits, if present;
+- the full statement, including the input and output format and all constraints;
+- every sample test, with its input and output kept verbatim, line by line;
+- notes that explain the samples.
+
+Do not solve the problem, do not summarize or paraphrase it, and do not add anything that is not on the page. \
+Keep formulas in the form they appear in the text. Omit everything that is not part of the problem."""
+
+EXTRACT_PROMPT = PromptTemplate(name="extract", system=EXTRACT_SYSTEM, user="{page}")
+
+
+SOLVE_SYSTEM = """You are an expert competitive programmer. You write correct and fast solutions \
+to algorithmic problems on the first attempt.
+
+Before writing code, work out the intended technique from the constraints: estimate the largest input size \
+and choose an algorithm whose time and memory complexity fits the limits with a margin.
+
+Requirements for the solution:
+- read the input from standard input and write the answer to standard output, exactly in the format \
+the problem requires, unless the problem asks for a function or class with a given signature;
+- use fast input and output for large inputs;
+- handle edge cases: minimal and maximal sizes, equal elements, empty answers, overflow of 32-bit integers;
+- do not print prompts, debug output or anything besides the answer;
+- write the solution in the programming language named in the request.
+
+Reply with a single fenced code block containing the complete program and nothing else."""
+
+
+SOLVE_PROMPT = PromptTemplate(
+    name="solve",
+    system=SOLVE_SYSTEM,
+    # Условие идет перед языком: решения одной задачи на разных языках делят и его
+    user="Problem:\n\n{problem}\n\nProgramming language: {programming_language}\n\n"
+         "Return only the {programming_language} code.",
+)
+
+
+def context_size(messages: List) -> int:
+    """
+    Размер контекста (num_ctx) для запроса из фиксированных корзин
+
+    Контекст вмещает промпт с запасом и OLLAMA_OUTPUT_TOKENS токенов ответа.
+    Смена num_ctx заставляет Ollama перезагрузить модель, поэтому размер
+    выбирается из немногих корзин OLLAMA_NUM_CTX_BUCKETS, а не точно по промпту.
+
+    Args:
+        messages: Сообщения запроса
+
+    Returns:
+        int: Наименьшая корзина, в которую помещается запрос, или наибольшая
+    """
+    prompt_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+    needed = int(prompt_tokens * _CONTEXT_MARGIN) + OLLAMA_OUTPUT_TOKENS
+    return next((bucket for bucket in OLLAMA_NUM_CTX_BUCKETS if bucket >= needed), OLLAMA_NUM_CTX_BUCKETS[-1])
@@ -0,0 +1,125 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, TypeVar
+
+T = TypeVar("T")
+
+
+class _Broadcast:
+    """Буфер событий одной генерации, который могут читать несколько подписчиков"""
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.error: BaseException | None = None
+        self.finished = False
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event: Any) -> None:
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self, error: BaseException | None = None) -> None:
+        async with self._changed:
+            self.error = error
+            self.finished = True
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        """Отдает все события с начала генерации, затем новые по мере поступления"""
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.events) or self.finished)
+                pending = self.events[position:]
+                finished = self.finished
+                error = self.error
+            for event in pending:
+                yield event
+            position += len(pending)
+            if finished and position >= len(self.events):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """
+    Объединяет одинаковые одновременные запросы в одно выполнение
+
+    Первый запрос с данным ключом запускает работу в отдельной задаче,
+    остальные дожидаются ее результата или получают те же потоковые события.
+    Отключение отдельного клиента не прерывает общую генерацию.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self._producers: set = set()
+        self.stats: Dict[str, int] = {"leaders": 0, "coalesced": 0}
+
+    def in_flight(self) -> int:
+        """Количество выполняющихся уникальных операций"""
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет fn один раз для всех одновременных вызовов с тем же ключом
+
+        Args:
+            key: Ключ операции
+            fn: Фабрика корутины, выполняющей работу
+
+        Returns:
+            T: Результат, общий для всех ожидающих
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Разделяет одну потоковую генерацию между всеми одновременными подписчиками
+
+        Подписчик, присоединившийся позже, сначала получает уже выданные события.
+
+        Args:
+            key: Ключ операции
+            fn: Фабрика асинхронного генератора событий
+
+        Yields:
+            T: События генерации в исходном порядке
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.stats["leaders"] += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            producer = asyncio.ensure_future(self._produce(key, broadcast, fn))
+            self._producers.add(producer)
+            producer.add_done_callback(self._producers.discard)
+        else:
+            self.stats["coalesced"] += 1
+
+        async for event in broadcast.subscribe():
+            yield event
+
+    async def _produce(self, key: str, broadcast: _Broadcast, fn: Callable[[], AsyncIterator[T]]) -> None:
+        error = None
+        try:
+            async for event in fn():
+                await broadcast.publish(event)
+        except Exception as e:
+            error = e
+        except BaseException as e:
+            # Отмена ведущей задачи (CancelledError) тоже должна дойти до подписчиков, иначе они ждут вечно
+            error = e
+            raise
+        finally:
+            self._streams.pop(key, None)
+            await broadcast.finish(error)
@@ -0,0 +1,110 @@
+import asyncio
+import importlib
+from typing import Dict, List, Optional
+
+import httpx
+
+from ..core.metrics import MODEL_LOAD
+
+
+def _normalize_model_name(name: str) -> str:
+    """Ollama дописывает тег :latest к именам моделей без тега"""
+    return name if ":" in name else f"{name}:latest"
+
+
+class ModelWarmup:
+    """
+    Прогревает модели этапов в Ollama и проверяет их готовность
+
+    При старте приложения в фоне импортирует стек langchain и просит Ollama
+    загрузить модели в память пустым запросом к /api/generate с keep_alive,
+    так что первый пользовательский запрос не платит за загрузку модели.
+    Модель загружается с тем же num_ctx, что у клиентов по умолчанию:
+    с другим размером контекста Ollama перезагрузила бы ее при первом запросе.
+    Готовность проверяется по списку загруженных моделей /api/ps:
+    выгруженная по таймауту модель снова делает сервис неготовым.
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        base_url: str,
+        keep_alive: str,
+        timeout: float,
+        attempts: int = 3,
+        num_ctx: Optional[int] = None,
+    ):
+        """
+        Args:
+            models: Модели, которые должны быть в памяти
+            base_url: Адрес сервера Ollama
+            keep_alive: Сколько Ollama держит модель в памяти после загрузки
+            timeout: Таймаут загрузки одной модели в секундах
+            attempts: Число попыток загрузки, если Ollama еще не отвечает
+            num_ctx: Размер контекста, с которым загружается модель
+        """
+        self.models = models
+        self.keep_alive = keep_alive
+        self.attempts = attempts
+        self.num_ctx = num_ctx
+        self.status: Dict[str, str] = {model: "pending" for model in models}
+        self.errors: Dict[str, str] = {}
+        self._client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Запускает прогрев в фоне, не задерживая старт приложения"""
+        self._task = asyncio.create_task(self.warm())
+
+    async def warm(self) -> None:
+        """Импортирует клиент модели и загружает все модели в память Ollama"""
+        await asyncio.to_thread(importlib.import_module, "langchain_ollama")
+        await asyncio.gather(*(self._load(model) for model in self.models))
+
+    async def _load(self, model: str) -> None:
+        self.status[model] = "loading"
+        body = {"model": model, "keep_alive": self.keep_alive}
+        if self.num_ctx is not None:
+            body["options"] = {"num_ctx": self.num_ctx}
+        for attempt in range(self.attempts):
+            try:
+                response = await self._client.post("/api/generate", json=body)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                self.errors[model] = str(e) or type(e).__name__
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            load_duration = response.json().get("load_duration")
+            if load_duration:
+                MODEL_LOAD.labels(model=model).observe(load_duration / 1e9)
+            self.status[model] = "ready"
+            self.errors.pop(model, None)
+            return
+        self.status[model] = "failed"
+
+    async def resident(self) -> Dict[str, bool]:
+        """
+        Проверяет, какие модели сейчас загружены в память Ollama
+
+        Returns:
+            Dict[str, bool]: Признак загруженности для каждой модели; если Ollama недоступна, все False
+        """
+        try:
+            response = await self._client.get("/api/ps", timeout=2.0)
+            response.raise_for_status()
+            loaded = {
+                _normalize_model_name(entry.get(field, ""))
+                for entry in response.json().get("models", [])
+                for field in ("name", "model")
+            }
+        except (httpx.HTTPError, ValueError):
+            loaded = set()
+        return {model: _normalize_model_name(model) in loaded for model in self.models}
+
+    async def close(self) -> None:
+        """Останавливает прогрев и закрывает HTTP-клиент"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        await self._client.aclose()
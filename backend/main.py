@@ -1,14 +1,129 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 
 from interview_assistant.core.config import (
     APP_TITLE,
     CORS_ORIGINS,
     CORS_ALLOW_CREDENTIALS,
     CORS_ALLOW_METHODS,
-    CORS_ALLOW_HEADERS
+    CORS_ALLOW_HEADERS,
+    CORS_EXPOSE_HEADERS,
+    CACHE_ENABLED,
+    CACHE_DB_URL,
+    CACHE_MAX_MEMORY_ENTRIES,
+    CACHE_GENERATION_CHECK_INTERVAL,
+    GZIP_MIN_SIZE,
+    OLLAMA_MAX_CONCURRENCY,
+    JOB_QUEUE_LIMIT,
+    JOB_RESULT_LIMIT,
+    JOB_RESULT_TTL,
+    MODEL_TIERS,
+    OLLAMA_BASE_URL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_CTX_BUCKETS,
+    OLLAMA_REQUEST_TIMEOUT,
+    STAGE_MODEL_TIERS,
+    VOICE_ENABLED,
+    VOICE_MAX_CONCURRENCY,
+    VOICE_WORKERS,
+    VOSK_MODEL_PATH,
+    WARMUP_ENABLED,
 )
+from interview_assistant.api.admin import router as admin_router
+from interview_assistant.api.metrics import router as metrics_router
+from interview_assistant.api.middleware import DecompressionMiddleware, MetricsMiddleware
 from interview_assistant.api.routers import router
+from interview_assistant.api.voice import router as voice_router
+from interview_assistant.core.metrics import COMPONENTS
+from interview_assistant.service.cache import SolutionCache
+from interview_assistant.service.jobs import JobScheduler, QueueFullError
+from interview_assistant.service.llm_service import LLMService, create_llm
+from interview_assistant.service.model_router import ModelRouter
+from interview_assistant.service.warmup import ModelWarmup
+from voice_assistant.recognizer_pool import RecognizerPool
+from voice_assistant.voice_model import VoiceModel
+
+async def queue_full_handler(request: Request, exc: QueueFullError) -> JSONResponse:
+    """Переполнение очереди к модели отдается как 429 с подсказкой, когда повторить запрос"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+def register_component_metrics(app: FastAPI) -> None:
+    """Публикует счетчики планировщика, single-flight и распознавания речи в /metrics"""
+    scheduler = app.state.scheduler
+    queue_depth = COMPONENTS.gauge("llm_scheduler_slots", "Model slots by state", ("state",))
+    queue_depth.set_function(lambda: scheduler.active, state="active")
+    queue_depth.set_function(lambda: scheduler.queued, state="queued")
+    scheduler_events = COMPONENTS.counter("llm_scheduler_events_total", "Scheduler admissions and rejections", ("event",))
+    for event in ("admitted", "rejected", "completed_jobs", "failed_jobs"):
+        scheduler_events.set_function(lambda event=event: scheduler.stats[event], event=event)
+
+    singleflight = app.state.llm_service.singleflight
+    coalescing = COMPONENTS.counter("llm_singleflight_total", "Generations started versus coalesced", ("role",))
+    for role in ("leaders", "coalesced"):
+        coalescing.set_function(lambda role=role: singleflight.stats[role], role=role)
+
+    pool = app.state.voice_model.pool
+    recognizer_slots = COMPONENTS.gauge("voice_recognizer_slots", "Speech recognition jobs by state", ("state",))
+    recognizer_slots.set_function(lambda: pool.active, state="active")
+    recognizer_slots.set_function(lambda: pool.waiting, state="queued")
+    recognizer_jobs = COMPONENTS.counter("voice_recognizer_jobs_total", "Finished speech recognition jobs", ("result",))
+    for result in ("completed", "failed"):
+        recognizer_jobs.set_function(lambda result=result: pool.stats[result], result=result)
+    COMPONENTS.counter("voice_recognizer_wait_seconds_total", "Time recognition jobs spent queued").set_function(
+        lambda: pool.stats["wait_seconds"]
+    )
+    COMPONENTS.counter("voice_recognizer_busy_seconds_total", "Time spent recognizing speech").set_function(
+        lambda: pool.stats["busy_seconds"]
+    )
+
+def register_cache_metrics(cache: SolutionCache) -> None:
+    """Публикует счетчики кэша решений в /metrics"""
+    cache_events = COMPONENTS.counter("solution_cache_events_total", "Solution cache lookups and maintenance", ("event",))
+    for event in cache.stats:
+        cache_events.set_function(lambda event=event: cache.stats[event], event=event)
+    COMPONENTS.gauge("solution_cache_memory_entries", "Entries in the in-memory cache tier").set_function(
+        lambda: cache.snapshot()["memory_entries"]
+    )
+
+async def load_voice_model(voice_model: VoiceModel) -> None:
+    """Загружает модель распознавания речи; без нее недоступен только /ws/recognize"""
+    try:
+        await voice_model.init_model(VOSK_MODEL_PATH)
+    except RuntimeError as e:
+        print(f"Voice recognition is disabled: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Открывает кэш решений, прогревает модели в фоне при старте
+    и останавливает прогрев при завершении
+    """
+    if CACHE_ENABLED:
+        # База создается при старте сервера, а не при импорте модуля
+        cache = await asyncio.to_thread(
+            SolutionCache, CACHE_DB_URL, CACHE_MAX_MEMORY_ENTRIES, CACHE_GENERATION_CHECK_INTERVAL
+        )
+        app.state.solution_cache = app.state.llm_service.cache = cache
+        register_cache_metrics(cache)
+    if WARMUP_ENABLED:
+        app.state.warmup.start()
+    voice_loading = asyncio.create_task(load_voice_model(app.state.voice_model)) if VOICE_ENABLED else None
+    yield
+    if voice_loading is not None:
+        voice_loading.cancel()
+    app.state.voice_model.pool.close()
+    await app.state.warmup.close()
+    if app.state.solution_cache is not None:
+        app.state.solution_cache.close()
 
 def create_application() -> FastAPI:
     """
@@ -18,7 +133,12 @@ def create_application() -> FastAPI:
         FastAPI: Настроенное приложение
     """
     # Инициализация FastAPI
-    app = FastAPI(title=APP_TITLE)
+    app = FastAPI(title=APP_TITLE, lifespan=lifespan)
+
+    # Распаковка сжатых тел запросов и сжатие ответов gzip.
+    # Потоки text/event-stream GZipMiddleware не сжимает, так что SSE уходит без задержек
+    app.add_middleware(DecompressionMiddleware)
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
     
     # Настройка CORS
     app.add_middleware(
@@ -27,10 +147,44 @@ def create_application() -> FastAPI:
         allow_credentials=CORS_ALLOW_CREDENTIALS,
         allow_methods=CORS_ALLOW_METHODS,
         allow_headers=CORS_ALLOW_HEADERS,
+        expose_headers=CORS_EXPOSE_HEADERS,
     )
+
+    # Метрики и заголовки Server-Timing для каждого запроса
+    app.add_middleware(MetricsMiddleware)
     
+    # Кэш решений: LRU в памяти поверх общей базы SQLite; открывается в lifespan
+    app.state.solution_cache = None
+
+    # Планировщик ограничивает число одновременных вызовов модели
+    app.state.scheduler = JobScheduler(OLLAMA_MAX_CONCURRENCY, JOB_QUEUE_LIMIT, JOB_RESULT_TTL, JOB_RESULT_LIMIT)
+    app.add_exception_handler(QueueFullError, queue_full_handler)
+
+    # Общие клиенты моделей с пулом соединений на все время жизни приложения
+    # создаются при первом обращении; роутер выбирает уровень модели для каждого этапа
+    app.state.model_router = ModelRouter(MODEL_TIERS, STAGE_MODEL_TIERS, app.state.scheduler, create_llm)
+    app.state.llm_service = LLMService(app.state.model_router, app.state.scheduler, app.state.solution_cache)
+
+    # Модели этапов загружаются в память Ollama в фоне, готовность отдает /ready
+    app.state.warmup = ModelWarmup(
+        app.state.model_router.stage_models(),
+        OLLAMA_BASE_URL,
+        OLLAMA_KEEP_ALIVE,
+        OLLAMA_REQUEST_TIMEOUT,
+        num_ctx=OLLAMA_NUM_CTX_BUCKETS[0],
+    )
+    
+    # Модель Vosk для потокового распознавания речи загружается в фоне при старте;
+    # распознавание идет в пуле потоков по числу ядер
+    app.state.voice_model = VoiceModel(RecognizerPool(VOICE_WORKERS, VOICE_MAX_CONCURRENCY))
+
+    register_component_metrics(app)
+
     # Подключение маршрутов
     app.include_router(router)
+    app.include_router(voice_router)
+    app.include_router(admin_router)
+    app.include_router(metrics_router)
     
     return app
 
@@ -0,0 +1,241 @@
+import os
+import re
+import struct
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Частота, на которой обучены модели Vosk, если в conf/mfcc.conf модели не указано другое
+DEFAULT_SAMPLE_RATE = 16000
+# Размер порции для распознавателя в отсчетах (0.25 с при 16 кГц)
+CHUNK_FRAMES = 4000
+
+# Форматы отсчетов: имя как у ffmpeg -> размер в байтах
+SAMPLE_WIDTHS = {
+    "u8": 1,
+    "s16le": 2,
+    "s24le": 3,
+    "s32le": 4,
+    "f32le": 4,
+    "f64le": 8,
+}
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+_SAMPLE_FREQUENCY = re.compile(r"--sample-frequency=(\d+)")
+
+
+def frame_size(sample_format: str, channels: int) -> int:
+    """Размер одного кадра (отсчет всех каналов) в байтах"""
+    if sample_format not in SAMPLE_WIDTHS:
+        raise ValueError(f"Unsupported sample format {sample_format}; expected one of {', '.join(SAMPLE_WIDTHS)}")
+    if channels < 1:
+        raise ValueError("channels must be positive")
+    return SAMPLE_WIDTHS[sample_format] * channels
+
+
+def parse_wav(data: Buffer) -> Tuple[memoryview, int, int, str]:
+    """
+    Разбирает заголовок WAV без копирования данных
+
+    В отличие от модуля wave, понимает отсчеты с плавающей точкой
+    и WAVE_FORMAT_EXTENSIBLE, а также файлы, записанные потоком
+    с неверной длиной блока данных.
+
+    Returns:
+        Tuple[memoryview, int, int, str]: Отсчеты, частота, число каналов и формат отсчетов
+
+    Raises:
+        ValueError: Файл не является WAV или формат не поддерживается
+    """
+    view = memoryview(data).cast("B")
+    if len(view) < 12 or view[:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise ValueError("Invalid audio file: not a RIFF/WAVE file")
+
+    fmt = None
+    position = 12
+    while position + 8 <= len(view):
+        chunk_id = bytes(view[position:position + 4])
+        (size,) = struct.unpack_from("<I", view, position + 4)
+        body_start = position + 8
+        if chunk_id == b"fmt ":
+            if size < 16 or body_start + 16 > len(view):
+                raise ValueError(f"Invalid audio file: truncated fmt chunk ({size} bytes)")
+            fmt = struct.unpack_from("<HHIIHH", view, body_start)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 40:
+                if body_start + 26 > len(view):
+                    raise ValueError("Invalid audio file: truncated WAVE_FORMAT_EXTENSIBLE header")
+                # Настоящий формат — первые два байта GUID подформата
+                (subformat,) = struct.unpack_from("<H", view, body_start + 24)
+                fmt = (subformat,) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("Invalid audio file: data chunk before fmt chunk")
+            # Программы, пишущие WAV потоком, оставляют в длине 0 или 0xFFFFFFFF
+            end = len(view) if size in (0, 0xFFFFFFFF) else min(len(view), body_start + size)
+            audio_format, channels, sample_rate, _, _, bits = fmt
+            if sample_rate <= 0 or channels < 1:
+                raise ValueError(f"Invalid audio file: {sample_rate} Hz, {channels} channels")
+            return view[body_start:end], sample_rate, channels, _wav_sample_format(audio_format, bits)
+        position = body_start + size + (size & 1)
+    raise ValueError("Invalid audio file: no data chunk")
+
+
+def _wav_sample_format(audio_format: int, bits: int) -> str:
+    if audio_format == _WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+        return "u8" if bits == 8 else f"s{bits}le"
+    if audio_format == _WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        return f"f{bits}le"
+    raise ValueError(f"Unsupported WAV encoding: format {audio_format:#06x}, {bits} bits")
+
+
+def decode_samples(raw: Buffer, sample_format: str, channels: int) -> np.ndarray:
+    """
+    Переводит отсчеты в float32 в диапазоне [-1, 1] формы (кадры, каналы)
+
+    Буфер читается через np.frombuffer без копирования; неполный
+    последний кадр отбрасывается.
+    """
+    size = frame_size(sample_format, channels)
+    raw = memoryview(raw).cast("B")
+    usable = len(raw) - len(raw) % size
+    octets = np.frombuffer(raw, dtype=np.uint8, count=usable)
+    if sample_format == "u8":
+        samples = (octets.astype(np.float32) - 128.0) / 128.0
+    elif sample_format == "s16le":
+        samples = octets.view("<i2").astype(np.float32) / 32768.0
+    elif sample_format == "s24le":
+        # int32 читается с шагом 3 байта, начиная на байт раньше отсчета: отсчет попадает
+        # в старшие три байта, и арифметический сдвиг убирает лишний младший с сохранением знака
+        shifted = np.empty(usable + 1, dtype=np.uint8)
+        shifted[1:] = octets
+        words = np.ndarray((usable // 3,), dtype="<i4", buffer=shifted, strides=(3,))
+        samples = (words >> 8).astype(np.float32) / 8388608.0
+    elif sample_format == "s32le":
+        samples = (octets.view("<i4") / 2147483648.0).astype(np.float32)
+    elif sample_format == "f32le":
+        samples = octets.view("<f4")
+    else:
+        samples = octets.view("<f8").astype(np.float32)
+    return samples.reshape(-1, channels)
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Сводит каналы в моно усреднением"""
+    channels = samples.shape[1]
+    if channels == 1:
+        return samples[:, 0]
+    # Произведение на вектор весов заметно быстрее mean по короткой оси
+    return samples @ np.full(channels, 1.0 / channels, dtype=np.float32)
+
+
+def resample(signal: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """
+    Меняет частоту дискретизации моно сигнала
+
+    Кратное понижение частоты усредняет блоки отсчетов, остальные случаи
+    используют линейную интерполяцию; перед понижением сигнал сглаживается
+    скользящим средним, чтобы ослабить наложение частот.
+    """
+    if rate == target_rate or len(signal) == 0:
+        return signal
+    if rate > target_rate and rate % target_rate == 0:
+        factor = rate // target_rate
+        usable = len(signal) - len(signal) % factor
+        return signal[:usable].reshape(-1, factor) @ np.full(factor, 1.0 / factor, dtype=np.float32)
+    if rate > target_rate:
+        width = int(round(rate / target_rate))
+        if width > 1:
+            signal = np.convolve(signal, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    count = int(len(signal) * target_rate // rate)
+    positions = np.arange(count, dtype=np.float64) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(signal), dtype=np.float64), signal).astype(np.float32)
+
+
+def to_pcm16(signal: np.ndarray) -> np.ndarray:
+    """Переводит float сигнал в 16-битные отсчеты с насыщением"""
+    return np.clip(np.rint(signal * 32767.0), -32768, 32767).astype(np.int16)
+
+
+def convert_frames(raw: Buffer, sample_format: str, channels: int) -> Buffer:
+    """Переводит целые кадры в моно 16 бит без смены частоты (для потокового распознавания)"""
+    if sample_format == "s16le" and channels == 1:
+        return raw
+    return to_pcm16(downmix(decode_samples(raw, sample_format, channels))).data
+
+
+def ingest(
+    data: Buffer,
+    target_rate: int,
+    sample_rate: Optional[int] = None,
+    channels: int = 1,
+    sample_format: str = "s16le",
+) -> np.ndarray:
+    """
+    Приводит загруженное аудио к моно 16 бит с частотой распознавателя
+
+    Args:
+        data: WAV файл или сырой PCM
+        target_rate: Частота, с которой создан распознаватель
+        sample_rate: Частота сырого PCM; для WAV берется из заголовка
+        channels: Число каналов сырого PCM
+        sample_format: Формат отсчетов сырого PCM (см. SAMPLE_WIDTHS)
+
+    Returns:
+        np.ndarray: Отсчеты int16
+
+    Raises:
+        ValueError: Формат не поддерживается или не задана частота сырого PCM
+    """
+    view = memoryview(data).cast("B")
+    if view[:4] == b"RIFF":
+        raw, sample_rate, channels, sample_format = parse_wav(view)
+    elif sample_rate is None:
+        raise ValueError("sample_rate is required for raw PCM")
+    else:
+        raw = view
+
+    if sample_format == "s16le" and channels == 1 and sample_rate == target_rate:
+        # Уже нужный формат: отсчеты используются прямо из буфера
+        usable = len(raw) - len(raw) % 2
+        return np.frombuffer(raw, dtype="<i2", count=usable // 2)
+    signal = downmix(decode_samples(raw, sample_format, channels))
+    return to_pcm16(resample(signal, sample_rate, target_rate))
+
+
+def iter_chunks(pcm: np.ndarray, chunk_frames: int = CHUNK_FRAMES) -> Iterator[memoryview]:
+    """Режет отсчеты на порции для распознавателя без копирования"""
+    view = memoryview(np.ascontiguousarray(pcm, dtype="<i2")).cast("B")
+    step = chunk_frames * 2
+    for start in range(0, len(view), step):
+        yield view[start:start + step]
+
+
+# Принимает ли AcceptWaveform memoryview без копии (зависит от версии привязки vosk)
+_accepts_memoryview: Optional[bool] = None
+
+
+def accept_waveform(recognizer, chunk: memoryview) -> bool:
+    """Передает порцию распознавателю, по возможности без копирования в bytes"""
+    global _accepts_memoryview
+    if _accepts_memoryview is not False:
+        try:
+            result = recognizer.AcceptWaveform(chunk)
+            _accepts_memoryview = True
+            return result
+        except TypeError:
+            _accepts_memoryview = False
+    return recognizer.AcceptWaveform(chunk.tobytes())
+
+
+def read_sample_rate(model_path: str) -> int:
+    """Частота дискретизации модели из conf/mfcc.conf"""
+    try:
+        with open(os.path.join(model_path, "conf", "mfcc.conf"), encoding="utf-8") as f:
+            match = _SAMPLE_FREQUENCY.search(f.read())
+    except OSError:
+        return DEFAULT_SAMPLE_RATE
+    return int(match.group(1)) if match else DEFAULT_SAMPLE_RATE
@@ -0,0 +1,20 @@
+"""Каталог моделей Vosk; модуль без зависимостей, чтобы реестр моделей не тянул загрузчик"""
+import os
+
+MODELS = {
+    "small-ru": {
+        "url": "https://alphacephei.com/vosk/models/vosk-model-small-ru-0.22.zip",
+        "dir": "vosk-model-small-ru-0.22"
+    },
+    "ru": {
+        "url": "https://alphacephei.com/vosk/models/vosk-model-ru-0.42.zip",
+        "dir": "vosk-model-ru-0.42"
+    },
+    "small-en": {
+        "url": "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip",
+        "dir": "vosk-model-small-en-us-0.15"
+    }
+}
+
+# Каталог, куда download_model кладет модели
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
@@ -1,32 +1,348 @@
-import asyncio
+import argparse
+import hashlib
+import json
 import os
-import requests
+import shutil
+import tempfile
+import threading
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
 from tqdm import tqdm
 
-MODELS = {
-    "small-ru": {
-        "url": "https://alphacephei.com/vosk/models/vosk-model-small-ru-0.22.zip",
-        "dir": "vosk-model-small-ru-0.22"
-    },
-    "ru": {
-        "url": "https://alphacephei.com/vosk/models/vosk-model-ru-0.42.zip",
-        "dir": "vosk-model-ru-0.42"
-    },
-    "small-en": {
-        "url": "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip",
-        "dir": "vosk-model-small-en-us-0.15"
-    }
-}
-
-def download_model(model_name: str = "small-ru", models_dir: str = "models"):
+try:
+    from .catalog import MODELS, MODELS_DIR
+except ImportError:
+    # Запуск как скрипта: python download_model.py
+    from catalog import MODELS, MODELS_DIR
+
+# Число параллельных запросов с Range
+DOWNLOAD_WORKERS = int(os.getenv("VOSK_DOWNLOAD_WORKERS", "4"))
+# Размер буфера чтения из сокета и записи на диск
+CHUNK_SIZE = 1024 * 1024
+# Архивы меньше этого размера на части не делятся
+MIN_SEGMENT_SIZE = 8 * 1024 * 1024
+# Как часто (в байтах на часть) сохранять прогресс для возобновления
+CHECKPOINT_BYTES = 16 * 1024 * 1024
+# Файл в каталоге модели со списком распакованных файлов и контрольной суммой архива
+MANIFEST_NAME = ".vosk-manifest.json"
+
+
+class _Progress:
+    """Состояние частичной загрузки, сохраняемое рядом с архивом"""
+
+    def __init__(self, path: str, url: str, size: int, validator: Optional[str], segments: List[List[int]]):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.validator = validator
+        # [начало, конец (не включая), уже записано от начала]
+        self.segments = segments
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, url: str, size: int, validator: Optional[str]) -> Optional["_Progress"]:
+        """Прогресс прошлой загрузки, если она шла с того же URL и файл на сервере не менялся"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != size or state.get("validator") != validator:
+            return None
+        return cls(path, url, size, validator, state["segments"])
+
+    def advance(self, index: int, written: int) -> None:
+        with self._lock:
+            self.segments[index][2] = written
+
+    def save(self) -> None:
+        # Запись через временный файл: оборванное сохранение не портит прошлый прогресс
+        with self._lock:
+            state = {"url": self.url, "size": self.size, "validator": self.validator, "segments": self.segments}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+
+    @property
+    def downloaded(self) -> int:
+        return sum(done for _, _, done in self.segments)
+
+
+def _split(size: int, workers: int) -> List[List[int]]:
+    count = max(1, min(workers, size // MIN_SEGMENT_SIZE))
+    step = -(-size // count)
+    return [[start, min(start + step, size), 0] for start in range(0, size, step)]
+
+
+def _fetch_segment(
+    session: requests.Session,
+    url: str,
+    fd: int,
+    progress: _Progress,
+    index: int,
+    bar: tqdm,
+) -> None:
+    start, end, done = progress.segments[index]
+    if start + done >= end:
+        return
+    headers = {"Range": f"bytes={start + done}-{end - 1}"}
+    with session.get(url, headers=headers, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise RuntimeError("Server ignored the Range header")
+        since_checkpoint = 0
+        for data in response.iter_content(chunk_size=CHUNK_SIZE):
+            remaining = end - start - done
+            if len(data) > remaining:
+                data = data[:remaining]
+            os.pwrite(fd, data, start + done)
+            done += len(data)
+            since_checkpoint += len(data)
+            progress.advance(index, done)
+            bar.update(len(data))
+            if since_checkpoint >= CHECKPOINT_BYTES:
+                # Прогресс сохраняется только после того, как данные дошли до диска
+                os.fsync(fd)
+                progress.save()
+                since_checkpoint = 0
+            if start + done >= end:
+                break
+    if start + done < end:
+        raise RuntimeError(f"Connection closed at byte {start + done} of range {start}-{end - 1}")
+
+
+def _fetch_whole(session: requests.Session, url: str, part_path: str, bar: tqdm) -> None:
+    """Загрузка одним потоком для серверов без поддержки Range"""
+    with session.get(url, stream=True, timeout=60) as response, open(part_path, "wb") as f:
+        response.raise_for_status()
+        for data in response.iter_content(chunk_size=CHUNK_SIZE):
+            bar.update(f.write(data))
+
+
+def fetch(
+    url: str,
+    dest: str,
+    workers: int = DOWNLOAD_WORKERS,
+    session: Optional[requests.Session] = None,
+    desc: Optional[str] = None,
+) -> str:
+    """
+    Скачивает файл параллельными запросами с Range и с возобновлением
+
+    Файл делится на части по числу workers, каждая часть пишется в свое
+    место заранее выделенного dest + ".part". Прогресс частей сохраняется
+    в dest + ".part.json"; при повторном запуске скачиваются только
+    недостающие байты, если ETag/Last-Modified и размер на сервере не
+    изменились. Если сервер не поддерживает Range, файл качается целиком.
+
+    Args:
+        url: Адрес файла
+        dest: Путь, куда положить файл по окончании загрузки
+        workers: Число параллельных запросов
+        session: Сессия requests (например, с настроенными прокси)
+        desc: Подпись для прогресс-бара
+
+    Returns:
+        str: dest
+
+    Raises:
+        RuntimeError: Загрузка оборвалась; скачанная часть сохраняется для возобновления
+    """
+    session = session or requests.Session()
+    part_path = dest + ".part"
+    state_path = part_path + ".json"
+
+    head = session.head(url, allow_redirects=True, timeout=30)
+    if head.ok:
+        url = head.url
+    size = int(head.headers.get("content-length", 0)) if head.ok else 0
+    validator = head.headers.get("etag") or head.headers.get("last-modified")
+    ranges = head.ok and head.headers.get("accept-ranges", "").lower() == "bytes" and size > 0
+
+    with tqdm(desc=desc or os.path.basename(dest), total=size or None, unit="iB", unit_scale=True, unit_divisor=1024) as bar:
+        if not ranges:
+            _fetch_whole(session, url, part_path, bar)
+            os.replace(part_path, dest)
+            return dest
+
+        progress = _Progress.load(state_path, url, size, validator) if os.path.exists(part_path) else None
+        if progress is None:
+            progress = _Progress(state_path, url, size, validator, _split(size, workers))
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+        bar.update(progress.downloaded)
+
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            with ThreadPoolExecutor(max_workers=len(progress.segments)) as executor:
+                futures = [
+                    executor.submit(_fetch_segment, session, url, fd, progress, index, bar)
+                    for index in range(len(progress.segments))
+                ]
+                errors = [future.exception() for future in futures]
+        finally:
+            # Прогресс сохраняется только после того, как данные дошли до диска
+            os.fsync(fd)
+            os.close(fd)
+            progress.save()
+
+    failed = next((error for error in errors if error is not None), None)
+    if failed is not None:
+        raise RuntimeError(f"Download interrupted at {progress.downloaded} of {size} bytes: {failed}") from failed
+    os.replace(part_path, dest)
+    os.remove(state_path)
+    return dest
+
+
+def sha256sum(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def verify_archive(zip_path: str, sha256: Optional[str] = None) -> str:
+    """
+    Проверяет архив: контрольную сумму, если она известна, и CRC всех файлов
+
+    Returns:
+        str: SHA-256 архива
+
+    Raises:
+        ValueError: Контрольная сумма не совпала или архив поврежден
+    """
+    digest = sha256sum(zip_path)
+    if sha256 is not None and digest != sha256.lower():
+        raise ValueError(f"Checksum mismatch for {zip_path}: expected {sha256}, got {digest}")
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            broken = archive.testzip()
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Corrupted archive {zip_path}: {e}") from e
+    if broken is not None:
+        raise ValueError(f"Corrupted archive {zip_path}: bad CRC in {broken}")
+    return digest
+
+
+def extract_atomic(zip_path: str, model_path: str, top_dir: str, digest: str) -> str:
+    """
+    Распаковывает модель во временный каталог и переименовывает его в model_path
+
+    Каталог модели появляется целиком или не появляется вовсе: прерванная
+    распаковка оставляет только временный каталог, который удаляется.
+    В каталог кладется манифест с размерами файлов для проверки при
+    следующем запуске.
+    """
+    models_dir = os.path.dirname(model_path)
+    staging = tempfile.mkdtemp(prefix=f".{top_dir}-", dir=models_dir)
+    try:
+        root = os.path.realpath(staging)
+        files: Dict[str, int] = {}
+        with zipfile.ZipFile(zip_path) as archive:
+            for info in archive.infolist():
+                target = os.path.realpath(os.path.join(staging, info.filename))
+                if not target.startswith(root + os.sep):
+                    raise ValueError(f"Archive entry {info.filename} escapes the target directory")
+                if info.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with archive.open(info) as src, open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                files[os.path.relpath(target, root)] = info.file_size
+
+        # Архивы Vosk содержат один каталог верхнего уровня с именем модели
+        extracted = os.path.join(root, top_dir)
+        if not os.path.isdir(extracted):
+            extracted = root
+        manifest = {
+            "sha256": digest,
+            "files": {
+                os.path.relpath(os.path.join(root, name), extracted): size
+                for name, size in files.items()
+                if os.path.join(root, name).startswith(extracted + os.sep)
+            },
+        }
+        with open(os.path.join(extracted, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        if os.path.exists(model_path):
+            # Поврежденная установка убирается в сторону, чтобы место освободилось одним rename
+            stale = tempfile.mkdtemp(prefix=f".{top_dir}-stale-", dir=models_dir)
+            os.rename(model_path, os.path.join(stale, top_dir))
+            shutil.rmtree(stale, ignore_errors=True)
+        os.rename(extracted, model_path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return model_path
+
+
+def is_model_valid(model_path: str, sha256: Optional[str] = None) -> bool:
+    """
+    Проверяет, что модель установлена полностью
+
+    Установленные этим скриптом модели сверяются с манифестом: все файлы
+    на месте и их размеры совпадают (и совпадает контрольная сумма архива,
+    если она задана). Каталоги без манифеста, установленные вручную,
+    считаются моделью, если в них есть conf/.
+    """
+    if not os.path.isdir(model_path):
+        return False
+    manifest_path = os.path.join(model_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return sha256 is None and os.path.isdir(os.path.join(model_path, "conf"))
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if sha256 is not None and manifest.get("sha256") != sha256.lower():
+        return False
+    for name, size in manifest.get("files", {}).items():
+        path = os.path.join(model_path, name)
+        if not os.path.isfile(path) or os.path.getsize(path) != size:
+            return False
+    return True
+
+
+def download_model(
+    model_name: str = "small-ru",
+    models_dir: str = MODELS_DIR,
+    url: Optional[str] = None,
+    sha256: Optional[str] = None,
+    workers: int = DOWNLOAD_WORKERS,
+    session: Optional[requests.Session] = None,
+) -> str:
     """
     Автоматически скачивает и распаковывает выбранную модель
+
+    Если модель уже установлена и проходит проверку, загрузка пропускается.
+    Архив качается параллельно с возобновлением (см. fetch), проверяется
+    и распаковывается атомарно (см. extract_atomic), после чего удаляется.
+    При ошибке загрузки частично скачанный архив остается для следующего запуска.
+
+    Args:
+        model_name: Имя модели из MODELS
+        models_dir: Каталог с моделями
+        url: Адрес архива вместо указанного в MODELS (зеркало или локальный сервер)
+        sha256: Ожидаемая контрольная сумма архива, по умолчанию из MODELS
+        workers: Число параллельных запросов
+        session: Сессия requests
+
+    Returns:
+        str: Путь к каталогу модели
+
+    Raises:
+        ValueError: Неизвестная модель или архив не прошел проверку
+        RuntimeError: Ошибка загрузки
     """
     if model_name not in MODELS:
         raise ValueError(f"Доступные модели: {', '.join(MODELS.keys())}")
 
     model_info = MODELS[model_name]
+    sha256 = sha256 or model_info.get("sha256")
     model_path = os.path.join(models_dir, model_info['dir'])
     zip_path = os.path.join(models_dir, f"{model_name}.zip")
 
@@ -34,49 +350,42 @@ def download_model(model_name: str = "small-ru", models_dir: str = "models"):
     os.makedirs(models_dir, exist_ok=True)
 
     # Проверяем, не скачана ли уже модель
-    if os.path.exists(model_path):
+    if is_model_valid(model_path, sha256):
         print(f"Модель {model_name} уже установлена")
         return model_path
 
-    print(f"Скачивание модели {model_name}...")
-    
+    if not os.path.exists(zip_path):
+        print(f"Скачивание модели {model_name}...")
+        try:
+            fetch(url or model_info['url'], zip_path, workers, session, desc=model_name)
+        except (requests.RequestException, OSError) as e:
+            raise RuntimeError(f"Ошибка загрузки модели: {str(e)}") from e
+
+    print("Проверка и распаковка...")
     try:
-        # Загрузка с прогресс-баром
-        response = requests.get(model_info['url'], stream=True)
-        total_size = int(response.headers.get('content-length', 0))
-        
-        with open(zip_path, 'wb') as f, tqdm(
-            desc=model_name,
-            total=total_size,
-            unit='iB',
-            unit_scale=True,
-            unit_divisor=1024,
-        ) as bar:
-            for data in response.iter_content(chunk_size=1024):
-                size = f.write(data)
-                bar.update(size)
-
-        # Распаковка
-        print("Распаковка...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(models_dir)
-
-        # Удаление ZIP-архива
+        digest = verify_archive(zip_path, sha256)
+    except ValueError:
+        # Поврежденный архив не пригоден и для возобновления
         os.remove(zip_path)
-        
-        print(f"Модель {model_name} успешно установлена в {model_path}")
-        return model_path
+        raise
+    extract_atomic(zip_path, model_path, model_info['dir'], digest)
+
+    # Удаление ZIP-архива
+    os.remove(zip_path)
 
-    except Exception as e:
-        # Удаляем частично скачанные файлы при ошибке
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
-        raise RuntimeError(f"Ошибка загрузки модели: {str(e)}")
+    print(f"Модель {model_name} успешно установлена в {model_path}")
+    return model_path
 
 
-async def main():
-    path = download_model("small-ru")
+def main():
+    parser = argparse.ArgumentParser(description="Скачивание моделей Vosk")
+    parser.add_argument("model", nargs="?", default="small-ru", choices=list(MODELS))
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--url", default=None, help="Адрес архива вместо указанного в MODELS")
+    parser.add_argument("--sha256", default=None, help="Ожидаемая контрольная сумма архива")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS)
+    args = parser.parse_args()
+    download_model(args.model, args.models_dir, args.url, args.sha256, args.workers)
 
 if __name__ == "__main__":
-    
-    asyncio.run(main())
\ No newline at end of file
+    main()
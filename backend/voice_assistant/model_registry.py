@@ -0,0 +1,70 @@
+import os
+import threading
+from typing import TYPE_CHECKING, Dict
+
+from .catalog import MODELS, MODELS_DIR
+
+if TYPE_CHECKING:
+    from vosk import Model
+
+class ModelRegistry:
+    """
+    Общий на процесс реестр моделей Vosk
+
+    Модель занимает сотни мегабайт и загружается секунды, поэтому каждый
+    каталог загружается один раз, а все VoiceModel и распознаватели
+    используют один экземпляр. Модель только читается при распознавании,
+    так что разделять ее между потоками безопасно.
+    """
+
+    def __init__(self, models_dir: str = MODELS_DIR):
+        self.models_dir = models_dir
+        self._models: Dict[str, "Model"] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def resolve(self, name_or_path: str) -> str:
+        """Переводит имя из download_model.MODELS в путь к каталогу модели"""
+        if name_or_path in MODELS:
+            return os.path.join(self.models_dir, MODELS[name_or_path]["dir"])
+        return os.path.abspath(name_or_path)
+
+    def get(self, name_or_path: str) -> "Model":
+        """
+        Возвращает загруженную модель, загружая ее при первом обращении
+
+        Args:
+            name_or_path: Имя модели из download_model.MODELS или путь к каталогу
+
+        Returns:
+            Model: Общий экземпляр модели
+
+        Raises:
+            FileNotFoundError: Каталог модели не найден
+        """
+        path = self.resolve(name_or_path)
+        with self._guard:
+            if path in self._models:
+                return self._models[path]
+            lock = self._locks.setdefault(path, threading.Lock())
+        # Одна модель грузится одним потоком, остальные ждут ее, не блокируя другие модели
+        with lock:
+            if path not in self._models:
+                if not os.path.exists(path):
+                    raise FileNotFoundError(f"Model path {path} not found")
+                from vosk import Model
+
+                self._models[path] = Model(path)
+        return self._models[path]
+
+    def loaded(self) -> list:
+        """Пути загруженных моделей"""
+        return list(self._models)
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    """Возвращает реестр моделей процесса"""
+    return _registry
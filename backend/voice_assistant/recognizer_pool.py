@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RecognizerPool:
+    """
+    Пул потоков для распознавания речи вне цикла событий
+
+    AcceptWaveform нагружает CPU, поэтому распознавание идет в отдельных
+    потоках. Kaldi отпускает GIL на время вызова, так что потоки работают
+    на разных ядрах и при этом используют одну общую модель из реестра
+    (процессам пришлось бы загружать модель каждому свою). Семафор
+    ограничивает число одновременных распознаваний, остальные ждут
+    в очереди; счетчики очереди публикуются в /metrics.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_concurrency: Optional[int] = None):
+        """
+        Args:
+            workers: Число потоков, по умолчанию по числу ядер
+            max_concurrency: Сколько распознаваний выполняется одновременно, по умолчанию workers
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency or self.workers
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recognizer")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.active = 0
+        self.stats: Dict[str, float] = {
+            "completed": 0,
+            "failed": 0,
+            "wait_seconds": 0.0,
+            "busy_seconds": 0.0,
+        }
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """
+        Выполняет func(*args) в пуле, дождавшись свободного места
+
+        Returns:
+            T: Результат func
+        """
+        if self._semaphore is None:
+            # Семафор создается в цикле событий приложения при первом вызове
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        queued = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.monotonic()
+        self.stats["wait_seconds"] += started - queued
+        self.active += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            self.stats["completed"] += 1
+            return result
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self.active -= 1
+            self.stats["busy_seconds"] += time.monotonic() - started
+            self._semaphore.release()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_pool: Optional[RecognizerPool] = None
+
+
+def get_default_pool() -> RecognizerPool:
+    """Пул по числу ядер для VoiceModel, созданных без своего пула"""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = RecognizerPool()
+    return _default_pool
@@ -1,23 +1,70 @@
-from voice_model_interface import VoiceModelInterface
-from vosk import Model, KaldiRecognizer
-import wave
+from .voice_model_intreface import VoiceModelInterface
+from .model_registry import get_registry
+from .recognizer_pool import RecognizerPool, get_default_pool
+from .audio import DEFAULT_SAMPLE_RATE, accept_waveform, convert_frames, ingest, iter_chunks, read_sample_rate
+import asyncio
 import json
 import os
-from typing import Optional
+from typing import TYPE_CHECKING, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from vosk import Model
+
+class RecognitionStream:
+    """Потоковое распознавание одной записи: PCM подается кусками по мере захвата"""
+
+    def __init__(self, model: "Model", sample_rate: int, channels: int = 1, sample_format: str = "s16le"):
+        from vosk import KaldiRecognizer
+
+        self.recognizer = KaldiRecognizer(model, sample_rate)
+        self.channels = channels
+        self.sample_format = sample_format
+        self.segments = []
+
+    def accept(self, pcm: bytes) -> Tuple[bool, str]:
+        """
+        Передает распознавателю очередной кусок PCM из целых кадров
+
+        Отсчеты в другом формате или с несколькими каналами сводятся
+        в моно 16 бит; частота не меняется, распознаватель создан на ней.
+
+        Returns:
+            Tuple[bool, str]: Признак завершенной фразы и ее текст
+                либо текущая частичная гипотеза
+        """
+        pcm = convert_frames(pcm, self.sample_format, self.channels)
+        if accept_waveform(self.recognizer, memoryview(pcm).cast("B")):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            return True, text
+        return False, json.loads(self.recognizer.PartialResult()).get("partial", "")
+
+    def finish(self) -> str:
+        """Завершает распознавание и возвращает весь текст записи"""
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        if text:
+            self.segments.append(text)
+        return " ".join(self.segments).strip()
 
 class VoiceModel(VoiceModelInterface):
-    def __init__(self):
+    def __init__(self, pool: Optional[RecognizerPool] = None):
         super().__init__()
-        self.model: Optional[Model] = None
+        self.model: Optional["Model"] = None
         self.is_active: bool = False
+        # Частота, на которой обучена модель: к ней приводятся загруженные записи
+        self.sample_rate: int = DEFAULT_SAMPLE_RATE
+        # Распознавание идет в общем пуле потоков, а не в цикле событий
+        self.pool = pool or get_default_pool()
         
     async def init_model(self, model_path: str) -> None:
-        """Инициализация модели с проверкой пути"""
+        """Инициализация модели: имя из download_model.MODELS или путь к каталогу"""
         try:
-            if not os.path.exists(model_path):
-                raise FileNotFoundError(f"Model path {model_path} not found")
-                
-            self.model = Model(model_path)
+            # Модель берется из общего реестра: каждый каталог загружается один раз на процесс.
+            # Загрузка занимает секунды и не должна блокировать цикл событий
+            registry = get_registry()
+            self.model = await asyncio.to_thread(registry.get, model_path)
+            self.sample_rate = read_sample_rate(registry.resolve(model_path))
             self.is_active = True
             print(f"Model {model_path} loaded successfully")
         except Exception as e:
@@ -32,30 +79,74 @@ class VoiceModel(VoiceModelInterface):
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file {audio_path} not found")
 
-        try:
-            with wave.open(audio_path, "rb") as wf:
-                if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
-                    raise ValueError("Audio must be WAV format mono PCM")
-                    
-                recognizer = KaldiRecognizer(self.model, wf.getframerate())
-                results = []
-                
-                while True:
-                    data = wf.readframes(4000)
-                    if len(data) == 0:
-                        break
-                    if recognizer.AcceptWaveform(data):
-                        res = json.loads(recognizer.Result())
-                        results.append(res.get("text", ""))
-                
-                final_res = json.loads(recognizer.FinalResult())
-                results.append(final_res.get("text", ""))
-                
-                return " ".join(filter(None, results)).strip()
-                
-        except wave.Error as e:
-            raise ValueError(f"Invalid audio file: {str(e)}") from e
+        return await self.pool.run(self._recognize_file, audio_path)
+
+    async def get_text_from_bytes(
+        self,
+        data: Union[bytes, bytearray, memoryview],
+        sample_rate: Optional[int] = None,
+        channels: int = 1,
+        sample_format: str = "s16le",
+    ) -> str:
+        """
+        Распознает запись из буфера в памяти, без временного файла
+
+        Args:
+            data: WAV любого формата (PCM 8/16/24/32 бит, float) или сырой PCM
+            sample_rate: Частота сырого PCM; для WAV берется из заголовка
+            channels: Число каналов сырого PCM
+            sample_format: Формат отсчетов сырого PCM (s16le, s24le, f32le и т.д.)
+
+        Returns:
+            str: Распознанный текст
+
+        Raises:
+            ValueError: Формат записи не поддерживается
+        """
+        if not self.is_active or self.model is None:
+            raise RuntimeError("Model not initialized. Call init_model() first")
+
+        return await self.pool.run(self._recognize_buffer, data, sample_rate, channels, sample_format)
+
+    def _recognize_file(self, audio_path: str) -> str:
+        """Распознает WAV файл целиком; выполняется в потоке пула"""
+        with open(audio_path, "rb") as f:
+            data = f.read()
+        return self._recognize_buffer(data, None, 1, "s16le")
+
+    def _recognize_buffer(self, data, sample_rate: Optional[int], channels: int, sample_format: str) -> str:
+        """Приводит запись к формату модели и распознает ее целиком; выполняется в потоке пула"""
+        from vosk import KaldiRecognizer
+
+        # Сведение каналов и смена частоты векторизованы в NumPy и идут без копий
+        # там, где запись уже в нужном формате
+        pcm = ingest(data, self.sample_rate, sample_rate, channels, sample_format)
+        recognizer = KaldiRecognizer(self.model, self.sample_rate)
+        results = []
+        for chunk in iter_chunks(pcm):
+            if accept_waveform(recognizer, chunk):
+                res = json.loads(recognizer.Result())
+                results.append(res.get("text", ""))
+
+        final_res = json.loads(recognizer.FinalResult())
+        results.append(final_res.get("text", ""))
+
+        return " ".join(filter(None, results)).strip()
             
     async def get_status(self) -> bool:
         """Статус модели"""
-        return self.is_active and self.model is not None
\ No newline at end of file
+        return self.is_active and self.model is not None
+
+    def create_stream(self, sample_rate: int, channels: int = 1, sample_format: str = "s16le") -> RecognitionStream:
+        """Создает потоковый распознаватель для записи с заданной частотой и форматом"""
+        if not self.is_active or self.model is None:
+            raise RuntimeError("Model not initialized. Call init_model() first")
+        return RecognitionStream(self.model, sample_rate, channels, sample_format)
+
+    async def accept(self, stream: RecognitionStream, pcm: bytes) -> Tuple[bool, str]:
+        """Передает кусок PCM потоковому распознавателю в пуле потоков"""
+        return await self.pool.run(stream.accept, pcm)
+
+    async def finish(self, stream: RecognitionStream) -> str:
+        """Завершает потоковое распознавание в пуле потоков"""
+        return await self.pool.run(stream.finish)
\ No newline at end of file
@@ -13,4 +13,8 @@ class VoiceModelInterface(ABC):
     @abstractmethod
     async def get_status(self) -> bool:
         pass
+
+    @abstractmethod
+    def create_stream(self, sample_rate : int = 16000, channels : int = 1, sample_format : str = "s16le"):
+        pass
     
\ No newline at end of file
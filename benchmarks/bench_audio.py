@@ -0,0 +1,179 @@
+"""
+Бенчмарк приема аудио для распознавания речи
+
+Измеряет пропускную способность подготовки записи к распознавателю
+(разбор WAV, перевод отсчетов, сведение каналов, смена частоты, нарезка
+на порции) в секундах аудио на секунду работы для набора входных
+форматов: моно и стерео, PCM 8/16/24/32 бит и float, частоты 8-48 кГц.
+Записи синтезируются в памяти.
+
+Для моно 16 бит дополнительно замеряется прежний путь через модуль wave
+(readframes по 4000 кадров), который другие форматы не принимал.
+
+Без --model порции отдаются пустому распознавателю, и замеряется только
+прием аудио. С --model путь к модели Vosk — замеряется распознавание целиком.
+
+Запуск:
+    python benchmarks/bench_audio.py
+    python benchmarks/bench_audio.py --seconds 120 --repeat 3 --json
+    python benchmarks/bench_audio.py --model backend/voice_assistant/models/vosk-model-small-ru-0.22
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import struct
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from voice_assistant.audio import (  # noqa: E402
+    CHUNK_FRAMES,
+    DEFAULT_SAMPLE_RATE,
+    SAMPLE_WIDTHS,
+    accept_waveform,
+    ingest,
+    iter_chunks,
+    read_sample_rate,
+)
+
+# (каналы, формат отсчетов, частота)
+FORMATS = [
+    (1, "s16le", 16000),
+    (1, "u8", 8000),
+    (1, "s16le", 44100),
+    (2, "s16le", 44100),
+    (2, "s16le", 48000),
+    (2, "s24le", 48000),
+    (1, "s32le", 32000),
+    (2, "f32le", 48000),
+    (1, "f64le", 22050),
+]
+
+
+class NullRecognizer:
+    """Распознаватель, который только принимает порции"""
+
+    def __init__(self):
+        self.received = 0
+
+    def AcceptWaveform(self, chunk) -> bool:
+        self.received += len(chunk)
+        return False
+
+
+def synthesize(seconds: float, rate: int, channels: int) -> np.ndarray:
+    """Тон с шумом, по каналу на столбец, в диапазоне [-1, 1]"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.5 * np.sin(2 * np.pi * 220.0 * t)
+    return np.stack([tone + 0.05 * rng.standard_normal(len(t)) for _ in range(channels)], axis=1).clip(-1, 1)
+
+
+def encode_wav(signal: np.ndarray, rate: int, sample_format: str) -> bytes:
+    """Кодирует сигнал в WAV заданного формата"""
+    if sample_format == "u8":
+        samples = (signal * 127 + 128).astype(np.uint8).tobytes()
+    elif sample_format == "s16le":
+        samples = (signal * 32767).astype("<i2").tobytes()
+    elif sample_format == "s24le":
+        values = (signal * 8388607).astype("<i4").reshape(-1, 1).view(np.uint8)
+        samples = values[:, :3].tobytes()
+    elif sample_format == "s32le":
+        samples = (signal * 2147483647).astype("<i4").tobytes()
+    elif sample_format == "f32le":
+        samples = signal.astype("<f4").tobytes()
+    else:
+        samples = signal.astype("<f8").tobytes()
+    channels = signal.shape[1]
+    width = SAMPLE_WIDTHS[sample_format]
+    audio_format = 3 if sample_format.startswith("f") else 1
+    fmt = struct.pack("<HHIIHH", audio_format, channels, rate, rate * channels * width, channels * width, width * 8)
+    return (
+        b"RIFF" + struct.pack("<I", 4 + 8 + len(fmt) + 8 + len(samples)) + b"WAVE"
+        + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        + b"data" + struct.pack("<I", len(samples)) + samples
+    )
+
+
+def _recognizer_factory(model_path: str | None, target_rate: int):
+    if model_path is None:
+        return NullRecognizer
+    from vosk import KaldiRecognizer, Model
+
+    model = Model(model_path)
+    return lambda: KaldiRecognizer(model, target_rate)
+
+
+def _ingest_once(data: bytes, target_rate: int, make_recognizer) -> None:
+    recognizer = make_recognizer()
+    for chunk in iter_chunks(ingest(data, target_rate)):
+        accept_waveform(recognizer, chunk)
+
+
+def _wave_once(data: bytes, target_rate: int, make_recognizer) -> None:
+    recognizer = make_recognizer()
+    with wave.open(io.BytesIO(data), "rb") as wf:
+        while True:
+            chunk = wf.readframes(CHUNK_FRAMES)
+            if not chunk:
+                break
+            recognizer.AcceptWaveform(chunk)
+
+
+def measure(func, data: bytes, target_rate: int, make_recognizer, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data, target_rate, make_recognizer)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run(seconds: float, repeat: int, model_path: str | None) -> list[dict]:
+    target_rate = read_sample_rate(model_path) if model_path else DEFAULT_SAMPLE_RATE
+    make_recognizer = _recognizer_factory(model_path, target_rate)
+    results = []
+    for channels, sample_format, rate in FORMATS:
+        data = encode_wav(synthesize(seconds, rate, channels), rate, sample_format)
+        elapsed = measure(_ingest_once, data, target_rate, make_recognizer, repeat)
+        result = {
+            "format": f"{sample_format} {'mono' if channels == 1 else f'{channels}ch'} {rate} Hz",
+            "input_mb": len(data) / 2**20,
+            "ingest_ms": elapsed * 1000,
+            "audio_s_per_s": seconds / elapsed,
+        }
+        if channels == 1 and sample_format == "s16le":
+            result["wave_audio_s_per_s"] = seconds / measure(_wave_once, data, target_rate, make_recognizer, repeat)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="Длина синтетической записи")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model", default=None, help="Каталог модели Vosk для замера распознавания целиком")
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    results = run(args.seconds, args.repeat, args.model)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    header = f"{'format':<26}{'input MB':>10}{'ingest ms':>11}{'audio s/s':>12}{'wave audio s/s':>16}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        baseline = f"{r['wave_audio_s_per_s']:>16.0f}" if "wave_audio_s_per_s" in r else f"{'-':>16}"
+        print(f"{r['format']:<26}{r['input_mb']:>10.1f}{r['ingest_ms']:>11.2f}{r['audio_s_per_s']:>12.0f}{baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Бенчмарк холодного старта бэкенда
+
+Запускает бэкенд отдельным процессом и измеряет от момента запуска:
+- listening: первый успешный ответ GET /;
+- ready: первый ответ 200 от GET /ready (модели загружены в Ollama);
+- first_response: первый успешный POST /upload с решением.
+
+Запрос /upload отправляется сразу, как только процесс начал принимать
+соединения, поэтому сравнение с --no-warmup показывает, сколько загрузки
+модели прогрев снимает с первого пользовательского запроса.
+
+По умолчанию для каждого прогона поднимается свежая заглушка Ollama
+(benchmarks/fake_ollama.py) с задержкой загрузки модели --load-latency,
+чтобы модель каждый раз была холодной. С --ollama используется реальный сервер.
+
+Запуск:
+    python benchmarks/bench_cold_start.py --runs 3
+    python benchmarks/bench_cold_start.py --no-warmup --load-latency 5
+    python benchmarks/bench_cold_start.py --ollama http://127.0.0.1:11434 --json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+
+TASK = "<html><body><p>Read n numbers and print how many there are.</p></body></html>"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until(url: str, started: float, timeout: float, status: int = 200) -> float:
+    """Опрашивает url до нужного статуса и возвращает время от started в секундах"""
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == status:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not answer {status} within {timeout} s")
+
+
+def _start_fake_ollama(port: int, load_latency: float, token_latency: float) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT_DIR, "benchmarks", "fake_ollama.py"),
+            "--port", str(port),
+            "--load-latency", str(load_latency),
+            "--token-latency", str(token_latency),
+            "--parallel", "4",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    _wait_until(f"http://127.0.0.1:{port}/api/version", time.perf_counter(), 30)
+    return process
+
+
+def _stop(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def measure_run(ollama_url: str, warmup: bool, timeout: float) -> dict:
+    """Один холодный старт бэкенда"""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "OLLAMA_BASE_URL": ollama_url,
+        "WARMUP_ENABLED": "1" if warmup else "0",
+        # Кэш решений отключен, чтобы первый запрос действительно шел в модель
+        "CACHE_ENABLED": "0",
+    }
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        listening = _wait_until(base_url + "/", started, timeout)
+
+        response = httpx.post(
+            base_url + "/upload",
+            data={"task": TASK, "programming_language": "python"},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        first_response = time.perf_counter() - started
+        if not response.json().get("llm_response"):
+            raise RuntimeError(f"First response has no solution: {response.json()}")
+
+        ready = _wait_until(base_url + "/ready", started, timeout)
+    finally:
+        _stop(backend)
+
+    return {"listening": listening, "first_response": first_response, "ready": ready}
+
+
+def _summary(values: list[float]) -> dict:
+    return {
+        "p50_ms": round(statistics.median(values) * 1000, 1),
+        "min_ms": round(min(values) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-warmup", action="store_true", help="Отключить прогрев моделей при старте")
+    parser.add_argument("--ollama", default=None, help="URL реального Ollama вместо заглушки")
+    parser.add_argument("--load-latency", type=float, default=3.0, help="Время загрузки модели в заглушке")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Секунд на токен в заглушке")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        fake = None
+        ollama_url = args.ollama
+        if ollama_url is None:
+            fake_port = _free_port()
+            fake = _start_fake_ollama(fake_port, args.load_latency, args.token_latency)
+            ollama_url = f"http://127.0.0.1:{fake_port}"
+        try:
+            runs.append(measure_run(ollama_url, not args.no_warmup, args.timeout))
+        finally:
+            if fake is not None:
+                _stop(fake)
+
+    results = {
+        "warmup": not args.no_warmup,
+        "runs": len(runs),
+        **{stage: _summary([run[stage] for run in runs]) for stage in ("listening", "first_response", "ready")},
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    print(f"warmup={'on' if results['warmup'] else 'off'}, runs={results['runs']}")
+    for stage in ("listening", "first_response", "ready"):
+        summary = results[stage]
+        print(f"{stage:>15}: p50 {summary['p50_ms']:>9.1f} ms  min {summary['min_ms']:>9.1f} ms  max {summary['max_ms']:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
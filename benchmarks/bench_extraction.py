@@ -0,0 +1,195 @@
+"""
+Бенчмарк извлечения условия задачи: детерминированный экстрактор против LLM
+
+Сравнивает задержку извлечения и число токенов промпта для трех путей:
+- extractor: потоковый HTML-парсер из interview_assistant.service.extractors;
+- llm: прежний путь, отправляющий весь HTML страницы в модель;
+- compacted: то, что уходит в модель сейчас для нераспознанных страниц —
+  текст страницы после interview_assistant.service.compaction.
+
+Без флага --ollama задержка LLM-пути не измеряется, выводится только оценка
+токенов промпта. С флагом --ollama выполняется реальный вызов модели.
+
+Запуск:
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --pages saved_page.html --ollama http://127.0.0.1:11434
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from interview_assistant.service.compaction import compact_page  # noqa: E402
+from interview_assistant.service.extractors import extract_statement  # noqa: E402
+from interview_assistant.service.prompts import EXTRACT_PROMPT  # noqa: E402
+from interview_assistant.service.tokens import estimate_tokens  # noqa: E402
+
+# Системный промпт прежнего пути, для сравнения
+LLM_EXTRACTION_PROMPT = "FROM THIS HTML EXTRACT THE part with the PROGRAMMING PROBLEM FROM CODEFORCES"
+
+
+def _page_noise(kilobytes: int) -> tuple[str, str]:
+    """Скрипты, стили и навигация, которые окружают условие на реальной странице"""
+    script = "<script>" + "window.__data = {\"key\": \"value\", \"items\": [1, 2, 3]};\n" * (kilobytes * 8) + "</script>"
+    style = "<style>" + ".nav-item { color: #333; margin: 0 4px; }\n" * (kilobytes * 4) + "</style>"
+    nav = "<ul class=\"menu\">" + "<li><a href=\"/contest/1\" class=\"menu-link\">Contest</a></li>" * (kilobytes * 4) + "</ul>"
+    return script + style, nav
+
+
+def codeforces_page(kilobytes: int = 200) -> str:
+    head, nav = _page_noise(kilobytes)
+    math = (
+        '<span class="MathJax_Preview"></span><span class="MathJax" id="MathJax-Element-1-Frame">'
+        '<nobr><span class="math"><span class="mi">n</span></span></nobr>'
+        '<span class="MJX_Assistive_MathML">n</span></span><script type="math/tex" id="MathJax-Element-1">n</script>'
+    )
+    return f"""<!DOCTYPE html><html><head><title>Problem - 1A - Codeforces</title>{head}</head>
+<body>{nav}<div class="problemindexholder" problemindex="A">
+<div class="ttypography"><div class="problem-statement">
+<div class="header"><div class="title">A. Theatre Square</div>
+<div class="time-limit"><div class="property-title">time limit per test</div>1 second</div>
+<div class="memory-limit"><div class="property-title">memory limit per test</div>256 megabytes</div>
+<div class="input-file"><div class="property-title">input</div>standard input</div>
+<div class="output-file"><div class="property-title">output</div>standard output</div></div>
+<div><p>Theatre Square in the capital city of Berland has a rectangular shape with the size {math} × m meters.
+On the occasion of the city's anniversary, a decision was taken to pave the Square with square granite flagstones.
+Each flagstone is of the size a × a.</p><p>What is the least number of flagstones needed to pave the Square?</p></div>
+<div class="input-specification"><div class="section-title">Input</div>
+<p>The input contains three positive integer numbers in the first line: n, m and a (1 ≤ n, m, a ≤ 10<sup>9</sup>).</p></div>
+<div class="output-specification"><div class="section-title">Output</div><p>Write the needed number of flagstones.</p></div>
+<div class="sample-tests"><div class="section-title">Examples</div><div class="sample-test">
+<div class="input"><div class="title">Input</div><pre><div class="test-example-line test-example-line-even">6 6 4</div></pre></div>
+<div class="output"><div class="title">Output</div><pre>4
+</pre></div></div></div></div></div></div>
+{head}{nav}</body></html>"""
+
+
+def leetcode_page(kilobytes: int = 300) -> str:
+    head, nav = _page_noise(kilobytes)
+    return f"""<!DOCTYPE html><html><head><title>Two Sum - LeetCode</title>{head}</head><body>{nav}
+<div class="flex"><div class="elfjS" data-track-load="description_content">
+<p>Given an array of integers <code>nums</code>&nbsp;and an integer <code>target</code>, return <em>indices of the two numbers such that they add up to <code>target</code></em>.</p>
+<p><strong class="example">Example 1:</strong></p>
+<pre><strong>Input:</strong> nums = [2,7,11,15], target = 9
+<strong>Output:</strong> [0,1]
+<strong>Explanation:</strong> Because nums[0] + nums[1] == 9, we return [0, 1].
+</pre>
+<p><strong>Constraints:</strong></p><ul><li><code>2 &lt;= nums.length &lt;= 10<sup>4</sup></code></li>
+<li><code>-10<sup>9</sup> &lt;= nums[i] &lt;= 10<sup>9</sup></code></li></ul></div></div>
+{head}</body></html>"""
+
+
+def atcoder_page(kilobytes: int = 100) -> str:
+    head, nav = _page_noise(kilobytes)
+    part = """<div class="part"><section><h3>{label_in}</h3><pre>3 5
+</pre></section></div><div class="part"><section><h3>{label_out}</h3><pre>8
+</pre></section></div>"""
+    return f"""<!DOCTYPE html><html><head><title>A - Sum</title>{head}</head><body>{nav}
+<span class="h2">A - Sum</span><p>Time Limit: 2 sec / Memory Limit: 1024 MB</p>
+<div id="task-statement"><span class="lang"><span class="lang-ja">
+<div class="part"><section><h3>問題文</h3><p>整数 A, B が与えられます。A+B を出力してください。</p></section></div>
+{part.format(label_in="入力例 1", label_out="出力例 1")}</span>
+<span class="lang-en"><div class="part"><section><h3>Problem Statement</h3><p>Given integers A and B, print A+B.</p></section></div>
+<div class="part"><section><h3>Constraints</h3><ul><li>1 \\leq A, B \\leq 100</li></ul></section></div>
+{part.format(label_in="Sample Input 1", label_out="Sample Output 1")}</span></span></div>
+{head}</body></html>"""
+
+
+def _time_extractor(html: str, repeat: int) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        extract_statement(html)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _time_llm(html: str, base_url: str, model: str) -> tuple[float, str]:
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_ollama import ChatOllama
+
+    llm = ChatOllama(model=model, temperature=0, base_url=base_url)
+    start = time.perf_counter()
+    response = llm.invoke([SystemMessage(content=LLM_EXTRACTION_PROMPT), HumanMessage(content=html)])
+    return time.perf_counter() - start, response.content
+
+
+def run(pages: dict[str, str], repeat: int, ollama: str | None, model: str) -> list[dict]:
+    results = []
+    for name, html in pages.items():
+        statement = extract_statement(html)
+        extracted = statement.to_prompt() if statement else ""
+        timings = _time_extractor(html, repeat)
+        started = time.perf_counter()
+        page = compact_page(html)
+        compact_ms = (time.perf_counter() - started) * 1000
+        result = {
+            "page": name,
+            "html_bytes": len(html.encode("utf-8")),
+            "site": statement.site if statement else None,
+            "samples": len(statement.samples) if statement else 0,
+            "extractor_ms_p50": statistics.median(timings) * 1000,
+            "extractor_ms_max": max(timings) * 1000,
+            "llm_prompt_tokens": estimate_tokens(LLM_EXTRACTION_PROMPT) + estimate_tokens(html),
+            "extractor_prompt_tokens": 0,
+            "compacted_prompt_tokens": estimate_tokens(EXTRACT_PROMPT.system) + page.tokens,
+            "compacted_removed_bytes": page.removed_bytes,
+            "compact_ms": compact_ms,
+            "solve_input_tokens": estimate_tokens(extracted),
+        }
+        if ollama:
+            latency, llm_output = _time_llm(html, ollama, model)
+            result["llm_ms"] = latency * 1000
+            result["llm_solve_input_tokens"] = estimate_tokens(llm_output)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", nargs="*", default=[], help="Сохраненные HTML страницы вместо синтетических")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--ollama", default=None, help="URL Ollama для измерения LLM-пути")
+    parser.add_argument("--model", default="qwen2.5-coder:32b")
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = {}
+        for path in args.pages:
+            with open(path, "r", encoding="utf-8") as f:
+                pages[os.path.basename(path)] = f.read()
+    else:
+        pages = {
+            "codeforces": codeforces_page(),
+            "leetcode": leetcode_page(),
+            "atcoder": atcoder_page(),
+        }
+
+    results = run(pages, args.repeat, args.ollama, args.model)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+
+    header = (
+        f"{'page':<14}{'site':<12}{'html KB':>9}{'extract p50 ms':>16}{'LLM prompt tok':>16}"
+        f"{'compacted tok':>15}{'compact ms':>12}{'solve input tok':>17}{'samples':>9}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['page']:<14}{str(r['site']):<12}{r['html_bytes'] / 1024:>9.0f}{r['extractor_ms_p50']:>16.2f}"
+            f"{r['llm_prompt_tokens']:>16}{r['compacted_prompt_tokens']:>15}{r['compact_ms']:>12.1f}"
+            f"{r['solve_input_tokens']:>17}{r['samples']:>9}"
+        )
+        if "llm_ms" in r:
+            print(f"{'':<14}LLM extraction: {r['llm_ms']:.0f} ms, output {r['llm_solve_input_tokens']} tokens")
+
+
+if __name__ == "__main__":
+    main()
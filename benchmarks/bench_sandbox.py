@@ -0,0 +1,118 @@
+"""
+Бенчмарк накладных расходов на один тест при проверке решений в lta
+
+Сравнивает три способа запуска одного и того же решения на наборе входов:
+- double_spawn: прежний путь, multiprocessing.Process вокруг python -c на каждый тест;
+- python_c: новый интерпретатор python -c на каждый тест;
+- sandbox: заранее запущенные исполнители из lta/sandbox.py, компиляция один раз,
+  fork на каждый тест.
+
+Решение почти ничего не делает, поэтому время теста — это накладные расходы запуска.
+
+Запуск:
+    python benchmarks/bench_sandbox.py --tests 50
+    python benchmarks/bench_sandbox.py --tests 200 --workers 4 --json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lta"))
+
+from sandbox import SandboxPool  # noqa: E402
+
+PROGRAM = """
+from collections import Counter
+n = int(input())
+print(n * 2)
+"""
+
+
+def _python_c(program: str, input_data: str, timeout: float) -> str:
+    process = subprocess.run(
+        [sys.executable, "-c", program],
+        input=input_data,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    return process.stdout
+
+
+def _double_spawn_target(q: multiprocessing.Queue, program: str, input_data: str, timeout: float) -> None:
+    q.put(_python_c(program, input_data, timeout))
+
+
+def _double_spawn(program: str, input_data: str, timeout: float) -> str:
+    q = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_double_spawn_target, args=(q, program, input_data, timeout))
+    process.start()
+    process.join(timeout=timeout + 1)
+    result = q.get_nowait()
+    q.close()
+    q.join_thread()
+    return result
+
+
+def _measure(run, inputs: list[str]) -> list[float]:
+    durations = []
+    for input_data in inputs:
+        started = time.perf_counter()
+        output = run(PROGRAM, input_data, 5.0)
+        durations.append(time.perf_counter() - started)
+        assert output.strip() == str(int(input_data) * 2), output
+    return durations
+
+
+def _summary(durations: list[float]) -> dict:
+    ordered = sorted(durations)
+    return {
+        "mean_ms": round(statistics.mean(durations) * 1000, 2),
+        "p50_ms": round(statistics.median(durations) * 1000, 2),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tests", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=1, help="Размер пула песочницы")
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("fork", force=True)
+    inputs = [str(i) for i in range(args.tests)]
+
+    results = {
+        "double_spawn": _summary(_measure(_double_spawn, inputs)),
+        "python_c": _summary(_measure(_python_c, inputs)),
+    }
+
+    started = time.perf_counter()
+    pool = SandboxPool(args.workers)
+    startup = time.perf_counter() - started
+    try:
+        sandbox = pool.run
+        results["sandbox"] = {
+            **_summary(_measure(lambda program, input_data, timeout: sandbox(program, input_data, timeout).stdout, inputs)),
+            "pool_startup_ms": round(startup * 1000, 2),
+        }
+    finally:
+        pool.close()
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    print(f"{args.tests} tests, per-test overhead")
+    for name, summary in results.items():
+        extra = f"  (pool startup {summary['pool_startup_ms']:.1f} ms)" if "pool_startup_ms" in summary else ""
+        print(f"{name:>13}: mean {summary['mean_ms']:>7.2f} ms  p50 {summary['p50_ms']:>7.2f} ms  p95 {summary['p95_ms']:>7.2f} ms{extra}")
+
+
+if __name__ == "__main__":
+    main()
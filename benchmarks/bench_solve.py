@@ -0,0 +1,348 @@
+"""
+Бенчмарк цикла решения задач на локальной заглушке Ollama
+
+Прогоняет корпус задач через две цели:
+- lta: граф из lta/main2.py (генерация решения, проверка на тестах, повторные попытки);
+- upload: POST /upload бэкенда, запущенного отдельным процессом.
+
+Корпус (по умолчанию benchmarks/problems.jsonl) записан в формате
+requests.jsonl: одна задача на строку с полями request_id, title и body,
+а также test_cases ({"inputs", "outputs"}) и solutions. Ollama заменяется
+заглушкой (benchmarks/fake_ollama.py) в этом же процессе. Ее ответы
+заскриптованы: на k-й вызов модели по запросу отдается k-е решение
+из solutions (последнее повторяется), поэтому число итераций
+детерминировано и прогоны разных версий кода можно сравнивать.
+
+Отчет по каждой цели: p50/p95/p99 задержки запроса, запросы в секунду
+при фиксированном числе параллельных запросов, токены промпта и ответа,
+итерации до прохождения тестов и время прогона тестов, а также токены
+промпта, взятые заглушкой из KV-кэша, время обработки промптов, среднее
+время до первого токена и число перезагрузок модели. С --json результаты
+печатаются в JSON, с --output сохраняются в файл.
+
+Запуск:
+    python benchmarks/bench_solve.py --target lta --requests 32 --concurrency 4
+    python benchmarks/bench_solve.py --target upload --token-latency 0.01 --json
+    python benchmarks/bench_solve.py --target both --candidates 3 --output results.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import uvicorn
+
+from fake_ollama import FakeOllamaConfig, create_fake_ollama
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+BACKEND_DIR = os.path.join(ROOT_DIR, "backend")
+LTA_DIR = os.path.join(ROOT_DIR, "lta")
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "problems.jsonl")
+
+# Метка запроса в тексте задачи: по ней заглушка понимает, какую задачу решают и какая это попытка
+_MARKER = re.compile(r"bench-id: (?P<problem>[\w-]+)#(?P<request>-?\d+)")
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ScriptedResponder:
+    """Отдает решения из корпуса по порядку вызовов модели для каждого запроса"""
+
+    def __init__(self, problems: list[dict]):
+        self.problems = {problem["request_id"]: problem for problem in problems}
+        self._calls: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str, body: dict):
+        match = _MARKER.search(prompt)
+        if match is None or match["problem"] not in self.problems:
+            return "```python\nprint()\n```"
+        solutions = self.problems[match["problem"]]["solutions"]
+        with self._lock:
+            attempt = self._calls[match[0]]
+            self._calls[match[0]] += 1
+        code = solutions[min(attempt, len(solutions) - 1)]
+        tools = body.get("tools") or []
+        if not tools:
+            return f"```python\n{code}\n```"
+        return {
+            "content": "",
+            "tool_calls": [{
+                "name": tools[0]["function"]["name"],
+                "arguments": {"reasoning": f"Scripted attempt {attempt + 1}", "pseudocode": "", "code": code},
+            }],
+        }
+
+
+class FakeOllamaServer:
+    """Заглушка Ollama в фоновом потоке этого процесса"""
+
+    def __init__(self, config: FakeOllamaConfig, responder: ScriptedResponder):
+        self.app = create_fake_ollama(config)
+        self.app.state.responder = responder
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "FakeOllamaServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+    def stats(self) -> dict:
+        return dict(self.app.state.stats)
+
+    def reset_stats(self) -> None:
+        """Обнуляет счетчики заглушки после прогрева; KV-кэш промптов остается"""
+        stats = self.app.state.stats
+        for key in stats:
+            if key not in ("waiting", "max_waiting"):
+                stats[key] = type(stats[key])()
+
+
+def _task_text(problem: dict, index: int) -> str:
+    return f"{problem['body']}\n\nbench-id: {problem['request_id']}#{index}"
+
+
+def _task_html(problem: dict, index: int) -> str:
+    """Страница в разметке Codeforces, чтобы условие извлекалось без вызова модели"""
+    return (
+        '<html><body><div class="problem-statement">'
+        f'<div class="header"><div class="title">{problem["title"]}</div></div>'
+        f'<div><p>{problem["body"]}</p><p>bench-id: {problem["request_id"]}#{index}</p></div>'
+        "</div></body></html>"
+    )
+
+
+def run_lta(problems: list[dict], server: FakeOllamaServer, args) -> tuple[list[dict], float]:
+    """Решает задачи графом lta, не больше args.concurrency одновременно; возвращает результаты и время прогона"""
+    sys.path.insert(0, LTA_DIR)
+    import main2
+    from langchain_core.messages import HumanMessage
+    from langchain_ollama import ChatOllama
+
+    if not args.execution_cache:
+        # Каждый запрос проверяется заново, иначе повторы задач из корпуса берутся из кэша
+        main2._execution_memo.max_size = 0
+    graph = main2.build_graph(ChatOllama(model=args.model, base_url=server.url, temperature=0))
+
+    def solve(index: int) -> dict:
+        problem = problems[index % len(problems)]
+        state = main2.State(
+            messages=[HumanMessage(content=_task_text(problem, index))],
+            test_cases=[main2.TestCase(**test_case) for test_case in problem["test_cases"]],
+            runtime_limit=args.runtime_limit,
+            status="in_progress",
+            problem_level="easy",
+            num_candidates=args.candidates,
+        )
+        started = time.perf_counter()
+        final = graph.invoke(state, {"recursion_limit": main2.RECURSION_LIMIT})
+        return {
+            "problem": problem["request_id"],
+            "latency": time.perf_counter() - started,
+            "ok": final.get("status") == "success",
+            "iterations": final.get("attempts", 0),
+            "sandbox_seconds": final.get("sandbox_seconds", 0.0),
+        }
+
+    # Вывод графа печатается на каждом шаге и здесь только мешает
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        # Прогревочные запросы запускают пул песочницы и не попадают в результаты
+        list(pool.map(solve, range(-args.warmup, 0)))
+        server.reset_stats()
+        started = time.perf_counter()
+        runs = list(pool.map(solve, range(args.requests)))
+        return runs, time.perf_counter() - started
+
+
+def run_upload(problems: list[dict], server: FakeOllamaServer, args) -> tuple[list[dict], float]:
+    """Отправляет задачи в POST /upload бэкенда, не больше args.concurrency одновременно; возвращает результаты и время прогона"""
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "OLLAMA_BASE_URL": server.url,
+        "MODEL_NAME": args.model,
+        "WARMUP_ENABLED": "0",
+        # Кэш решений отключен, чтобы каждый запрос доходил до модели
+        "CACHE_ENABLED": "0",
+    }
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    async def main() -> tuple[list[dict], float]:
+        limit = asyncio.Semaphore(args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+            deadline = time.perf_counter() + args.timeout
+            while True:
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.perf_counter() > deadline:
+                    raise TimeoutError("Backend did not start")
+                await asyncio.sleep(0.05)
+
+            async def upload(index: int) -> dict:
+                problem = problems[index % len(problems)]
+                async with limit:
+                    started = time.perf_counter()
+                    response = await client.post(
+                        "/upload",
+                        data={"task": _task_html(problem, index), "programming_language": "python"},
+                    )
+                    latency = time.perf_counter() - started
+                return {
+                    "problem": problem["request_id"],
+                    "latency": latency,
+                    "ok": response.status_code == 200 and bool(response.json().get("llm_response")),
+                    "iterations": 1,
+                    "sandbox_seconds": 0.0,
+                }
+
+            await asyncio.gather(*(upload(index) for index in range(-args.warmup, 0)))
+            server.reset_stats()
+            started = time.perf_counter()
+            runs = await asyncio.gather(*(upload(index) for index in range(args.requests)))
+            return list(runs), time.perf_counter() - started
+
+    try:
+        return asyncio.run(main())
+    finally:
+        backend.terminate()
+        try:
+            backend.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            backend.kill()
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def summarize(results: list[dict], elapsed: float, stats: dict) -> dict:
+    latencies = [result["latency"] for result in results]
+    solved = [result for result in results if result["ok"]]
+    return {
+        "requests": len(results),
+        "solved": len(solved),
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(len(results) / elapsed, 3),
+        "latency_ms": {
+            f"p{percent}": round(_percentile(latencies, percent) * 1000, 1) for percent in (50, 95, 99)
+        },
+        "llm_requests": stats["requests"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "completion_tokens": stats["completion_tokens"],
+        "cached_prompt_tokens": stats["cached_prompt_tokens"],
+        "prompt_eval_s": round(stats["prompt_eval_seconds"], 3),
+        "ttft_ms": round(stats["ttft_seconds"] / stats["first_tokens"] * 1000, 1) if stats["first_tokens"] else None,
+        "model_reloads": stats["reloads"],
+        "iterations_to_pass": {
+            "mean": round(statistics.mean(r["iterations"] for r in solved), 2) if solved else None,
+            "max": max((r["iterations"] for r in solved), default=None),
+        },
+        "sandbox_s": round(sum(result["sandbox_seconds"] for result in results), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("lta", "upload", "both"), default="both")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="JSONL с задачами")
+    parser.add_argument("--requests", type=int, default=16, help="Число запросов на цель, задачи идут по кругу")
+    parser.add_argument("--concurrency", type=int, default=4, help="Число одновременных запросов")
+    parser.add_argument("--warmup", type=int, default=1, help="Прогревочные запросы, не входящие в результаты")
+    parser.add_argument("--candidates", type=int, default=1, help="num_candidates для графа lta")
+    parser.add_argument("--runtime-limit", type=float, default=2.0, help="Лимит времени теста в lta")
+    parser.add_argument("--execution-cache", action="store_true", help="Не отключать кэш вердиктов lta")
+    parser.add_argument("--model", default="qwen2.5-coder:32b")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Секунд на токен ответа в заглушке")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0, help="Секунд на токен промпта в заглушке")
+    parser.add_argument("--parallel", type=int, default=4, help="Параллельные слоты генерации в заглушке")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--verbose", action="store_true", help="Не скрывать вывод графа lta")
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    parser.add_argument("--output", help="Сохранить результаты в JSON-файл")
+    args = parser.parse_args()
+
+    problems = load_corpus(args.corpus)
+    config = FakeOllamaConfig(
+        token_latency=args.token_latency,
+        prompt_token_latency=args.prompt_token_latency,
+        parallel=args.parallel,
+    )
+    targets = ("lta", "upload") if args.target == "both" else (args.target,)
+    runners = {"lta": run_lta, "upload": run_upload}
+
+    results = {
+        "config": {
+            key: getattr(args, key)
+            for key in ("requests", "concurrency", "candidates", "token_latency", "prompt_token_latency", "parallel")
+        },
+        "corpus": {"path": os.path.relpath(args.corpus, ROOT_DIR), "problems": len(problems)},
+    }
+    for target in targets:
+        with FakeOllamaServer(config, ScriptedResponder(problems)) as server:
+            runs, elapsed = runners[target](problems, server, args)
+            results[target] = summarize(runs, elapsed, server.stats())
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return
+    for target in targets:
+        summary = results[target]
+        latency = summary["latency_ms"]
+        iterations = summary["iterations_to_pass"]
+        print(f"[{target}] {summary['solved']}/{summary['requests']} solved in {summary['elapsed_s']} s, {summary['rps']} req/s")
+        print(f"  latency: p50 {latency['p50']} ms  p95 {latency['p95']} ms  p99 {latency['p99']} ms")
+        print(f"  tokens: prompt {summary['prompt_tokens']}, completion {summary['completion_tokens']} over {summary['llm_requests']} LLM calls")
+        print(
+            f"  prompt cache: {summary['cached_prompt_tokens']} tokens reused, prompt eval {summary['prompt_eval_s']} s, "
+            f"mean TTFT {summary['ttft_ms']} ms, {summary['model_reloads']} model reloads"
+        )
+        print(f"  iterations to pass: mean {iterations['mean']}, max {iterations['max']}; sandbox {summary['sandbox_s']} s")
+
+
+if __name__ == "__main__":
+    main()
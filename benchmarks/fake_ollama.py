@@ -0,0 +1,263 @@
+"""
+Локальная заглушка Ollama для нагрузочных проверок без GPU
+
+Реализует подмножество HTTP API Ollama (/api/chat, /api/generate, /api/ps,
+/api/tags, /api/version) и имитирует его поведение: загрузку модели при
+первом обращении, обработку промпта, генерацию с заданной задержкой на токен
+и ограниченное число параллельных слотов (как OLLAMA_NUM_PARALLEL).
+
+Как и Ollama, заглушка хранит KV-кэш последних промптов по числу слотов:
+общий с одним из них префикс не обрабатывается повторно (и не входит
+в prompt_eval_count), а запрос с другим options.num_ctx перезагружает
+модель и сбрасывает кэш. /stats показывает, сколько токенов промпта
+взято из кэша, время обработки промптов и время до первого токена.
+
+Ответ по умолчанию один и тот же. Для сценариев app.state.responder
+задает функцию responder(prompt, body), которая возвращает текст ответа
+или словарь {"content": ..., "tool_calls": [{"name": ..., "arguments": {...}}]}
+для запросов /api/chat с инструментами.
+
+Запуск:
+    python benchmarks/fake_ollama.py --port 11435 --token-latency 0.02 --parallel 1
+    OLLAMA_BASE_URL=http://127.0.0.1:11435 python backend/main.py
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+DEFAULT_RESPONSE = "```python\nimport sys\n\ndef main():\n    data = sys.stdin.read().split()\n    print(len(data))\n\nmain()\n```"
+
+
+@dataclass
+class FakeOllamaConfig:
+    """Параметры имитации"""
+    token_latency: float = 0.02
+    prompt_token_latency: float = 0.0002
+    load_latency: float = 0.0
+    parallel: int = 1
+    response: str = DEFAULT_RESPONSE
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _split_tokens(text: str) -> list[str]:
+    """Режет ответ на куски примерно по 4 символа, как BPE-токены"""
+    return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_fake_ollama(config: Optional[FakeOllamaConfig] = None) -> FastAPI:
+    """
+    Создает приложение, отвечающее как сервер Ollama
+
+    Args:
+        config: Параметры имитации задержек и ответов
+
+    Returns:
+        FastAPI: Приложение-заглушка
+    """
+    config = config or FakeOllamaConfig()
+    app = FastAPI(title="Fake Ollama")
+    slots = asyncio.Semaphore(config.parallel)
+    loaded: dict[str, float] = {}
+    contexts: dict[str, Optional[int]] = {}
+    # Промпты, чей KV-кэш держат слоты модели, от давних к последним
+    prompt_cache: dict[str, list[str]] = {}
+    app.state.config = config
+    app.state.stats = {
+        "requests": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0,
+        "prompt_eval_seconds": 0.0, "ttft_seconds": 0.0, "first_tokens": 0, "reloads": 0,
+        "max_waiting": 0, "waiting": 0,
+    }
+
+    def cached_prefix(model: str, prompt: str) -> int:
+        """Длина самого длинного префикса промпта, уже обработанного одним из слотов"""
+        slots_cache = prompt_cache.setdefault(model, [])
+        best = max((len(os.path.commonprefix([prompt, cached])) for cached in slots_cache), default=0)
+        slots_cache.append(prompt)
+        del slots_cache[:-config.parallel]
+        return best
+
+    def choose_response(prompt: str, body: dict) -> dict:
+        responder = getattr(app.state, "responder", None)
+        reply = responder(prompt, body) if responder is not None else config.response
+        return {"content": reply} if isinstance(reply, str) else reply
+
+    async def generate(model: str, prompt: str, kind: str, body: dict):
+        stats = app.state.stats
+        received = time.perf_counter()
+        stats["requests"] += 1
+        stats["waiting"] += 1
+        stats["max_waiting"] = max(stats["max_waiting"], stats["waiting"])
+        async with slots:
+            stats["waiting"] -= 1
+            started = time.perf_counter()
+
+            load_duration = 0.0
+            num_ctx = (body.get("options") or {}).get("num_ctx")
+            reload = model in loaded and contexts.get(model) != num_ctx
+            if reload:
+                # Другой размер контекста: Ollama перезапускает модель, кэш промптов теряется
+                stats["reloads"] += 1
+                prompt_cache.pop(model, None)
+            if (model not in loaded or reload) and config.load_latency > 0:
+                await asyncio.sleep(config.load_latency)
+                load_duration = config.load_latency
+            loaded[model] = time.time()
+            contexts[model] = num_ctx
+
+            prompt_tokens = _count_tokens(prompt)
+            cached_tokens = min(prompt_tokens - 1, cached_prefix(model, prompt) // 4)
+            evaluated_tokens = prompt_tokens - cached_tokens
+            prompt_duration = evaluated_tokens * config.prompt_token_latency
+            await asyncio.sleep(prompt_duration)
+            stats["cached_prompt_tokens"] += cached_tokens
+            stats["prompt_eval_seconds"] += prompt_duration
+
+            reply = choose_response(prompt, body)
+            tool_calls = reply.get("tool_calls") if kind == "chat" else None
+            tokens = _split_tokens(reply.get("content", ""))
+            # Аргументы вызова инструмента модель тоже генерирует токен за токеном
+            tool_tokens = _count_tokens(json.dumps(tool_calls)) if tool_calls else 0
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += len(tokens) + tool_tokens
+
+            for index, token in enumerate(tokens):
+                await asyncio.sleep(config.token_latency)
+                if index == 0:
+                    stats["ttft_seconds"] += time.perf_counter() - received
+                    stats["first_tokens"] += 1
+                yield _chunk(model, token, kind, done=False)
+            if tool_calls:
+                await asyncio.sleep(tool_tokens * config.token_latency)
+                chunk = _chunk(model, "", kind, done=False)
+                chunk["message"]["tool_calls"] = [
+                    {"function": {"name": call["name"], "arguments": call["arguments"]}} for call in tool_calls
+                ]
+                yield chunk
+
+            final = _chunk(model, "", kind, done=True)
+            final.update({
+                "done_reason": "stop",
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+                "load_duration": int(load_duration * 1e9),
+                "prompt_eval_count": evaluated_tokens,
+                "prompt_eval_duration": int(prompt_duration * 1e9),
+                "eval_count": len(tokens) + tool_tokens,
+                "eval_duration": int((len(tokens) + tool_tokens) * config.token_latency * 1e9),
+            })
+            yield final
+
+    async def respond(body: dict, prompt: str, kind: str):
+        model = body.get("model", "")
+        stream = body.get("stream", True)
+        chunks = generate(model, prompt, kind, body)
+        if stream:
+            async def ndjson():
+                async for chunk in chunks:
+                    yield json.dumps(chunk) + "\n"
+            return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+        text = []
+        tool_calls = []
+        final = {}
+        async for chunk in chunks:
+            if chunk["done"]:
+                final = chunk
+            elif kind == "chat":
+                text.append(chunk["message"]["content"])
+                tool_calls.extend(chunk["message"].get("tool_calls", []))
+            else:
+                text.append(chunk["response"])
+        if kind == "chat":
+            final["message"] = {"role": "assistant", "content": "".join(text)}
+            if tool_calls:
+                final["message"]["tool_calls"] = tool_calls
+        else:
+            final["response"] = "".join(text)
+        return final
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        return await respond(body, prompt, "chat")
+
+    @app.post("/api/generate")
+    async def generate_endpoint(request: Request):
+        body = await request.json()
+        prompt = body.get("prompt", "")
+        if not prompt:
+            # Пустой промпт Ollama использует для загрузки модели в память
+            model = body.get("model", "")
+            if model not in loaded and config.load_latency > 0:
+                await asyncio.sleep(config.load_latency)
+            loaded[model] = time.time()
+            contexts[model] = (body.get("options") or {}).get("num_ctx")
+            return {"model": model, "created_at": _now(), "response": "", "done": True, "done_reason": "load"}
+        return await respond(body, prompt, "generate")
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{"name": name, "model": name, "size": 0, "expires_at": _now()} for name in loaded]}
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": name, "model": name} for name in loaded]}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-fake"}
+
+    @app.get("/stats")
+    async def get_stats():
+        return app.state.stats
+
+    return app
+
+
+def _chunk(model: str, token: str, kind: str, done: bool) -> dict:
+    chunk = {"model": model, "created_at": _now(), "done": done}
+    if kind == "chat":
+        chunk["message"] = {"role": "assistant", "content": token}
+    else:
+        chunk["response"] = token
+    return chunk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Секунд на токен ответа")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0002, help="Секунд на токен промпта")
+    parser.add_argument("--load-latency", type=float, default=0.0, help="Время загрузки модели при первом обращении")
+    parser.add_argument("--parallel", type=int, default=1, help="Число параллельных слотов генерации")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    config = FakeOllamaConfig(
+        token_latency=args.token_latency,
+        prompt_token_latency=args.prompt_token_latency,
+        load_latency=args.load_latency,
+        parallel=args.parallel,
+    )
+    uvicorn.run(create_fake_ollama(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,21 @@ document.addEventListener('DOMContentLoaded', function() {
     });
   });
   
+  // Gzips the multipart body when the browser supports CompressionStream; the backend
+  // inflates bodies sent with Content-Encoding, and page HTML shrinks several times
+  function compressForm(formData) {
+    if (typeof CompressionStream === 'undefined') {
+      return Promise.resolve({ body: formData, headers: {} });
+    }
+    const multipart = new Response(formData);
+    const contentType = multipart.headers.get('Content-Type');
+    const gzipped = multipart.body.pipeThrough(new CompressionStream('gzip'));
+    return new Response(gzipped).blob().then(body => ({
+      body: body,
+      headers: { 'Content-Type': contentType, 'Content-Encoding': 'gzip' }
+    }));
+  }
+
   // Function to update solution based on language and page HTML
   function updateSolution(language, pageHTML) {
     // Show loading state
@@ -45,37 +60,103 @@ document.addEventListener('DOMContentLoaded', function() {
     formData.append('task', pageHTML);
     formData.append('programming_language', apiLanguage);
     
-    // Make API call to the backend
-    fetch('http://84.252.131.206:8000/upload', {
+    // Client-perceived latency, reported next to the server's Server-Timing header
+    const timing = { startedAt: performance.now(), serverTiming: null, firstToken: null };
+
+    // Make streaming API call to the backend and render code as it arrives
+    compressForm(formData)
+    .then(request => fetch('http://84.252.131.206:8000/upload/stream', {
       method: 'POST',
       mode: 'cors',
-      headers: {
-        'Accept': 'application/json'
-      },
-      body: formData
-    })
+      headers: Object.assign({ 'Accept': 'text/event-stream' }, request.headers),
+      body: request.body
+    }))
     .then(response => {
       console.log("Status:", response.status, "Status Text:", response.statusText);
+      timing.headers = performance.now() - timing.startedAt;
+      timing.serverTiming = response.headers.get('Server-Timing');
       if (!response.ok) {
         return response.text().then(text => {
           console.error("Error details:", text);
           throw new Error(`Network response was not ok: ${response.status} ${response.statusText}`);
         });
       }
-      return response.json();
+      return readEventStream(response, timing);
     })
-    .then(data => {
-      // Update the solution with the LLM response
-      solutionDisplay.textContent = data.llm_response || '// No solution available';
-      
-      // Update the comment style based on language
-      solutionDisplay.className = 'code-display python';
+    .then(() => {
+      timing.total = performance.now() - timing.startedAt;
+      console.log(
+        `Latency: headers ${timing.headers.toFixed(0)} ms, first token ${timing.firstToken === null ? '-' : timing.firstToken.toFixed(0)} ms, ` +
+        `total ${timing.total.toFixed(0)} ms; server: ${timing.serverTiming}`
+      );
+    })
+    .catch(error => {
+      console.error("Streaming failed:", error);
+      solutionDisplay.textContent = `Error: ${error.message}`;
     })
     .finally(() => {
       // Remove loading state
       solutionDisplay.classList.remove('processing');
     });
   }
+
+  // Reads Server-Sent Events from the response body and updates the solution incrementally
+  function readEventStream(response, timing) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let solution = '';
+
+    function handleEvent(rawEvent) {
+      let eventName = 'message';
+      let dataLines = [];
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+          eventName = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          dataLines.push(line.slice(5).trim());
+        }
+      });
+      if (dataLines.length === 0) {
+        return;
+      }
+      const data = JSON.parse(dataLines.join('\n'));
+
+      if (eventName === 'status') {
+        solutionDisplay.textContent = data === 'solving' ? 'Solving...' : 'Reading the problem...';
+      } else if (eventName === 'token') {
+        if (timing.firstToken === null) {
+          timing.firstToken = performance.now() - timing.startedAt;
+        }
+        solution += data;
+        solutionDisplay.textContent = solution;
+        solutionDisplay.className = 'code-display python';
+      } else if (eventName === 'model') {
+        console.log("Served by model:", data);
+      } else if (eventName === 'error') {
+        solutionDisplay.textContent = data;
+      } else if (eventName === 'done' && !solution) {
+        solutionDisplay.textContent = '// No solution available';
+      }
+    }
+
+    function pump() {
+      return reader.read().then(({ done, value }) => {
+        if (done) {
+          return;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        let separatorIndex;
+        while ((separatorIndex = buffer.indexOf('\n\n')) !== -1) {
+          handleEvent(buffer.slice(0, separatorIndex));
+          buffer = buffer.slice(separatorIndex + 2);
+        }
+        return pump();
+      });
+    }
+
+    return pump();
+  }
   
   // Function to get page HTML and then call updateSolution
   function getPageHTMLAndSolve(language) {
@@ -0,0 +1,107 @@
+"""
+Потоковое сравнение вывода решения с ожидаемым
+
+Вывод сравнивается по мере поступления, без накопления целиком. Правило
+сравнения совпадает с прежним strip() обеих строк: пробельные символы
+в начале и в конце вывода не учитываются, внутри — учитываются.
+Первое расхождение останавливает сравнение и запоминается вместе
+с позицией (строка и столбец), чтобы модель получила точную обратную связь.
+"""
+from dataclasses import dataclass
+
+# Сколько символов строки показывать в описании расхождения
+EXCERPT_LIMIT = 200
+
+
+@dataclass
+class Mismatch:
+    """Первое расхождение вывода с ожидаемым"""
+    line: int
+    column: int
+    expected: str
+    actual: str
+
+    def describe(self) -> str:
+        return (
+            f"First difference at line {self.line}, column {self.column}: "
+            f"expected '{self.expected}', got '{self.actual}'"
+        )
+
+
+class OutputComparator:
+    """Сравнивает вывод, поступающий кусками, с ожидаемым"""
+
+    def __init__(self, expected: str):
+        self.expected = expected.strip()
+        self.position = 0
+        self.mismatch: Mismatch | None = None
+        self._started = False
+        # Пробелы, которые еще могут оказаться хвостовыми и не учитываться
+        self._pending_whitespace: list[str] = []
+        # Текущая строка фактического вывода для описания расхождения
+        self._line: list[str] = []
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Принимает очередной кусок вывода
+
+        Returns:
+            bool: False, если расхождение уже найдено и читать дальше не нужно
+        """
+        if self.mismatch is not None:
+            return False
+        for index, char in enumerate(chunk):
+            if char.isspace():
+                if self._started:
+                    self._pending_whitespace.append(char)
+                continue
+            self._started = True
+            for pending in self._pending_whitespace:
+                if not self._consume(pending, chunk, index):
+                    return False
+            self._pending_whitespace.clear()
+            if not self._consume(char, chunk, index + 1):
+                return False
+        return True
+
+    def finish(self) -> bool:
+        """
+        Завершает сравнение после конца вывода
+
+        Returns:
+            bool: True, если вывод совпал с ожидаемым
+        """
+        if self.mismatch is None and self.position < len(self.expected):
+            self._record(actual=self._line_text() + "<end of output>")
+        return self.mismatch is None
+
+    def _consume(self, char: str, chunk: str, rest: int) -> bool:
+        if self.position < len(self.expected) and self.expected[self.position] == char:
+            self.position += 1
+            if char == "\n":
+                self._line.clear()
+            elif len(self._line) < EXCERPT_LIMIT:
+                self._line.append(char)
+            return True
+        # Для описания берем остаток строки из уже прочитанного куска
+        tail = chunk[rest:].split("\n", 1)[0]
+        actual = self._line_text() + (char if char != "\n" else "\\n") + tail
+        self._record(actual=actual[:EXCERPT_LIMIT])
+        return False
+
+    def _line_text(self) -> str:
+        return "".join(self._line)
+
+    def _record(self, actual: str) -> None:
+        line = self.expected.count("\n", 0, self.position) + 1
+        line_start = self.expected.rfind("\n", 0, self.position) + 1
+        line_end = self.expected.find("\n", self.position)
+        expected_line = self.expected[line_start:line_end if line_end != -1 else len(self.expected)]
+        if self.position >= len(self.expected):
+            expected_line += "<end of output>"
+        self.mismatch = Mismatch(
+            line=line,
+            column=self.position - line_start + 1,
+            expected=expected_line[:EXCERPT_LIMIT],
+            actual=actual,
+        )
@@ -0,0 +1,72 @@
+"""
+Заглушка чат-модели для запуска графа lta без Ollama
+
+Модель не обращается к сети: на каждый вызов она возвращает очередное
+решение из списка в виде вызова инструмента WritePythonTool, выдержав
+заданную задержку. Счетчик вызовов общий для копий модели
+(model_copy с другой температурой), поэтому параллельные кандидаты
+получают разные решения, как при выборке с ненулевой температурой.
+
+Пример:
+    llm = FakeSolverModel(solutions=["print('true')", "print(input())"], latencies=[0.5, 0.1])
+    graph = build_graph(llm)
+"""
+import asyncio
+import itertools
+import time
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field, PrivateAttr
+
+
+class FakeSolverModel(BaseChatModel):
+    """Отдает заранее заданные решения по кругу"""
+
+    solutions: list[str]
+    # Задержка ответа в секундах для каждого вызова, по кругу
+    latencies: list[float] = Field(default_factory=lambda: [0.0])
+    temperature: float = 0.0
+
+    _calls: Any = PrivateAttr(default_factory=itertools.count)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-solver"
+
+    def bind_tools(self, tools, **kwargs) -> "FakeSolverModel":
+        # Ответы и так оформлены как вызов WritePythonTool
+        return self
+
+    def _next(self, messages: list[BaseMessage]) -> tuple[AIMessage, float]:
+        index = next(self._calls)
+        code = self.solutions[index % len(self.solutions)]
+        latency = self.latencies[index % len(self.latencies)]
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4 + 1
+        output_tokens = len(code) // 4 + 1
+        message = AIMessage(
+            content="",
+            tool_calls=[{
+                "id": f"call_{index}",
+                "name": "WritePythonTool",
+                "args": {"reasoning": f"Candidate {index}", "pseudocode": "", "code": code},
+            }],
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return message, latency
+
+    def _generate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message, latency = self._next(messages)
+        time.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message, latency = self._next(messages)
+        await asyncio.sleep(latency)
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -1,33 +1,53 @@
 # %%capture --no-stderr
 # %pip install -U langgraph langsmith langchain-ollama
 
+import atexit
+import codecs
+import asyncio
 import getpass
+import json
+import operator
 import os
-import multiprocessing
-import queue
 import subprocess
 import sys
+import threading
 import time
 import traceback
-from typing import Annotated, List, TypedDict
-from typing_extensions import TypedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Annotated, Callable, List, TypedDict
+from typing_extensions import NotRequired, TypedDict
 from langgraph.graph.message import AnyMessage, add_messages
 from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from langchain import hub
 from langchain_ollama import ChatOllama
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
 from langgraph.graph import END, StateGraph, START
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
 from langchain_core.tracers.context import tracing_v2_enabled
 from langsmith import Client
+from checker import OutputComparator
+from sandbox import ExecutionResult, SandboxError, SandboxPool
+from memo import ExecutionMemo, execution_key
+from toolchains import TOOLCHAINS, BuildCache, normalize_language, resource_limits
 
 
 MAX_ATTEMPTS = 10
-EXECUTION_TIMEOUT_BUFFER = 1
-
-
-multiprocessing.set_start_method("fork", force=True)
+# На каждую попытку приходится три узла графа: compact, solver и evaluate
+RECURSION_LIMIT = 3 * MAX_ATTEMPTS + 2
+# Бюджет токенов истории, которая уходит в модель на каждой попытке
+CONTEXT_TOKEN_BUDGET = int(os.getenv("LTA_CONTEXT_TOKEN_BUDGET", "8000"))
+# Сколько символов входа и ожидаемого вывода теста попадает в обратную связь
+FEEDBACK_PAYLOAD_LIMIT = 300
+# Тесты выполняются параллельно, не больше одного интерпретатора на ядро
+MAX_TEST_WORKERS = os.cpu_count() or 1
+# Решения выполняются в заранее запущенных интерпретаторах (sandbox.py), если доступен fork
+SANDBOX_ENABLED = hasattr(os, "fork") and os.getenv("LTA_SANDBOX", "1") == "1"
+SANDBOX_MEMORY_LIMIT = 512 * 1024 * 1024
+# Сколько байт stdout и stderr решение может вывести за один тест
+OUTPUT_LIMIT = 1024 * 1024
+# Температуры кандидатов в режиме best-of-N, по кругу
+CANDIDATE_TEMPERATURES = (0.0, 0.3, 0.6, 0.9)
 
 
 class TestCase(TypedDict):
@@ -42,90 +62,417 @@ class State(TypedDict):
     runtime_limit: int
     status: str
     problem_level: str
+    fail_fast: NotRequired[bool]  # Остановить проверку после первого непройденного теста
+    attempts: NotRequired[int]  # Число сгенерированных решений
+    failure_log: NotRequired[Annotated[list[str], operator.add]]  # Краткий итог каждой неудачной попытки
+    prompt_tokens: NotRequired[Annotated[list[int], operator.add]]  # Токены промпта на каждой попытке
+    num_candidates: NotRequired[int]  # Сколько решений генерировать параллельно на одной попытке
+    first_pass_seconds: NotRequired[float]  # Время от начала попытки до первого решения, прошедшего все тесты
+    language: NotRequired[str]  # Язык решения: python (по умолчанию), cpp или java
+    sandbox_seconds: NotRequired[Annotated[float, operator.add]]  # Суммарное время прогона тестов
 
 class WritePythonTool(BaseModel):
     """Инструмент для написания Python кода."""
     reasoning: str = Field(..., description="Концептуальное решение.")
     pseudocode: str = Field(..., description="Детальный псевдокод на английском языке.")
-    code: str = Field(..., description="Действительный Python 3 код, решающий проблему")
-
-def _execute_python_code(program: str, input_data: str, timeout: float) -> tuple[str | None, str | None, int]:
-    """Выполняет Python код в подпроцессе и возвращает stdout, stderr и код возврата."""
+    code: str = Field(..., description="Действительный код на языке из условия (по умолчанию Python 3), решающий проблему")
+
+def _execute_python_code(
+    program: str,
+    input_data: str,
+    expected_output: str | None,
+    timeout: float,
+    on_start: Callable[[subprocess.Popen], None] | None = None,
+) -> ExecutionResult:
+    """Выполняет Python код в подпроцессе python -c; используется, когда песочница недоступна."""
+    limits = resource_limits(SANDBOX_MEMORY_LIMIT, timeout)
+    return _execute_process([sys.executable, "-c", program], input_data, expected_output, timeout, on_start, limits)
+
+def _execute_process(
+    command: list[str],
+    input_data: str,
+    expected_output: str | None,
+    timeout: float,
+    on_start: Callable[[subprocess.Popen], None] | None = None,
+    limit: Callable[[int], None] | None = None,
+) -> ExecutionResult:
+    """Запускает команду в подпроцессе, читая вывод потоково.
+
+    stdout сравнивается с ожидаемым по мере поступления; при расхождении
+    или превышении лимита вывода процесс останавливается. on_start получает
+    запущенный процесс, чтобы его можно было остановить извне, а limit
+    выставляет ограничения ресурсов процессу по pid до передачи входных данных."""
+    process = None
     try:
         process = subprocess.Popen(
-            [sys.executable, "-c", program],
+            command,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
+            bufsize=0,
         )
-        stdout, stderr = process.communicate(input=input_data, timeout=timeout)
-        return stdout, stderr, process.returncode
-    except subprocess.TimeoutExpired:
-        if process:
+        if limit is not None:
+            limit(process.pid)
+        if on_start is not None:
+            on_start(process)
+    except Exception:
+        if process is not None:
             process.kill()
-        return None, "Execution timed out.", -1
-    except Exception as e:
-        return None, traceback.format_exc(), -1
-
-def _normalize_output(output: str | None) -> str:
-    """Нормализует вывод, удаляя лишние пробелы."""
-    return output.strip() if output is not None else ""
-
-def check_code_correctness(program: str, input_data: str, expected_output: str, timeout: float) -> str:
-    """Проверяет корректность Python кода, выполняя его на заданных входных данных."""
-    q = multiprocessing.Queue()
-    process = multiprocessing.Process(
-        target=_run_and_check_code, args=(q, program, input_data, expected_output, timeout)
-    )
-    process.start()
-    print('start process')
-    process.join(timeout=timeout + EXECUTION_TIMEOUT_BUFFER)
-
-    if process.is_alive():
-        process.terminate()
-        process.join()
-        result = "timed out"
-    else:
+            process.wait()
+        return ExecutionResult(stdout="", stderr=traceback.format_exc(), returncode=-1)
+
+    comparator = OutputComparator(expected_output) if expected_output is not None else None
+    # Лимит считается сверх ожидаемого вывода: лишний вывод и так остановит сравнение
+    output_limit = OUTPUT_LIMIT + (len(expected_output.encode("utf-8")) if expected_output is not None else 0)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    stdout_parts: list[bytes] = []
+    stderr_parts: list[bytes] = []
+    output_size = 0
+    flags = {"output_exceeded": False, "stopped_early": False}
+    size_lock = threading.Lock()
+
+    def feed_input() -> None:
         try:
-            result = q.get_nowait()
-        except queue.Empty:
-            result = "failed: No result returned from subprocess."
-        except Exception as e:
-            result = f"failed: Error retrieving result from queue: {e}"
-
-    q.close()
-    q.join_thread()
-    return result
-
-def _run_and_check_code(q: multiprocessing.Queue, program: str, input_data: str, expected_output: str, timeout: float):
-    """Выполняет код и помещает результат проверки в очередь."""
-    # print('start checking code')
-    stdout, stderr, returncode = _execute_python_code(program, input_data, timeout)
+            process.stdin.write(input_data.encode("utf-8"))
+        except (BrokenPipeError, OSError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    def read(stream, parts: list[bytes], compare: bool) -> None:
+        nonlocal output_size
+        while chunk := stream.read(65536):
+            with size_lock:
+                output_size += len(chunk)
+                exceeded = output_size > output_limit
+            if exceeded:
+                flags["output_exceeded"] = True
+                process.kill()
+                return
+            if compare and comparator is not None:
+                if not comparator.feed(decoder.decode(chunk)):
+                    flags["stopped_early"] = True
+                    process.kill()
+                    return
+                # Сравниваемый вывод целиком не храним
+                continue
+            parts.append(chunk)
+
+    threads = [
+        threading.Thread(target=feed_input, daemon=True),
+        threading.Thread(target=read, args=(process.stdout, stdout_parts, True), daemon=True),
+        threading.Thread(target=read, args=(process.stderr, stderr_parts, False), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+    timed_out = False
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        process.kill()
+        process.wait()
+    for thread in threads:
+        thread.join()
+
+    matched = None
+    if comparator is not None and not (timed_out or flags["output_exceeded"] or flags["stopped_early"]):
+        matched = comparator.feed(decoder.decode(b"", final=True)) and comparator.finish()
+    return ExecutionResult(
+        stdout=b"".join(stdout_parts).decode("utf-8", errors="replace"),
+        stderr=b"".join(stderr_parts).decode("utf-8", errors="replace"),
+        returncode=process.returncode,
+        timed_out=timed_out,
+        output_exceeded=flags["output_exceeded"],
+        stopped_early=flags["stopped_early"],
+        matched=matched if not flags["stopped_early"] else False,
+        mismatch=comparator.mismatch.describe() if comparator is not None and comparator.mismatch else None,
+    )
 
-    if stderr and returncode != 0:
-        # print('error while checking code')
-        q.put(f"failed: {stderr}")
-    elif stdout is not None:
-        actual_output_normalized = _normalize_output(stdout)
-        expected_output_normalized = _normalize_output(expected_output)
-        if actual_output_normalized == expected_output_normalized:
-            # print("Test passed")
-            q.put("passed")
-        else:
-            # print('Found wrong test')
-            q.put(f"wrong answer. Expected '{expected_output_normalized}', got '{actual_output_normalized}'")
+_build_cache = BuildCache()
+_execution_memo = ExecutionMemo()
+
+_sandbox_pool: SandboxPool | None = None
+_sandbox_pool_lock = threading.Lock()
+
+def _get_sandbox_pool() -> SandboxPool:
+    """Запускает пул исполнителей при первой проверке и переиспользует его дальше."""
+    global _sandbox_pool
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None:
+            _sandbox_pool = SandboxPool(MAX_TEST_WORKERS, SANDBOX_MEMORY_LIMIT, OUTPUT_LIMIT)
+            atexit.register(_sandbox_pool.close)
+        return _sandbox_pool
+
+def _execute_in_sandbox(
+    program: str,
+    input_data: str,
+    expected_output: str | None,
+    timeout: float,
+    on_start: Callable | None = None,
+) -> ExecutionResult:
+    """Выполняет Python код в исполнителе песочницы.
+
+    Код компилируется один раз на исполнителя, каждый запуск идет в отдельном fork
+    с ограничениями времени, памяти и размера вывода, а stdout сравнивается
+    с ожидаемым по мере поступления."""
+    try:
+        return _get_sandbox_pool().run(program, input_data, timeout, on_start, expected_output)
+    except SandboxError:
+        return ExecutionResult(stdout="", stderr=traceback.format_exc(), returncode=-1)
+
+def check_code_correctness(
+    program: str,
+    input_data: str,
+    expected_output: str,
+    timeout: float,
+    on_start: Callable | None = None,
+    language: str = "python",
+) -> str:
+    """Проверяет корректность кода, выполняя его на заданных входных данных.
+
+    Код уже выполняется в отдельном процессе с таймаутом, поэтому
+    дополнительный процесс-посредник не нужен, и функцию можно вызывать из потоков.
+    on_start получает объект с методом kill() для прерывания запуска.
+    Вывод сравнивается потоково (без учета пробелов в начале и конце),
+    и при неверном ответе сообщается позиция первого расхождения.
+    Код на C++ и Java компилируется один раз (toolchains.BuildCache) и запускается
+    с лимитами времени процессора и памяти, как Python в песочнице,
+    а вердикты повторных запусков того же кода на тех же данных берутся из кэша.
+    Неизвестный язык вызывает ValueError."""
+    language = normalize_language(language)
+    key = execution_key(program, language, input_data, expected_output, timeout, SANDBOX_MEMORY_LIMIT, OUTPUT_LIMIT)
+    verdict = _execution_memo.get(key)
+    if verdict is not None:
+        return verdict
+
+    # print('start checking code')
+    if language in TOOLCHAINS:
+        build = _build_cache.build(language, program, SANDBOX_MEMORY_LIMIT)
+        if build.error is not None:
+            verdict = f"failed: Compilation error.\n{build.error}"
+            _execution_memo.put(key, verdict)
+            return verdict
+        limits = resource_limits(SANDBOX_MEMORY_LIMIT if build.limit_address_space else None, timeout)
+        result = _execute_process(build.command, input_data, expected_output, timeout, on_start, limits)
     else:
-        q.put("timed out")
+        execute = _execute_in_sandbox if SANDBOX_ENABLED else _execute_python_code
+        result = execute(program, input_data, expected_output, timeout, on_start)
+
+    verdict = _verdict(result)
+    # Таймаут и снятие процесса извне зависят от загрузки машины и fail-fast, их не кэшируем
+    killed = result.returncode < 0 and not (result.stopped_early or result.output_exceeded)
+    if not (result.timed_out or result.cancelled or killed):
+        _execution_memo.put(key, verdict)
+    return verdict
+
+def _verdict(result: ExecutionResult) -> str:
+    """Переводит результат запуска в вердикт для обратной связи."""
+    if result.timed_out:
+        return "failed: Execution timed out."
+    if result.output_exceeded:
+        return "failed: Output limit exceeded."
+    if result.stopped_early:
+        # print('Found wrong test')
+        return f"wrong answer. {result.mismatch}"
+    if result.returncode != 0 and (result.stderr or result.returncode < 0):
+        # print('error while checking code')
+        stderr = result.stderr or f"Killed by signal {-result.returncode} (CPU or memory limit exceeded)."
+        return f"failed: {stderr}"
+    if result.matched:
+        # print("Test passed")
+        return "passed"
+    # print('Found wrong test')
+    return f"wrong answer. {result.mismatch}"
+
+def run_test_cases(
+    program: str,
+    test_cases: list[TestCase],
+    timeout: float,
+    fail_fast: bool = False,
+    language: str = "python",
+) -> list[str | None]:
+    """Запускает тесты параллельно в пуле из MAX_TEST_WORKERS потоков.
+
+    В режиме fail_fast после первого непройденного теста оставшиеся не запускаются,
+    а уже выполняющиеся процессы останавливаются; для них возвращается None."""
+    results: list[str | None] = [None] * len(test_cases)
+    if not test_cases:
+        return results
+
+    cancelled = threading.Event()
+    running: list = []  # Процессы и запуски песочницы (sandbox.RunHandle) этой проверки с методом kill()
+    lock = threading.Lock()
+
+    def register(process) -> None:
+        with lock:
+            if cancelled.is_set():
+                process.kill()
+            else:
+                running.append(process)
+
+    def run(test_case: TestCase) -> str | None:
+        if cancelled.is_set():
+            return None
+        result = check_code_correctness(program, test_case["inputs"], test_case["outputs"], timeout, register, language)
+        if cancelled.is_set() and result != "passed":
+            return None
+        return result
+
+    workers = min(len(test_cases), MAX_TEST_WORKERS)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, test_case): i for i, test_case in enumerate(test_cases)}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            result = future.result()
+            results[futures[future]] = result
+            if fail_fast and result is not None and result != "passed" and not cancelled.is_set():
+                with lock:
+                    cancelled.set()
+                    for process in running:
+                        process.kill()
+                for pending in futures:
+                    pending.cancel()
+    return results
+
+_background_loop: asyncio.AbstractEventLoop | None = None
+_background_loop_lock = threading.Lock()
+
+def _run_in_background_loop(coroutine):
+    """Выполняет корутину в общем фоновом цикле событий и ждет результат.
+
+    Асинхронный клиент модели привязан к циклу, в котором он впервые
+    использован, поэтому все попытки best-of-N идут в одном долгоживущем
+    цикле, а не в новом asyncio.run на каждую попытку. Цикл один на процесс:
+    графы, собранные повторно, не оставляют за собой потоков."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="lta-solver-loop", daemon=True).start()
+            atexit.register(_background_loop.call_soon_threadsafe, _background_loop.stop)
+        loop = _background_loop
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
 
 class Solver:
-    """Узел графа, отвечающий за генерацию Python кода с помощью LLM."""
+    """Узел графа, отвечающий за генерацию Python кода с помощью LLM.
+
+    При num_candidates > 1 в состоянии на одной попытке параллельно
+    генерируется несколько решений с разной температурой. Каждое решение
+    проверяется сразу по готовности, первое прошедшее все тесты побеждает,
+    а генерация остальных отменяется. Если не прошло ни одно, дальше идет
+    решение с наибольшим числом пройденных тестов вместе с обратной связью."""
     def __init__(self, llm: BaseChatModel, prompt: ChatPromptTemplate):
+        self.llm = llm
+        self.prompt = prompt
         self.runnable = prompt | llm.bind_tools([WritePythonTool])
+        self._candidate_runnables = {}
+
+    def _candidate_runnable(self, index: int):
+        """Цепочка для кандидата с номером index, температура берется из CANDIDATE_TEMPERATURES."""
+        temperature = CANDIDATE_TEMPERATURES[index % len(CANDIDATE_TEMPERATURES)]
+        if temperature not in self._candidate_runnables:
+            llm = self.llm
+            if "temperature" in type(llm).model_fields:
+                llm = llm.model_copy(update={"temperature": temperature})
+            self._candidate_runnables[temperature] = self.prompt | llm.bind_tools([WritePythonTool])
+        return self._candidate_runnables[temperature]
 
     def __call__(self, state: State) -> dict:
-        response = self.runnable.invoke({"messages": state["messages"]})
-        return {"messages": [response]}
+        num_candidates = state.get("num_candidates", 1)
+        if num_candidates > 1:
+            return _run_in_background_loop(self._best_of_n(state, num_candidates))
+
+        response = self.runnable.invoke(_prompt_input(state))
+        usage = getattr(response, "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens") or _estimate_tokens(state["messages"])
+        print(f"Attempt {state.get('attempts', 0) + 1}: {prompt_tokens} prompt tokens")
+        return {
+            "messages": [response],
+            "attempts": state.get("attempts", 0) + 1,
+            "prompt_tokens": [prompt_tokens],
+        }
+
+    async def _best_of_n(self, state: State, num_candidates: int) -> dict:
+        attempt = state.get("attempts", 0) + 1
+        print(f"Attempt {attempt}: generating {num_candidates} candidates concurrently")
+        started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(self._candidate_runnable(i).ainvoke(_prompt_input(state)))
+            for i in range(num_candidates)
+        ]
+        prompt_tokens = 0
+        sandbox_seconds = 0.0
+        best = None
+        errors = []
+        try:
+            for next_candidate in asyncio.as_completed(tasks):
+                try:
+                    response = await next_candidate
+                except Exception as e:
+                    print(f"Candidate generation failed: {repr(e)}")
+                    errors.append(e)
+                    continue
+                usage = getattr(response, "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens") or _estimate_tokens(state["messages"])
+                # Тесты идут в потоке, чтобы остальные кандидаты продолжали генерироваться
+                update, passed = await asyncio.to_thread(_evaluate_submission, response, {**state, "attempts": attempt})
+                sandbox_seconds += update.get("sandbox_seconds", 0.0)
+                if update.get("status") == "success":
+                    first_pass_seconds = time.perf_counter() - started
+                    print(f"Candidate passed all tests after {first_pass_seconds:.2f} s")
+                    return {
+                        "messages": [response],
+                        "status": "success",
+                        "attempts": attempt,
+                        "prompt_tokens": [prompt_tokens],
+                        "first_pass_seconds": first_pass_seconds,
+                        "sandbox_seconds": sandbox_seconds,
+                    }
+                if best is None or passed > best[2]:
+                    best = (response, update, passed)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if best is None:
+            raise errors[-1]
+        response, update, _ = best
+        return {
+            "messages": [response, *update["messages"]],
+            "failure_log": update["failure_log"],
+            "attempts": attempt,
+            "prompt_tokens": [prompt_tokens],
+            "sandbox_seconds": sandbox_seconds,
+        }
+
+def _prompt_input(state: State) -> dict:
+    """Переменные промпта solver: история и название языка решения."""
+    language = normalize_language(state.get("language", "python"))
+    return {
+        "messages": state["messages"],
+        "language": TOOLCHAINS[language].name if language in TOOLCHAINS else "Python 3",
+    }
+
+def _estimate_tokens(messages: list[AnyMessage]) -> int:
+    """Грубая оценка числа токенов сообщений: около четырех символов на токен."""
+    characters = 0
+    for message in messages:
+        characters += len(str(message.content))
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            characters += len(json.dumps(tool_call.get("args", {}), ensure_ascii=False))
+    return characters // 4 + 1
+
+def _truncate(text: str, limit: int) -> str:
+    """Оставляет начало длинного текста и отмечает, сколько отброшено."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
 
 def _format_tool_error_message(ai_message: AIMessage, error_message: str) -> ToolMessage | HumanMessage:
     """Форматирует сообщение об ошибке, связанной с вызовом инструмента."""
@@ -137,13 +484,21 @@ def _format_tool_error_message(ai_message: AIMessage, error_message: str) -> Too
 
 def evaluate_code(state: State) -> dict:
     """Узел графа, отвечающий за выполнение и оценку сгенерированного кода."""
+    update, _ = _evaluate_submission(state["messages"][-1], state)
+    return update
+
+def _evaluate_submission(ai_message: AnyMessage, state: State) -> tuple[dict, int]:
+    """Проверяет одно решение на тестах из состояния.
+
+    Returns:
+        tuple[dict, int]: Обновление состояния и число пройденных тестов"""
     test_cases = state["test_cases"]
     runtime_limit = state["runtime_limit"]
-    ai_message: AIMessage = state["messages"][-1]
+    attempt = state.get("attempts", 0)
 
     if not isinstance(ai_message, AIMessage) or not ai_message.tool_calls:
         error_content = "No valid code submission found in the last message. Please try again using the 'writePython' tool."
-        return {"messages": [HumanMessage(content=error_content)]}
+        return {"messages": [HumanMessage(content=error_content)], "failure_log": [f"Attempt {attempt}: no code submitted."]}, 0
 
     try:
         tool_call = ai_message.tool_calls[0]
@@ -152,70 +507,139 @@ def evaluate_code(state: State) -> dict:
         code = tool_call["args"]["code"]
     except (IndexError, KeyError, Exception) as e:
         error_message = f"Failed to parse code from tool call: {repr(e)}. Ensure you are using the 'writePython' tool correctly with 'reasoning', 'pseudocode', and 'code' arguments."
-        return {"messages": [_format_tool_error_message(ai_message, error_message)]}
+        return {
+            "messages": [_format_tool_error_message(ai_message, error_message)],
+            "failure_log": [f"Attempt {attempt}: malformed tool call ({repr(e)})."],
+        }, 0
 
     num_test_cases = len(test_cases)
-    succeeded_count = 0
-    test_results = []
+    fail_fast = state.get("fail_fast", False)
+    language = normalize_language(state.get("language", "python"))
 
     print("\n--- Evaluating Code ---")
-    print(f"Code:\n```python\n{code}\n```")
-    print(f"Running {num_test_cases} test case(s)...")
-
-    for i, test_case in enumerate(test_cases):
-        input_data = test_case["inputs"]
-        expected_output = test_case["outputs"]
-        print(f"Test {i+1}: Input='{input_data}', Expected='{expected_output}'")
-        test_result = check_code_correctness(code, input_data, expected_output, runtime_limit)
-        print(f"Test {i+1} Result: {test_result}")
-        test_results.append(test_result)
-        if test_result == "passed":
-            succeeded_count += 1
-
+    print(f"Code:\n```{language}\n{code}\n```")
+    print(f"Running {num_test_cases} test case(s) on up to {min(num_test_cases, MAX_TEST_WORKERS)} worker(s)...")
+
+    hits_before = _execution_memo.hits
+    started = time.perf_counter()
+    test_results = run_test_cases(code, test_cases, runtime_limit, fail_fast, language)
+    sandbox_seconds = time.perf_counter() - started
+    if _execution_memo.hits > hits_before:
+        print(f"Reused {_execution_memo.hits - hits_before} cached test result(s)")
+    for i, (test_case, test_result) in enumerate(zip(test_cases, test_results)):
+        print(f"Test {i+1}: Input='{test_case['inputs']}', Expected='{test_case['outputs']}'")
+        print(f"Test {i+1} Result: {test_result if test_result is not None else 'skipped'}")
+
+    succeeded_count = sum(1 for r in test_results if r == "passed")
+    skipped_count = sum(1 for r in test_results if r is None)
     pass_rate = succeeded_count / num_test_cases if num_test_cases > 0 else 0.0
-    print(f"--- Evaluation Complete: {succeeded_count}/{num_test_cases} passed ---")
+    print(f"--- Evaluation Complete: {succeeded_count}/{num_test_cases} passed, {skipped_count} skipped ---")
 
     if pass_rate == 1.0:
         print("All tests passed! Status set to success.")
-        return {"status": "success"}
+        return {"status": "success", "sandbox_seconds": sandbox_seconds}, succeeded_count
     else:
+        # Пройденные тесты перечисляются без данных, у непройденных данные обрезаются:
+        # позиция первого расхождения уже есть в результате
         responses = "\n".join(
-            [f"<test id={i}>\nInput:\n{tc['inputs']}\nExpected Output:\n{tc['outputs']}\nResult: {r}\n</test>"
-             for i, (tc, r) in enumerate(zip(test_cases, test_results))]
+            [f"<test id={i}>\nResult: passed\n</test>" if r == "passed" else
+             f"<test id={i}>\nInput:\n{_truncate(tc['inputs'], FEEDBACK_PAYLOAD_LIMIT)}\n"
+             f"Expected Output:\n{_truncate(tc['outputs'], FEEDBACK_PAYLOAD_LIMIT)}\n"
+             f"Result: {_truncate(r, FEEDBACK_PAYLOAD_LIMIT)}\n</test>"
+             for i, (tc, r) in enumerate(zip(test_cases, test_results)) if r is not None]
         )
-        response = f"Incorrect submission. Please review the feedback and respond with updated code.\nPass rate: {succeeded_count}/{num_test_cases}\nTest Results:\n{responses}"
+        skipped_note = f"\nSkipped after the first failure: {skipped_count}" if skipped_count else ""
+        response = f"Incorrect submission. Please review the feedback and respond with updated code.\nPass rate: {succeeded_count}/{num_test_cases}{skipped_note}\nTest Results:\n{responses}"
         formatted_message = ToolMessage(content=response + "\nMake all fixes using the writePython tool.",
                                         tool_call_id=ai_message.tool_calls[0].get("id") if ai_message.tool_calls else None)
-        return {"messages": [formatted_message]}
+        first_failure = next(
+            (f"test {i}: {r}" for i, r in enumerate(test_results) if r is not None and r != "passed"), "none"
+        )
+        summary = f"Attempt {attempt}: passed {succeeded_count}/{num_test_cases}; first failure: {_truncate(first_failure, 200)}"
+        return {"messages": [formatted_message], "failure_log": [summary], "sandbox_seconds": sandbox_seconds}, succeeded_count
+
+def compact_history(state: State) -> dict:
+    """Узел графа, сжимающий историю перед следующей попыткой.
+
+    Оставляет условие задачи, краткий журнал прошлых неудачных попыток,
+    последнее решение и обратную связь по нему. Если история все равно
+    не укладывается в CONTEXT_TOKEN_BUDGET, из журнала убираются самые старые
+    записи, а затем обрезается обратная связь."""
+    messages = state["messages"]
+    last_submission = max((i for i, m in enumerate(messages) if isinstance(m, AIMessage)), default=None)
+    if last_submission is None:
+        return {}
+
+    task = messages[0]
+    latest = list(messages[last_submission:])
+    # Журнал без последней попытки: ее подробности есть в обратной связи
+    log = list(state.get("failure_log", []))[:-1]
+
+    def build() -> list[AnyMessage]:
+        compacted = [task]
+        if log:
+            compacted.append(HumanMessage(
+                content="Summary of earlier failed attempts (their code is omitted):\n" + "\n".join(log),
+                id="attempt-summary",
+            ))
+        return compacted + latest
+
+    compacted = build()
+    while _estimate_tokens(compacted) > CONTEXT_TOKEN_BUDGET and log:
+        log.pop(0)
+        compacted = build()
+    overflow = _estimate_tokens(compacted) - CONTEXT_TOKEN_BUDGET
+    if overflow > 0:
+        feedback = latest[-1]
+        if not isinstance(feedback, AIMessage):
+            keep = max(len(str(feedback.content)) - overflow * 4, FEEDBACK_PAYLOAD_LIMIT)
+            latest[-1] = feedback.model_copy(update={"content": _truncate(str(feedback.content), keep)})
+            compacted = build()
+
+    before = _estimate_tokens(messages)
+    after = _estimate_tokens(compacted)
+    print(f"Compacted history: ~{before} -> ~{after} tokens, {len(messages)} -> {len(compacted)} messages")
+    return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + compacted}
 
 def should_continue(state: State) -> str:
     """Определяет, следует ли продолжать цикл решения."""
     if state.get("status") == "success":
         return END
-    if len(state.get("messages", [])) > MAX_ATTEMPTS:
+    if state.get("attempts", 0) >= MAX_ATTEMPTS:
         print("Reached maximum attempts.")
         return END
     return "solver"
 
+def route_after_solver(state: State) -> str:
+    """Отправляет решение на проверку, если solver не проверил его сам (режим best-of-N)."""
+    if isinstance(state["messages"][-1], AIMessage) and state.get("status") != "success":
+        return "evaluate"
+    return should_continue(state)
+
 # --- Graph Definition ---
 prompt = ChatPromptTemplate.from_messages(
     [
-        ("system", "You are an expert Python programmer. Write Python code to solve the user's problem in format solution function, input data. Structure your response using the 'writePython' tool, including reasoning, pseudocode, and the final Python code."),
+        ("system", "You are an expert {language} programmer. Write {language} code to solve the user's problem in format solution function, input data. Structure your response using the 'writePython' tool, including reasoning, pseudocode, and the final {language} code."),
         ("placeholder", "{messages}"),
     ]
 )
 
-llm = ChatOllama(model="qwen2.5-coder:32b", temperature=0)
-solver = Solver(llm, prompt)
-
-builder = StateGraph(State)
-builder.add_node("solver", solver)
-builder.add_node("evaluate", evaluate_code)
-builder.add_conditional_edges(START, should_continue, {END: END, "solver": "solver"}) # Условный переход от START
-builder.add_edge("solver", "evaluate")
-builder.add_conditional_edges("evaluate", should_continue, {END: END, "solver": "solver"})
+def build_graph(llm: BaseChatModel):
+    """Собирает граф решения задачи с заданной чат-моделью."""
+    builder = StateGraph(State)
+    builder.add_node("solver", Solver(llm, prompt))
+    builder.add_node("evaluate", evaluate_code)
+    builder.add_node("compact", compact_history)
+    builder.add_conditional_edges(START, should_continue, {END: END, "solver": "solver"}) # Условный переход от START
+    # В режиме best-of-N solver сам проверяет кандидатов, и отдельная проверка не нужна
+    builder.add_conditional_edges("solver", route_after_solver, {"evaluate": "evaluate", END: END, "solver": "compact"})
+    # Перед повторной попыткой история сжимается до условия, журнала неудач и последнего решения
+    builder.add_conditional_edges("evaluate", should_continue, {END: END, "solver": "compact"})
+    builder.add_edge("compact", "solver")
+    return builder.compile()
 
-graph = builder.compile()
+llm = ChatOllama(model="qwen2.5-coder:32b", temperature=0)
+graph = build_graph(llm)
 
 # --- Testing with a Simple Sum Task ---
 if __name__ == '__main__':
@@ -237,12 +661,30 @@ if __name__ == '__main__':
         runtime_limit=2,
         status="in_progress",
         problem_level="easy",
+        num_candidates=int(os.getenv("LTA_NUM_CANDIDATES", "1")),
     )
 
+    if os.getenv("LTA_FAKE_LLM") == "1":
+        from fake_llm import FakeSolverModel
+
+        # Запуск без Ollama: неверные решения приходят раньше верного
+        graph = build_graph(FakeSolverModel(
+            solutions=["print('true')", "print('false')", "x = input().strip()\nprint('true' if x == x[::-1] else 'false')"],
+            latencies=[0.2, 0.4, 0.6],
+        ))
+
     # client = Client(hide_inputs=False, hide_outputs=False) # Simpler task, no need to hide
     print("\n--- Running Graph ---")
-    events = graph.stream(input_state, {"recursion_limit": MAX_ATTEMPTS + 2}) # Учитываем начальное сообщение и возможные итерации
-    for event in events:
+    started = time.perf_counter()
+    first_pass = None
+    events = graph.stream(input_state, {"recursion_limit": RECURSION_LIMIT}, stream_mode=["updates", "values"])
+    final_state = {}
+    for mode, event in events:
+        if mode == "values":
+            final_state = event
+            if first_pass is None and event.get("status") == "success":
+                first_pass = time.perf_counter() - started
+            continue
         # print(f"Event: {event}")
         for node, value in event.items():
             if node != "__end__":
@@ -259,4 +701,7 @@ if __name__ == '__main__':
                 # if status:
                     # print(f"Status Updated: {status}")
 
-    print("\n--- Graph Execution Finished ---")
\ No newline at end of file
+    print("\n--- Graph Execution Finished ---")
+    print(f"Prompt tokens per attempt: {final_state.get('prompt_tokens', [])}")
+    if first_pass is not None:
+        print(f"Wall clock to first pass: {first_pass:.2f} s over {final_state.get('attempts', 0)} attempt(s)")
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Кэш результатов проверки решений
+
+Модель часто присылает тот же код повторно, отличающийся разве что
+пробелами. Вердикт запуска зависит только от кода, языка, входа,
+ожидаемого вывода и лимитов, поэтому повторный запуск на тех же
+данных заменяется результатом из кэша. Запуски, исход которых зависит
+от загрузки машины или внешней отмены (таймаут, снятие процесса),
+не кэшируются.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+EXECUTION_CACHE_SIZE = int(os.getenv("LTA_EXECUTION_CACHE_SIZE", "4096"))
+
+
+def normalize_code(code: str) -> str:
+    """Убирает различия в переводах строк и хвостовых пробелах, не меняя смысла кода."""
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def execution_key(code: str, language: str, input_data: str, expected_output: str, *limits) -> str:
+    """Ключ кэша: хэш нормализованного кода, входа, ожидаемого вывода и лимитов."""
+    digest = hashlib.sha256()
+    for part in (language, normalize_code(code), input_data, expected_output, *map(str, limits)):
+        encoded = part.encode("utf-8")
+        # Длина перед каждой частью, чтобы границы частей не смешивались
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class ExecutionMemo:
+    """Потокобезопасный LRU-кэш вердиктов"""
+
+    def __init__(self, max_size: int = EXECUTION_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            verdict = self._items.get(key)
+            if verdict is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return verdict
+
+    def put(self, key: str, verdict: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = verdict
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
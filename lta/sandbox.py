@@ -0,0 +1,247 @@
+"""
+Пул заранее запущенных интерпретаторов для проверки решений
+
+Каждый исполнитель (sandbox_worker.py) стартует один раз, компилирует
+решение один раз на попытку и на каждый тест форкает дочерний процесс
+из уже готового интерпретатора. Так тест не платит за запуск нового
+Python и повторную компиляцию, а изоляция между тестами сохраняется.
+"""
+import hashlib
+import json
+import os
+import queue
+import signal
+import struct
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+DEFAULT_MEMORY_LIMIT = 512 * 1024 * 1024
+DEFAULT_OUTPUT_LIMIT = 1024 * 1024
+
+
+class SandboxError(Exception):
+    """Исполнитель песочницы завершился или нарушил протокол"""
+
+
+@dataclass
+class ExecutionResult:
+    """Результат одного запуска решения"""
+    stdout: str
+    stderr: str
+    returncode: int
+    timed_out: bool = False
+    output_exceeded: bool = False
+    cancelled: bool = False
+    # Запуск остановлен, потому что вывод уже разошелся с ожидаемым
+    stopped_early: bool = False
+    # Совпал ли вывод с ожидаемым; None, если ожидаемый вывод не передавался
+    matched: bool | None = None
+    mismatch: str | None = None
+    duration: float = 0.0
+
+
+class SandboxWorker:
+    """Один заранее запущенный интерпретатор-исполнитель"""
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, output_limit: int = DEFAULT_OUTPUT_LIMIT):
+        self.memory_limit = memory_limit
+        self.output_limit = output_limit
+        self._source_hash: str | None = None
+        self._compile_error: str | None = None
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        if not self._receive().get("ready"):
+            raise SandboxError("Sandbox worker failed to start")
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _send(self, message: dict) -> None:
+        body = json.dumps(message).encode("utf-8")
+        try:
+            self.process.stdin.write(struct.pack(">I", len(body)) + body)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise SandboxError(f"Sandbox worker is gone: {e}") from e
+
+    def _receive(self) -> dict:
+        header = self.process.stdout.read(4)
+        if len(header) < 4:
+            raise SandboxError("Sandbox worker exited unexpectedly")
+        (length,) = struct.unpack(">I", header)
+        body = self.process.stdout.read(length)
+        if len(body) < length:
+            raise SandboxError("Sandbox worker exited unexpectedly")
+        return json.loads(body)
+
+    def compile(self, source: str) -> str | None:
+        """
+        Компилирует решение, если исполнитель еще не держит этот же код
+
+        Returns:
+            str | None: Текст ошибки компиляции или None
+        """
+        source_hash = hashlib.sha256(source.encode("utf-8")).hexdigest()
+        if source_hash != self._source_hash:
+            self._send({"command": "compile", "source": source})
+            reply = self._receive()
+            self._source_hash = source_hash
+            self._compile_error = None if reply.get("ok") else reply.get("error", "Compilation failed")
+        return self._compile_error
+
+    def run(self, source: str, input_data: str, timeout: float, expected: str | None = None) -> ExecutionResult:
+        """
+        Выполняет решение на одном входе
+
+        Args:
+            source: Исходный код решения
+            input_data: Данные для stdin
+            timeout: Ограничение времени в секундах
+            expected: Ожидаемый вывод; если задан, stdout сравнивается с ним по мере поступления
+
+        Returns:
+            ExecutionResult: Вывод, код возврата и признаки прерывания
+
+        Raises:
+            SandboxError: Исполнитель недоступен
+        """
+        compile_error = self.compile(source)
+        if compile_error is not None:
+            return ExecutionResult(stdout="", stderr=compile_error, returncode=1)
+
+        self._send({
+            "command": "run",
+            "input": input_data,
+            "expected": expected,
+            "timeout": timeout,
+            "memory_limit": self.memory_limit,
+            "output_limit": self.output_limit,
+        })
+        reply = self._receive()
+        if "error" in reply:
+            raise SandboxError(reply["error"])
+        return ExecutionResult(**reply)
+
+    def kill(self) -> None:
+        """Прерывает текущий запуск; сам исполнитель продолжает работать"""
+        if self.is_alive():
+            os.kill(self.process.pid, signal.SIGUSR1)
+
+    def close(self) -> None:
+        if self.is_alive():
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+class RunHandle:
+    """
+    Один запуск в исполнителе, который можно прервать через kill()
+
+    После завершения запуска исполнитель возвращается в пул и может выполнять
+    чужой тест, поэтому kill() действует, только пока запуск не закончился.
+    """
+
+    def __init__(self, worker: SandboxWorker):
+        self._worker = worker
+        self._active = True
+        self._lock = threading.Lock()
+
+    def kill(self) -> None:
+        with self._lock:
+            if self._active:
+                self._worker.kill()
+
+    def finish(self) -> None:
+        with self._lock:
+            self._active = False
+
+
+class SandboxPool:
+    """
+    Пул исполнителей фиксированного размера
+
+    Все исполнители запускаются при создании пула. Исполнитель, который
+    упал или нарушил протокол, заменяется новым при следующем запросе.
+    """
+
+    def __init__(self, size: int, memory_limit: int = DEFAULT_MEMORY_LIMIT, output_limit: int = DEFAULT_OUTPUT_LIMIT):
+        self.size = size
+        self.memory_limit = memory_limit
+        self.output_limit = output_limit
+        self._idle: queue.Queue[SandboxWorker] = queue.Queue()
+        self._workers: list[SandboxWorker] = []
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._add_worker()
+
+    def _add_worker(self) -> SandboxWorker:
+        worker = SandboxWorker(self.memory_limit, self.output_limit)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+        return worker
+
+    @contextmanager
+    def worker(self) -> Iterator[SandboxWorker]:
+        """Берет свободного исполнителя на время одного запуска"""
+        worker = self._idle.get()
+        if not worker.is_alive():
+            worker = self._replace(worker)
+        try:
+            yield worker
+        except SandboxError:
+            worker = self._replace(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def _replace(self, worker: SandboxWorker) -> SandboxWorker:
+        worker.close()
+        replacement = SandboxWorker(self.memory_limit, self.output_limit)
+        with self._lock:
+            self._workers = [replacement if w is worker else w for w in self._workers]
+        return replacement
+
+    def run(self, source: str, input_data: str, timeout: float, on_start=None, expected: str | None = None) -> ExecutionResult:
+        """
+        Выполняет решение на одном входе в свободном исполнителе
+
+        Args:
+            source: Исходный код решения
+            input_data: Данные для stdin
+            timeout: Ограничение времени в секундах
+            on_start: Получает RunHandle, чтобы запуск можно было прервать через kill()
+            expected: Ожидаемый вывод для потокового сравнения
+
+        Returns:
+            ExecutionResult: Результат запуска
+        """
+        with self.worker() as worker:
+            handle = RunHandle(worker)
+            if on_start is not None:
+                on_start(handle)
+            try:
+                return worker.run(source, input_data, timeout, expected)
+            finally:
+                # Исполнитель вернется в пул только после этого, и kill() уже не заденет чужой запуск
+                handle.finish()
+
+    def close(self) -> None:
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.close()
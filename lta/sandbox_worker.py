@@ -0,0 +1,278 @@
+"""
+Процесс-исполнитель песочницы: держит готовый интерпретатор и запускает решение в fork
+
+Запускается из sandbox.SandboxWorker и общается с ним через stdin/stdout
+сообщениями с длиной в 4 байта и JSON-телом. Команды:
+- compile: компилирует исходный код один раз, байткод хранится до следующей компиляции;
+- run: форкает дочерний процесс, который исполняет скомпилированный код
+  на переданном входе с ограничениями по времени, памяти и размеру вывода.
+  Если передан ожидаемый вывод, stdout сравнивается с ним по мере поступления,
+  и при первом расхождении запуск останавливается.
+
+Каждый запуск идет в отдельном дочернем процессе, поэтому решения
+не видят состояние друг друга, а сам исполнитель остается чистым.
+SIGUSR1 прерывает текущий запуск.
+"""
+import builtins
+import codecs
+import json
+import math
+import os
+import resource
+import selectors
+import signal
+import struct
+import sys
+import time
+import traceback
+
+from checker import OutputComparator
+
+# Модули, которые часто импортируют решения: импорт в исполнителе делает их бесплатными в дочерних процессах
+PRELOADED_MODULES = ("bisect", "collections", "functools", "heapq", "itertools", "math", "re", "string")
+
+READ_CHUNK_SIZE = 65536
+# Сколько stdout возвращать при сравнении с ожидаемым: весь вывод там не нужен
+COMPARED_STDOUT_PREVIEW = 4096
+
+_current_child = None
+_cancelled = False
+
+
+def _cancel(signum, frame) -> None:
+    global _cancelled
+    if _current_child is not None:
+        _cancelled = True
+        try:
+            os.kill(_current_child, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def _read_message(fd: int) -> dict | None:
+    header = _read_exact(fd, 4)
+    if header is None:
+        return None
+    (length,) = struct.unpack(">I", header)
+    body = _read_exact(fd, length)
+    return json.loads(body) if body is not None else None
+
+
+def _read_exact(fd: int, size: int) -> bytes | None:
+    chunks = []
+    while size > 0:
+        chunk = os.read(fd, size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _write_message(fd: int, message: dict) -> None:
+    body = json.dumps(message).encode("utf-8")
+    data = struct.pack(">I", len(body)) + body
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+def _child(code, stdin_fd: int, stdout_fd: int, stderr_fd: int, protocol_fds: tuple, timeout: float, memory_limit: int) -> None:
+    """Выполняется в дочернем процессе и не возвращается"""
+    exit_code = 0
+    try:
+        for fd in protocol_fds:
+            os.close(fd)
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        cpu_seconds = math.ceil(timeout) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+        sys.argv = ["-c"]
+        try:
+            exec(code, {"__name__": "__main__", "__builtins__": builtins})
+        except SystemExit as e:
+            if e.code is None:
+                exit_code = 0
+            elif isinstance(e.code, int):
+                exit_code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except BaseException as e:
+            # Кадр самого исполнителя в трассировке решению не нужен
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            exit_code = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def _run(
+    code,
+    input_data: str,
+    expected: str | None,
+    timeout: float,
+    memory_limit: int,
+    output_limit: int,
+    protocol_fds: tuple,
+) -> dict:
+    global _current_child, _cancelled
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+
+    _cancelled = False
+    started = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        for fd in (stdin_w, stdout_r, stderr_r):
+            os.close(fd)
+        _child(code, stdin_r, stdout_w, stderr_w, protocol_fds, timeout, memory_limit)
+    _current_child = pid
+    for fd in (stdin_r, stdout_w, stderr_w):
+        os.close(fd)
+
+    pending_input = input_data.encode("utf-8")
+    outputs = {stdout_r: bytearray(), stderr_r: bytearray()}
+    output_size = 0
+    timed_out = False
+    output_exceeded = False
+    stopped_early = False
+    comparator = OutputComparator(expected) if expected is not None else None
+    if expected is not None:
+        # Лимит считается сверх ожидаемого вывода: лишний вывод и так остановит сравнение
+        output_limit += len(expected.encode("utf-8"))
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    stdout_keep = COMPARED_STDOUT_PREVIEW if comparator is not None else output_limit
+
+    selector = selectors.DefaultSelector()
+    selector.register(stdout_r, selectors.EVENT_READ)
+    selector.register(stderr_r, selectors.EVENT_READ)
+    open_fds = {stdout_r, stderr_r}
+    if pending_input:
+        os.set_blocking(stdin_w, False)
+        selector.register(stdin_w, selectors.EVENT_WRITE)
+        open_fds.add(stdin_w)
+    else:
+        os.close(stdin_w)
+
+    deadline = started + timeout
+    try:
+        while selector.get_map() and not (output_exceeded or stopped_early):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in selector.select(remaining):
+                if key.fd == stdin_w:
+                    try:
+                        written = os.write(stdin_w, pending_input[:READ_CHUNK_SIZE])
+                        pending_input = pending_input[written:]
+                    except BrokenPipeError:
+                        pending_input = b""
+                    if not pending_input:
+                        selector.unregister(stdin_w)
+                        os.close(stdin_w)
+                        open_fds.discard(stdin_w)
+                    continue
+                chunk = os.read(key.fd, READ_CHUNK_SIZE)
+                if not chunk:
+                    selector.unregister(key.fd)
+                    continue
+                output_size += len(chunk)
+                if output_size > output_limit:
+                    output_exceeded = True
+                    break
+                if key.fd == stdout_r:
+                    if len(outputs[stdout_r]) < stdout_keep:
+                        outputs[stdout_r] += chunk[:stdout_keep - len(outputs[stdout_r])]
+                    if comparator is not None and not comparator.feed(decoder.decode(chunk)):
+                        stopped_early = True
+                        break
+                else:
+                    outputs[stderr_r] += chunk
+    finally:
+        if timed_out or output_exceeded or stopped_early:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        selector.close()
+        for fd in open_fds:
+            os.close(fd)
+        _, status = os.waitpid(pid, 0)
+        _current_child = None
+
+    matched = None
+    if comparator is not None and not (timed_out or output_exceeded or _cancelled):
+        matched = comparator.feed(decoder.decode(b"", final=True)) and comparator.finish()
+    return {
+        "stdout": outputs[stdout_r][:output_limit].decode("utf-8", errors="replace"),
+        "stderr": outputs[stderr_r][:output_limit].decode("utf-8", errors="replace"),
+        "returncode": os.waitstatus_to_exitcode(status),
+        "timed_out": timed_out,
+        "output_exceeded": output_exceeded,
+        "cancelled": _cancelled,
+        "stopped_early": stopped_early,
+        "matched": matched,
+        "mismatch": comparator.mismatch.describe() if comparator is not None and comparator.mismatch else None,
+        "duration": time.monotonic() - started,
+    }
+
+
+def main() -> None:
+    signal.signal(signal.SIGUSR1, _cancel)
+    # Протокол идет через копии дескрипторов, а 0 и 1 больше не используются самим исполнителем
+    protocol_in = os.dup(0)
+    protocol_out = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+    protocol_fds = (protocol_in, protocol_out)
+
+    for module in PRELOADED_MODULES:
+        __import__(module)
+
+    code = None
+    _write_message(protocol_out, {"ready": True})
+    while True:
+        message = _read_message(protocol_in)
+        if message is None:
+            return
+        command = message["command"]
+        if command == "compile":
+            try:
+                code = compile(message["source"], "<string>", "exec")
+                _write_message(protocol_out, {"ok": True})
+            except (SyntaxError, ValueError):
+                code = None
+                _write_message(protocol_out, {"ok": False, "error": traceback.format_exc(limit=0)})
+        elif command == "run" and code is None:
+            _write_message(protocol_out, {"error": "Nothing compiled"})
+        elif command == "run":
+            result = _run(
+                code,
+                message["input"],
+                message.get("expected"),
+                message["timeout"],
+                message["memory_limit"],
+                message["output_limit"],
+                protocol_fds,
+            )
+            _write_message(protocol_out, result)
+
+
+if __name__ == "__main__":
+    main()
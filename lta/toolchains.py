@@ -0,0 +1,237 @@
+"""
+Сборка решений на компилируемых языках
+
+Python выполняется в песочнице (sandbox.py), а для C++ и Java решение
+сначала компилируется. Артефакты сборки кэшируются по хэшу нормализованного
+исходного кода: программа компилируется один раз и дальше запускается на
+всех тестах и при повторной отправке того же кода в следующих попытках.
+Сборка идет во временный каталог и переносится на место атомарно,
+поэтому параллельные проверки не видят недособранных артефактов.
+Хранится не больше BUILD_CACHE_SIZE сборок, давно не использованные удаляются.
+
+Собранные программы запускаются с теми же ограничениями, что и Python
+в песочнице: RLIMIT_CPU и RLIMIT_AS, а JVM вместо RLIMIT_AS получает -Xmx.
+"""
+import hashlib
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+from memo import normalize_code
+
+try:
+    import resource
+except ImportError:  # Windows: лимиты ресурсов недоступны, программы запускаются без них
+    resource = None
+
+BUILD_DIR = os.getenv("LTA_BUILD_DIR", os.path.join(tempfile.gettempdir(), "lta-builds"))
+COMPILE_TIMEOUT = 60.0
+BUILD_CACHE_SIZE = int(os.getenv("LTA_BUILD_CACHE_SIZE", "256"))
+
+# Другие написания языков, которые приходят из бэкенда и от пользователей
+LANGUAGE_ALIASES = {
+    "py": "python",
+    "python3": "python",
+    "c++": "cpp",
+    "cxx": "cpp",
+}
+
+
+@dataclass(frozen=True)
+class Toolchain:
+    """Как компилировать и запускать решение на одном языке"""
+    # Название языка для промпта
+    name: str
+    source_file: str
+    compile_command: tuple[str, ...]
+    # {build} заменяется на каталог сборки, {memory_mb} — на лимит памяти в мегабайтах
+    run_command: tuple[str, ...]
+    # JVM резервирует виртуальной памяти намного больше кучи и с RLIMIT_AS не стартует,
+    # поэтому для нее память ограничивается флагом в run_command
+    limit_address_space: bool = True
+
+
+TOOLCHAINS = {
+    "cpp": Toolchain(
+        name="C++17",
+        source_file="main.cpp",
+        compile_command=("g++", "-O2", "-std=c++17", "-o", "main", "main.cpp"),
+        run_command=("{build}/main",),
+    ),
+    "java": Toolchain(
+        name="Java (the entry point must be `public class Main`)",
+        source_file="Main.java",
+        compile_command=("javac", "-encoding", "UTF-8", "Main.java"),
+        run_command=("java", "-Xmx{memory_mb}m", "-XX:+UseSerialGC", "-cp", "{build}", "Main"),
+        limit_address_space=False,
+    ),
+}
+
+
+def normalize_language(language: str) -> str:
+    """
+    Приводит название языка к ключу TOOLCHAINS или "python"
+
+    Raises:
+        ValueError: Язык не поддерживается
+    """
+    normalized = LANGUAGE_ALIASES.get(language.strip().lower(), language.strip().lower())
+    if normalized != "python" and normalized not in TOOLCHAINS:
+        supported = ", ".join(("python", *TOOLCHAINS))
+        raise ValueError(f"Unsupported language: {language!r}; expected one of {supported}")
+    return normalized
+
+
+def resource_limits(memory_limit: int | None, timeout: float) -> Callable[[int], None] | None:
+    """
+    Ограничение времени процессора и памяти для уже запущенного процесса
+
+    Тесты запускаются из нескольких потоков, а preexec_fn в таком случае
+    может повесить дочерний процесс, поэтому лимиты выставляются через
+    prlimit по pid сразу после запуска, до передачи входных данных.
+
+    Args:
+        memory_limit: Лимит адресного пространства в байтах; None — не ограничивать
+        timeout: Ограничение времени теста в секундах
+
+    Returns:
+        Callable[[int], None] | None: Функция, которая выставляет лимиты процессу с данным pid,
+            или None, если prlimit недоступен (не Linux)
+    """
+    if resource is None or not hasattr(resource, "prlimit"):
+        return None
+    cpu_seconds = math.ceil(timeout) + 1
+
+    def apply(pid: int) -> None:
+        try:
+            if memory_limit:
+                resource.prlimit(pid, resource.RLIMIT_AS, (memory_limit, memory_limit))
+            resource.prlimit(pid, resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        except ProcessLookupError:
+            # Процесс уже завершился
+            pass
+
+    return apply
+
+
+@dataclass
+class Build:
+    """Результат сборки: команда запуска или текст ошибки компиляции"""
+    command: list[str] | None = None
+    error: str | None = None
+    # Ограничивать ли запуску адресное пространство (см. Toolchain.limit_address_space)
+    limit_address_space: bool = True
+
+
+class BuildCache:
+    """Собирает решения и хранит артефакты по хэшу исходного кода"""
+
+    def __init__(self, root: str = BUILD_DIR, compile_timeout: float = COMPILE_TIMEOUT, max_entries: int = BUILD_CACHE_SIZE):
+        self.root = root
+        self.compile_timeout = compile_timeout
+        self.max_entries = max_entries
+        # Ошибки компиляции хранятся в памяти: артефактов у них нет
+        self._errors: OrderedDict[str, str] = OrderedDict()
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        # Каталоги сборок от давно использованных к недавним; сборки прошлых запусков тоже учитываются
+        self._builds: OrderedDict[str, None] = OrderedDict()
+        if os.path.isdir(root):
+            existing = [entry for entry in os.scandir(root) if entry.is_dir() and not entry.name.startswith(".")]
+            for entry in sorted(existing, key=lambda entry: entry.stat().st_mtime):
+                self._builds[entry.path] = None
+
+    def _lock_for(self, digest: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(digest, threading.Lock())
+
+    def build(self, language: str, source: str, memory_limit: int) -> Build:
+        """
+        Возвращает собранное решение, компилируя его только при первом обращении
+
+        Ключ кэша — нормализованный код (см. memo.normalize_code), а компилируется
+        исходник как есть: нормализация меняет многострочные строковые литералы.
+
+        Args:
+            language: Ключ TOOLCHAINS
+            source: Исходный код решения
+            memory_limit: Лимит памяти запуска в байтах для флагов в команде запуска
+
+        Returns:
+            Build: Команда запуска или ошибка компиляции
+        """
+        toolchain = TOOLCHAINS[language]
+        digest = hashlib.sha256(f"{language}\0{normalize_code(source)}".encode("utf-8")).hexdigest()
+        directory = os.path.join(self.root, f"{language}-{digest}")
+        # Один исходник компилируется одним потоком, остальные ждут его результат
+        with self._lock_for(digest):
+            if digest in self._errors:
+                return Build(error=self._errors[digest])
+            if not os.path.isdir(directory):
+                error = self._compile(toolchain, source, directory)
+                if error is not None:
+                    self._remember_error(digest, error)
+                    return Build(error=error)
+            self._touch(directory)
+        return Build(
+            command=[part.format(build=directory, memory_mb=memory_limit // 2**20) for part in toolchain.run_command],
+            limit_address_space=toolchain.limit_address_space,
+        )
+
+    def _remember_error(self, digest: str, error: str) -> None:
+        with self._guard:
+            self._errors[digest] = error
+            while len(self._errors) > self.max_entries:
+                self._errors.popitem(last=False)
+
+    def _touch(self, directory: str) -> None:
+        """Отмечает сборку как недавно использованную и удаляет самые старые сверх лимита"""
+        with self._guard:
+            self._builds[directory] = None
+            self._builds.move_to_end(directory)
+            stale = []
+            while len(self._builds) > self.max_entries:
+                stale.append(self._builds.popitem(last=False)[0])
+        try:
+            # mtime нужен, чтобы следующий запуск восстановил порядок LRU
+            os.utime(directory)
+        except OSError:
+            pass
+        for path in stale:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _compile(self, toolchain: Toolchain, source: str, directory: str) -> str | None:
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".build-", dir=self.root)
+        try:
+            with open(os.path.join(staging, toolchain.source_file), "w", encoding="utf-8") as f:
+                f.write(source)
+            try:
+                completed = subprocess.run(
+                    toolchain.compile_command,
+                    cwd=staging,
+                    capture_output=True,
+                    text=True,
+                    errors="replace",
+                    timeout=self.compile_timeout,
+                )
+            except FileNotFoundError:
+                return f"Compiler not found: {toolchain.compile_command[0]}"
+            except subprocess.TimeoutExpired:
+                return "Compilation timed out."
+            if completed.returncode != 0:
+                return completed.stderr or completed.stdout or f"Compiler exited with code {completed.returncode}"
+            try:
+                os.rename(staging, directory)
+            except OSError:
+                # Тот же код уже собрал другой процесс
+                pass
+            return None
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Бэкенд, lta и бенчмарки импортируют свои модули без пакета, как при запуске из их каталогов
+for directory in ("backend", "lta", "benchmarks"):
+    path = os.path.join(ROOT_DIR, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
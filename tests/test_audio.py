@@ -0,0 +1,55 @@
+"""Разбор заголовка WAV: поврежденные файлы отклоняются с ValueError (400 в /recognize)"""
+import io
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from voice_assistant.audio import ingest, parse_wav
+
+
+def make_wav(sample_rate: int = 16000, channels: int = 1, frames: int = 160) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.zeros(frames * channels, dtype="<i2").tobytes())
+    return buf.getvalue()
+
+
+def riff(*chunks: bytes) -> bytes:
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def chunk(chunk_id: bytes, body: bytes, size: int | None = None) -> bytes:
+    return chunk_id + struct.pack("<I", len(body) if size is None else size) + body
+
+
+def test_parse_wav_reads_header():
+    samples, sample_rate, channels, sample_format = parse_wav(make_wav(22050, 2))
+
+    assert (sample_rate, channels, sample_format) == (22050, 2, "s16le")
+    assert len(samples) == 160 * 2 * 2
+
+
+@pytest.mark.parametrize("data", [
+    # Файл обрывается посреди блока fmt
+    make_wav()[:30],
+    # Блок fmt короче 16 байт
+    riff(chunk(b"fmt ", struct.pack("<HHI", 1, 1, 16000)), chunk(b"data", b"\0\0")),
+    # WAVE_FORMAT_EXTENSIBLE с заявленными 40 байтами, но без GUID подформата
+    riff(chunk(b"fmt ", struct.pack("<HHIIHH", 0xFFFE, 1, 16000, 32000, 2, 16), size=40)),
+    # Нулевая частота дискретизации
+    riff(chunk(b"fmt ", struct.pack("<HHIIHH", 1, 1, 0, 0, 2, 16)), chunk(b"data", b"\0\0")),
+])
+def test_parse_wav_rejects_truncated_or_invalid_header(data):
+    with pytest.raises(ValueError, match="Invalid audio file"):
+        parse_wav(data)
+
+
+def test_ingest_reports_truncated_wav_as_value_error():
+    with pytest.raises(ValueError):
+        ingest(make_wav()[:30], 16000)
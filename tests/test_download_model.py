@@ -0,0 +1,196 @@
+"""Загрузчик моделей Vosk на локальном сервере с поддержкой Range"""
+import hashlib
+import http.server
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import textwrap
+import threading
+import zipfile
+
+import pytest
+
+from voice_assistant import download_model as dm
+
+MODEL_DIR = dm.MODELS["small-ru"]["dir"]
+SEGMENT_SIZE = 256 * 1024
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def _make_archive() -> bytes:
+    rnd = random.Random(0)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr(f"{MODEL_DIR}/conf/mfcc.conf", "--sample-frequency=16000\n")
+        archive.writestr(f"{MODEL_DIR}/am/final.mdl", rnd.randbytes(4 * SEGMENT_SIZE))
+    return buf.getvalue()
+
+
+ARCHIVE = _make_archive()
+SHA256 = hashlib.sha256(ARCHIVE).hexdigest()
+
+
+class RangeServer(http.server.ThreadingHTTPServer):
+    """Отдает ARCHIVE целиком или по Range и запоминает запрошенные диапазоны"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.requests = []
+        # Сколько байт тела отдать перед обрывом соединения (None — без обрыва)
+        self.fail_after = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/model.zip"
+
+
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_headers(self, code, length, content_range=None):
+        self.send_response(code)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", '"v1"')
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._send_headers(200, len(ARCHIVE))
+
+    def do_GET(self):
+        header = self.headers.get("Range")
+        self.server.requests.append(header)
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", header or "")
+        if match:
+            start, end = int(match[1]), int(match[2])
+            body = ARCHIVE[start:end + 1]
+            self._send_headers(206, len(body), f"bytes {start}-{end}/{len(ARCHIVE)}")
+        else:
+            body = ARCHIVE
+            self._send_headers(200, len(body))
+        if self.server.fail_after is not None:
+            body = body[:self.server.fail_after]
+            self.close_connection = True
+        self.wfile.write(body)
+        self.wfile.flush()
+
+
+def _parse(header):
+    start, end = re.fullmatch(r"bytes=(\d+)-(\d+)", header).groups()
+    return int(start), int(end)
+
+
+@pytest.fixture
+def server():
+    srv = RangeServer()
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    thread.join()
+
+
+@pytest.fixture(autouse=True)
+def small_segments(monkeypatch):
+    # Архив теста делится на несколько частей, а прогресс сохраняется часто
+    monkeypatch.setattr(dm, "MIN_SEGMENT_SIZE", SEGMENT_SIZE)
+    monkeypatch.setattr(dm, "CHECKPOINT_BYTES", 32 * 1024)
+    monkeypatch.setattr(dm, "CHUNK_SIZE", 16 * 1024)
+
+
+def test_fetch_downloads_ranges_in_parallel(server, tmp_path):
+    dest = str(tmp_path / "model.zip")
+
+    dm.fetch(server.url, dest, workers=4)
+
+    with open(dest, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == SHA256
+    ranges = sorted(_parse(header) for header in server.requests)
+    assert len(ranges) == 4
+    # Части покрывают файл встык, без пропусков и перекрытий
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(ARCHIVE) - 1
+    assert all(prev[1] + 1 == cur[0] for prev, cur in zip(ranges, ranges[1:]))
+    assert not os.path.exists(dest + ".part")
+    assert not os.path.exists(dest + ".part.json")
+
+
+def test_fetch_resumes_partial_download(server, tmp_path):
+    dest = str(tmp_path / "model.zip")
+    server.fail_after = 100 * 1024
+
+    with pytest.raises(RuntimeError, match="Download interrupted"):
+        dm.fetch(server.url, dest, workers=4)
+
+    with open(dest + ".part.json", encoding="utf-8") as f:
+        segments = json.load(f)["segments"]
+    assert len(segments) == 4
+    assert all(0 < done < end - start for start, end, done in segments)
+
+    server.fail_after = None
+    server.requests.clear()
+    dm.fetch(server.url, dest, workers=4)
+
+    with open(dest, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == SHA256
+    # Повторно запрашиваются только недостающие байты каждой части
+    assert sorted(_parse(header) for header in server.requests) == [
+        (start + done, end - 1) for start, end, done in segments
+    ]
+    assert not os.path.exists(dest + ".part.json")
+
+
+def test_download_model_skips_installed_model(server, tmp_path):
+    models_dir = str(tmp_path)
+
+    model_path = dm.download_model("small-ru", models_dir, url=server.url, sha256=SHA256, workers=4)
+
+    assert dm.is_model_valid(model_path, SHA256)
+    assert os.path.isfile(os.path.join(model_path, "conf", "mfcc.conf"))
+    assert sorted(os.listdir(models_dir)) == [MODEL_DIR]
+
+    server.requests.clear()
+    assert dm.download_model("small-ru", models_dir, url=server.url, sha256=SHA256, workers=4) == model_path
+    assert server.requests == []
+
+
+def test_download_model_reinstalls_damaged_model(server, tmp_path):
+    models_dir = str(tmp_path)
+    model_path = dm.download_model("small-ru", models_dir, url=server.url, workers=4)
+    with open(os.path.join(model_path, "am", "final.mdl"), "ab") as f:
+        f.write(b"x")
+    assert not dm.is_model_valid(model_path)
+
+    server.requests.clear()
+    dm.download_model("small-ru", models_dir, url=server.url, workers=4)
+
+    assert server.requests
+    assert dm.is_model_valid(model_path)
+
+
+def test_voice_model_imports_without_downloader_dependencies():
+    # requests и tqdm нужны только загрузчику (extra download), бэкенд без них запускается
+    code = textwrap.dedent("""
+        import sys
+
+        class Blocker:
+            def find_spec(self, name, path=None, target=None):
+                if name.split(".")[0] in ("requests", "tqdm"):
+                    raise ModuleNotFoundError(f"No module named {name!r}")
+
+        sys.meta_path.insert(0, Blocker())
+        from voice_assistant.model_registry import ModelRegistry
+        from voice_assistant.voice_model import VoiceModel
+        assert "voice_assistant.download_model" not in sys.modules
+    """)
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
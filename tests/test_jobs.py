@@ -0,0 +1,59 @@
+"""Планировщик вызовов модели: прием фоновых задач и хранение результатов"""
+import asyncio
+
+import pytest
+
+from interview_assistant.service.jobs import JobScheduler, QueueFullError
+
+
+async def two_model_calls(scheduler: JobScheduler):
+    async with scheduler.slot():
+        await asyncio.sleep(0.01)
+    # Между вызовами модели задача продолжает занимать место в очереди
+    await asyncio.sleep(0.01)
+    async with scheduler.slot():
+        await asyncio.sleep(0.01)
+    return "ok", "result", "model"
+
+
+def test_burst_is_rejected_at_submit():
+    async def run():
+        scheduler = JobScheduler(1, max_queue=2, result_ttl=60)
+        jobs, rejected = [], []
+        # Задачи одной серии еще не дошли до очереди за слотом, но уже учитываются
+        for _ in range(10):
+            try:
+                jobs.append(scheduler.submit(lambda: two_model_calls(scheduler)))
+            except QueueFullError as e:
+                rejected.append(e)
+        with pytest.raises(QueueFullError):
+            async with scheduler.slot():
+                pass
+        await asyncio.gather(*(job.task for job in jobs))
+        return scheduler, jobs, rejected
+
+    scheduler, jobs, rejected = asyncio.run(run())
+
+    assert len(jobs) == 3
+    assert len(rejected) == 7
+    assert all(e.retry_after >= 1 for e in rejected)
+    assert [job.status for job in jobs] == ["done"] * 3
+    assert scheduler.snapshot()["reserved"] == 0
+    assert scheduler.stats["failed_jobs"] == 0
+
+
+def test_finished_jobs_are_capped():
+    async def run():
+        scheduler = JobScheduler(1, max_queue=2, result_ttl=60, max_results=2)
+        jobs = []
+        for _ in range(4):
+            job = scheduler.submit(lambda: two_model_calls(scheduler))
+            await job.task
+            jobs.append(job)
+        return scheduler, jobs
+
+    scheduler, jobs = asyncio.run(run())
+
+    # Хранятся только самые свежие результаты
+    assert scheduler.get(jobs[0].id) is None
+    assert [scheduler.get(job.id) for job in jobs[2:]] == jobs[2:]
@@ -0,0 +1,134 @@
+"""LLMService на локальной заглушке Ollama: общий пул соединений, потоковая выдача и отказ 429"""
+import asyncio
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+import uvicorn
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from fake_ollama import DEFAULT_RESPONSE, FakeOllamaConfig, create_fake_ollama
+from interview_assistant.api.routers import router
+from interview_assistant.core.config import MODEL_TIERS, STAGE_MODEL_TIERS
+from interview_assistant.service import llm_service
+from interview_assistant.service.jobs import JobScheduler, QueueFullError
+from interview_assistant.service.llm_service import LLMService, create_llm
+from interview_assistant.service.model_router import ModelRouter
+
+MAX_CONCURRENCY = 2
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def serve(config: FakeOllamaConfig):
+    app = create_fake_ollama(config)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield app, f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def make_service(scheduler: JobScheduler) -> LLMService:
+    return LLMService(ModelRouter(MODEL_TIERS, STAGE_MODEL_TIERS, scheduler, create_llm), scheduler)
+
+
+@pytest.fixture(scope="module")
+def fake_ollama():
+    with serve(FakeOllamaConfig(token_latency=0.002, parallel=MAX_CONCURRENCY)) as server:
+        yield server
+
+
+@pytest.fixture
+def service(fake_ollama, monkeypatch):
+    _, url = fake_ollama
+    monkeypatch.setattr(llm_service, "OLLAMA_BASE_URL", url)
+    return make_service(JobScheduler(MAX_CONCURRENCY, max_queue=64, result_ttl=60))
+
+
+def test_concurrent_requests_share_pooled_client(service, fake_ollama):
+    app, _ = fake_ollama
+    requests_before = app.state.stats["requests"]
+
+    async def run():
+        return await asyncio.gather(*(
+            service.solve_problem(f"Problem {i}: print the sum of two numbers", "python") for i in range(8)
+        ))
+
+    results = asyncio.run(run())
+
+    assert [solution for _, solution, _ in results] == [DEFAULT_RESPONSE] * 8
+    assert app.state.stats["requests"] - requests_before == 8
+    # Все запросы к одной модели идут через одного клиента и его пул соединений
+    model = service.router.model_for("solve")
+    assert service.router.client(model) is service.router.client(model)
+    assert service.scheduler.active == 0
+
+
+def test_stream_task_yields_tokens_in_order(service):
+    async def run():
+        return [event async for event in service.stream_task("Print the sum of two numbers a and b.", "python")]
+
+    events = asyncio.run(run())
+    kinds = [kind for kind, _ in events]
+
+    assert kinds[:2] == ["status", "status"]
+    assert [data for kind, data in events if kind == "status"] == ["extracting", "solving"]
+    assert kinds[-1] == "done"
+    tokens = [data for kind, data in events if kind == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == DEFAULT_RESPONSE
+
+
+def test_async_burst_beyond_queue_gets_429(monkeypatch):
+    from main import queue_full_handler
+
+    # Генерация длится дольше всей серии запросов, так что ни одна задача не успевает освободить место
+    with serve(FakeOllamaConfig(token_latency=0.02)) as (_, url):
+        monkeypatch.setattr(llm_service, "OLLAMA_BASE_URL", url)
+        scheduler = JobScheduler(1, max_queue=2, result_ttl=60)
+        app = FastAPI()
+        app.add_exception_handler(QueueFullError, queue_full_handler)
+        app.include_router(router)
+        app.state.scheduler = scheduler
+        app.state.llm_service = make_service(scheduler)
+
+        with TestClient(app) as client:
+            responses = [
+                client.post("/upload", data={
+                    "task": f"Problem {i}: print the sum of two numbers",
+                    "programming_language": "python",
+                    "async_mode": "true",
+                })
+                for i in range(10)
+            ]
+
+            # Принимается не больше max_concurrency + max_queue задач, остальные отклоняются сразу
+            assert [response.status_code for response in responses] == [202] * 3 + [429] * 7
+            assert all(int(response.headers["Retry-After"]) >= 1 for response in responses[3:])
+
+            session_ids = [response.json()["session_id"] for response in responses[:3]]
+            deadline = time.monotonic() + 30
+            while True:
+                statuses = [client.get(f"/session/{session_id}").json()["status"] for session_id in session_ids]
+                if all(status in ("done", "failed") for status in statuses) or time.monotonic() > deadline:
+                    break
+                time.sleep(0.05)
+
+        # Принятые задачи не падают на переполнении очереди
+        assert statuses == ["done"] * 3
+        assert scheduler.snapshot()["reserved"] == 0
@@ -0,0 +1,90 @@
+"""Граф решения lta на заглушке чат-модели: повторные попытки и режим best-of-N"""
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+import main2
+from fake_llm import FakeSolverModel
+
+WRONG = "print('true')"
+ALSO_WRONG = "print('false')"
+RIGHT = "x = input().strip()\nprint('true' if x == x[::-1] else 'false')"
+
+TEST_CASES = [
+    main2.TestCase(inputs="121", outputs="true"),
+    main2.TestCase(inputs="-121", outputs="false"),
+    main2.TestCase(inputs="10", outputs="false"),
+]
+
+
+class LoopRecordingModel(FakeSolverModel):
+    """Запоминает циклы событий асинхронных вызовов, как клиент Ollama, привязанный к первому циклу"""
+
+    loops: list = []
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.loops.append(asyncio.get_running_loop())
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def fresh_memo(monkeypatch):
+    # Вердикты не переносятся между тестами
+    monkeypatch.setattr(main2, "_execution_memo", main2.ExecutionMemo())
+
+
+def solve(llm, **state):
+    graph = main2.build_graph(llm)
+    initial = main2.State(
+        messages=[HumanMessage(content="Given an integer x, print true if x is a palindrome, and false otherwise.")],
+        test_cases=TEST_CASES,
+        runtime_limit=2,
+        status="in_progress",
+        problem_level="easy",
+        **state,
+    )
+    return graph.invoke(initial, {"recursion_limit": main2.RECURSION_LIMIT})
+
+
+def test_retries_until_tests_pass():
+    final = solve(FakeSolverModel(solutions=[WRONG, ALSO_WRONG, RIGHT]))
+
+    assert final["status"] == "success"
+    assert final["attempts"] == 3
+    assert len(final["failure_log"]) == 2
+    assert len(final["prompt_tokens"]) == 3
+
+
+def test_best_of_n_returns_first_passing_candidate():
+    # Верный кандидат готов раньше медленного неверного, и его генерация не дожидается
+    llm = FakeSolverModel(solutions=[WRONG, RIGHT, ALSO_WRONG], latencies=[0.05, 0.1, 5.0])
+
+    final = solve(llm, num_candidates=3)
+
+    assert final["status"] == "success"
+    assert final["attempts"] == 1
+    assert final["first_pass_seconds"] < 5.0
+    assert final["messages"][-1].tool_calls[0]["args"]["code"] == RIGHT
+
+
+def test_best_of_n_keeps_one_event_loop_across_attempts():
+    llm = LoopRecordingModel(solutions=[WRONG, ALSO_WRONG, RIGHT, RIGHT], loops=[])
+
+    final = solve(llm, num_candidates=2)
+
+    assert final["status"] == "success"
+    assert final["attempts"] == 2
+    assert len(llm.loops) == 4
+    assert len({id(loop) for loop in llm.loops}) == 1
+
+
+def test_best_of_n_feeds_back_best_candidate():
+    # Ни один кандидат не проходит: дальше идет тот, что прошел больше тестов
+    llm = FakeSolverModel(solutions=[WRONG, ALSO_WRONG, RIGHT, RIGHT])
+
+    final = solve(llm, num_candidates=2)
+
+    assert final["status"] == "success"
+    assert final["attempts"] == 2
+    assert final["failure_log"][0].startswith("Attempt 1: passed 2/3")
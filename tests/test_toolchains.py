@@ -0,0 +1,31 @@
+"""Сборка C++ решений: исходник компилируется как есть, старые сборки удаляются"""
+import os
+import shutil
+
+import pytest
+
+import main2
+from toolchains import BuildCache
+
+pytestmark = pytest.mark.skipif(shutil.which("g++") is None, reason="g++ is not installed")
+
+
+def test_build_compiles_source_verbatim(tmp_path, monkeypatch):
+    monkeypatch.setattr(main2, "_build_cache", BuildCache(str(tmp_path)))
+    monkeypatch.setattr(main2, "_execution_memo", main2.ExecutionMemo())
+    # Хвостовые пробелы внутри raw-строки — часть литерала
+    program = '#include <iostream>\nint main() { std::string s = R"(a  \nb)"; std::cout << s.size() << std::endl; }\n'
+
+    assert main2.check_code_correctness(program, "", "5", 5, language="cpp") == "passed"
+
+
+def test_build_cache_evicts_least_recently_used(tmp_path):
+    cache = BuildCache(str(tmp_path), max_entries=2)
+    first = cache.build("cpp", "int main() { return 0; }", 2**28)
+    cache.build("cpp", "int main() { return 1; }", 2**28)
+    # Повторное обращение делает первую сборку недавней, удаляется вторая
+    assert cache.build("cpp", "int main() { return 0; }", 2**28).command == first.command
+    cache.build("cpp", "int main() { return 2; }", 2**28)
+
+    assert len(os.listdir(tmp_path)) == 2
+    assert os.path.exists(first.command[0])